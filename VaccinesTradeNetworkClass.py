@@ -8,6 +8,8 @@
 -------------------------------------------------------------------
 """
 
+import warnings
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -15,6 +17,11 @@ import networkx as nx
 from typing import List
 
 from utilities import trade_network_functions as tnf
+from utilities.country_index import CountryIndex
+from utilities.edge_table import TradeEdgeTable
+from utilities.trade_graph import TradeNetworkGraph
+from utilities.trade_panel import TradePanel
+from utilities.trade_tensor import TradeTensor
 
 class VaccinesTradeNetwork:
     """
@@ -26,22 +33,54 @@ class VaccinesTradeNetwork:
     def __init__(self, df, country: str):
         self.df = df
         self.country = country
+        # Shared by all the objects created on the dataframe of the data loader
+        self.country_index = CountryIndex.for_frame(df)
+
+
+    @property
+    def edge_table(self) -> TradeEdgeTable:
+        """
+        Importer oriented flows of the whole dataset, shared by all the objects
+        created on the dataframe of the data loader.
+        """
+        return TradeEdgeTable.for_frame(self.df)
+
+
+    @property
+    def trade_tensor(self) -> TradeTensor:
+        """
+        Period x importer x exporter tensor of the whole dataset, for snapshot, range
+        and rolling window queries (e.g. a time slider). Shared by all the objects
+        created on the dataframe of the data loader.
+        """
+        return TradeTensor.for_frame(self.df)
+
+
+    @property
+    def trade_panel(self) -> TradePanel:
+        """
+        Monthly time series of the imports of every (importer, exporter) pair of the whole
+        dataset, with the missing months filled with 0. Shared by all the objects created
+        on the dataframe of the data loader.
+        """
+        return TradePanel.for_frame(self.df)
 
 
     def createCountrySpecificDF(self) -> pd.core.frame.DataFrame:
         """
         Filter the main dataframe to specific country. The dataframe will contain
         data where the 'Reporter' = country or 'Partner' = country.
+        The rows are looked up in the country index of the main dataframe.
         
         Returns:
         -------
             country_df: Filtered dataframe for a specified country.
         """
-        self.country_df = self.df[(self.df['Reporter']==self.country) | (self.df['Partner']==self.country) ]
+        self.country_df = self.country_index.select(self.df, self.country)
         return self.country_df
 
 
-    def create_trade_flow_df(self, tradeflow='Imports', source='Reporter', target='Partner') -> pd.core.frame.DataFrame:
+    def create_trade_flow_df(self, tradeflow='Imports', source=None, target=None) -> pd.core.frame.DataFrame:
         """
         Creates  a dataframe on the trade flow, and the source and target
         node directions for the directed graph. Each edge represents a country (Node A) that is either
@@ -61,58 +100,60 @@ class VaccinesTradeNetwork:
         Args:
         ----
             tradeflow: 'Imports' or 'Exports' -> Indicating the flow of interest for the base node (NodeA)
-            source: Default is 'Reporter'. It can change to 'Partner' if we want to change the direction.
-            target: Default is 'Partner'. It can change to 'Reporter' if we want to change the direction.
+            source, target: Deprecated and ignored. 'Reporter' is always the base node and 'Partner'
+                            the other node (the source and target of generateCountryGraph()).
+        
+        Note: The rows are sliced from the importer oriented edge table of the whole dataset
+        (see utilities/edge_table.py), which is built on the first call. The 'Reporter Code' and
+        'Partner Code' of the swapped rows are swapped too, so they match the country names.
         """
+        if source is not None or target is not None:
+            warnings.warn("The source and target arguments of create_trade_flow_df() are deprecated and "
+                          "ignored: the rows always have the base node in 'Reporter'",
+                          DeprecationWarning, stacklevel=2)
         self.tradeflow  = tradeflow
-        self.source = source
-        self.target = target
+        self.source = 'Reporter'
+        self.target = 'Partner'
         
         if self.tradeflow == 'Imports':
             self.opposite_flow = 'Exports'
         else:
             self.opposite_flow = 'Imports'
 
-        self.filtered_df = self.createCountrySpecificDF().copy(deep=True)
-        
-        self.filtered_df = self.filtered_df[((self.filtered_df['Trade Flow']==self.tradeflow) &
-                                             (self.filtered_df['Reporter']==self.country)) | 
-                                            ((self.filtered_df['Trade Flow']==self.opposite_flow) &
-                                             (self.filtered_df['Partner']==self.country))]
-
-        self.filtered_df[[self.source, self.target]] = self.filtered_df[[self.target,
-                        self.source]].where(self.filtered_df['Trade Flow'] == self.opposite_flow,
-                        self.filtered_df[[self.source, self.target]].values)
-                                            
-        self.filtered_df['Trade Flow'].replace({self.tradeflow: self.tradeflow, self.opposite_flow: self.tradeflow}, inplace=True)  
+        # The flows of all the countries are oriented once per dataset, so here we only
+        # need to slice the rows of the country
+        self.filtered_df = self.edge_table.flow_view(self.country, tradeflow=self.tradeflow)
         
         return self.filtered_df
 
     def generateCountryGraph(self, agg: bool) -> nx.classes.digraph.DiGraph:
         """
-        Generates a graph object for a specified country
+        Generates a graph object for a specified country. When agg is True the aggregated
+        imports are sliced from the sparse graph of the whole network (see utilities/trade_graph.py).
         Returns:
         -------
             CountryGraph: nx.classes.digraph.DiGraph object containing the graph of the network.
         """
-        self.filtered_df = self.create_trade_flow_df(tradeflow='Imports', source='Reporter', target='Partner')
+        self.filtered_df = self.create_trade_flow_df(tradeflow='Imports')
         self.agg = agg
 
         if agg  is True:
-            self.filtered_df= tnf.groupNodesAndAggregate(self.filtered_df,
-                                                         how='overall',
-                                                         compute_value_per_kg=True)
+            self.filtered_df = TradeNetworkGraph.for_frame(self.df).country_graph_df(self.country)
         
         self.CountryGraph = nx.from_pandas_edgelist(self.filtered_df,
                                          source=self.source, target=self.target,
                                          edge_attr=['Trade Value (US$)', 'Netweight (kg)','Value_Per_Kg'],
                                          create_using=nx.DiGraph())
         
-        self.tradevalue_w = [self.CountryGraph[u][v]['Trade Value (US$)'] for u,v 
-                             in self.CountryGraph.edges()]
-
-        self.valueperkg_w = [int(self.CountryGraph[u][v]['Value_Per_Kg']) for u,v 
-                             in self.CountryGraph.edges()]
+        if agg is True:
+            # One row per edge, in the order of the edges of the graph
+            self.tradevalue_w = self.filtered_df['Trade Value (US$)'].to_numpy()
+            self.valueperkg_w = np.nan_to_num(self.filtered_df['Value_Per_Kg'].to_numpy()).astype(int)
+        else:
+            self.tradevalue_w = np.array([self.CountryGraph[u][v]['Trade Value (US$)'] for u,v 
+                                          in self.CountryGraph.edges()])
+            self.valueperkg_w = np.array([int(self.CountryGraph[u][v]['Value_Per_Kg']) for u,v 
+                                          in self.CountryGraph.edges()])
         
         if self.tradeflow == 'Imports':
             return self.CountryGraph.reverse()
@@ -151,7 +192,7 @@ class VaccinesTradeNetwork:
             df: Dataframe containing data either for all Partner countries or a subset.
                 The returned dataframe used a 'Period' column as the index for the time series.
         """
-        self.filtered_df = self.create_trade_flow_df(tradeflow='Imports', source='Reporter', target='Partner')
+        self.filtered_df = self.create_trade_flow_df(tradeflow='Imports')
 
         self.timeframe = timeframe
         
@@ -172,6 +213,31 @@ class VaccinesTradeNetwork:
 
         
         return df
+
+    def generateTimeSeriesPanel(self, partner_list: List[str] = None, col='Trade Value (US$)',
+                                timeframe='month') -> pd.core.frame.DataFrame:
+        """
+        Time series of the imports of the country from many Partner countries at once, sliced
+        from the panel of the whole dataset instead of being grouped partner by partner.
+        Every series covers all the months (or years) of the data, and the months without
+        trade are 0.
+
+        Args:
+        ----
+            partner_list: List of the partner countries of interest, or None for all the
+                          countries the country imports from.
+            col: 'Trade Value (US$)', 'Netweight (kg)' or 'Value_Per_Kg'
+            timeframe: 'month' or 'year'
+
+        Returns:
+        -------
+            df: Dataframe with a 'Period' index and one column per partner country.
+        """
+        if partner_list is None:
+            return self.trade_panel.importer_frame(self.country, layer=col, timeframe=timeframe)
+        return pd.DataFrame({partner: self.trade_panel.series(self.country, partner, layer=col,
+                                                              timeframe=timeframe)
+                             for partner in partner_list})
     
     def plotTimeSeries(self, partner_list: List[str], col='Trade Value (US$)',
                        timeframe='month', figsize=(10,6)) -> None:
@@ -187,10 +253,11 @@ class VaccinesTradeNetwork:
         np.random.seed(42)
         self.timeframe = timeframe
         
+        panel_df = self.generateTimeSeriesPanel(partner_list, col=col, timeframe=self.timeframe)
+
         plt.figure(figsize=figsize)
         for partner in partner_list:
-            temp = self.generateTimeSeries(partner_country=f'{partner}', timeframe=self.timeframe)
-            ts = temp[col]
+            ts = panel_df[partner]
             ts.plot(marker='.', color = np.random.rand(len(partner_list),3),
                           grid=True, linewidth=1, label=f'{partner}')
         plt.legend(loc='best', shadow=True, fontsize='medium')
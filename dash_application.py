@@ -10,11 +10,15 @@ import dash_table
 import dash_core_components as dcc
 import dash_html_components as html
 from dash.dependencies import Input, Output
+from dash.exceptions import PreventUpdate
 
 import networkx as nx
 
 # Custom packages
-from utilities import trade_network_functions as tnf
+from utilities import data_loader
+from utilities.callback_cache import CallbackCache
+from utilities.model_registry import ModelRegistry, series_id
+from utilities.network_layouts import build_layouts, layouts_file
 from VaccinesTradeNetworkClass import VaccinesTradeNetwork
 
 external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
@@ -25,47 +29,38 @@ app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
 project_dir = r'D:\GitHub\Projects\Comtrade_Network'
 os.chdir(project_dir)# Read the csv file
 
-# Create a dataframe that contains data from all years
-csv_files_loc = os.path.join(project_dir, 'Merged_CSVs')
-df = pd.concat([pd.read_csv(os.path.join(csv_files_loc,
-                                             file)) for file in os.listdir(csv_files_loc)])
-
-
-useful_features_ls = ['Year', 'Period', 'Reporter Code', 'Reporter', 'Partner Code',
-                      'Partner', 'Trade Flow', 'Commodity', 'Netweight (kg)',
-                      'Trade Value (US$)']
-
-df = df[useful_features_ls]
-
-trade_flow_dict = {'Re-imports':'Imports', 
-                   'Re-exports':'Exports',
-                   'Imports':'Imports', 
-                   'Exports':'Exports'}
-
-df['Trade Flow'] = df['Trade Flow'].map(trade_flow_dict)
-
-df = df[df.Partner != 'World']
-
-df['Period'] = pd.to_datetime(df['Period'], format='%Y%m')
-
-df['Partner'].replace(
-    to_replace='United States of America',
-    value='USA',
-    inplace=True
-)
-
-df['Reporter'].replace(
-    to_replace='United States of America',
-    value='USA',
-    inplace=True
-)
-
-df = df[df['Reporter'].notna()]
+# Create a dataframe that contains the cleaned data from all years. The data are read
+# from the Parquet store (see data_conversion.py) and memoized by the shared loader.
+df = data_loader.load_trade_data(project_dir)
+
+# Results of the callbacks are memoized on the (reporter, partner) selection. Set the
+# DASH_CALLBACK_CACHE_DIR environment variable to share the results between the
+# workers of a multi-process server (e.g. gunicorn).
+callback_cache = CallbackCache(maxsize=256,
+                               cache_dir=os.environ.get('DASH_CALLBACK_CACHE_DIR'),
+                               namespace=data_loader.data_fingerprint(project_dir))
+
+# Forecasts of the months after the data, read from the model registry (see
+# data_forecasting.py --cache-future). Nothing is fitted by the dashboard.
+model_registry = ModelRegistry(os.path.join(project_dir, 'Model_Registry'))
+
+# Positions of the nodes of the import network of every reporter, precomputed in parallel
+# by data_layouts.py. Here only the countries whose network changed since then are
+# recomputed (in this process, as the module is imported again by any worker process).
+layouts_path = os.path.join(project_dir, layouts_file)
+if not os.path.exists(layouts_path):
+    print(f'No precomputed network layouts in {layouts_path} - Run data_layouts.py to compute them in parallel')
+network_layouts = build_layouts(df, layouts_path, n_jobs=1)
 
 #------- Data loading and cleaning finishes here ------- 
 
 #------- App Layout ---------------
 
+# Columns of the monthly time series of VaccinesTradeNetwork.generateTimeSeries()
+table_columns_ls = ['Reporter', 'Partner', 'Trade Flow', 'Period',
+                    'Trade Value (US$)', 'Netweight (kg)', 'Value_Per_Kg']
+table_page_size = 25
+
 def SelectionToObject(x):
     options = []
     for i in x:
@@ -118,9 +113,13 @@ app.layout = html.Div([
      # Network plot
     dcc.Graph(id='network_plot'), 
 
-    # Data table
+    # Data table, paginated on the server
     dash_table.DataTable(
         id='table',
+        columns=[{"name": i, "id": i} for i in table_columns_ls],
+        page_action='custom',
+        page_current=0,
+        page_size=table_page_size,
         style_table={
             'maxHeight': '50ex',
             'overflowY': 'auto',
@@ -145,26 +144,46 @@ app.layout = html.Div([
         })
 
 ])
-#-------- Callback --------
+#-------- Callbacks --------
+# The line plots depend on both the reporter and the partner, the network plot only on
+# the reporter and the table is paginated on the server. Each output is memoized on its
+# own inputs, so changing the partner does not rebuild the network plot.
+
+@callback_cache.memoize
+def create_time_series(reporter_country, partner_country):
+    reporter_obj = VaccinesTradeNetwork(df, country=reporter_country)
+    return reporter_obj.generateTimeSeries(partner_country=partner_country, timeframe='month')
+
 
 @app.callback(
     [Output(component_id='imports_between_two_countries_value', component_property='figure'),
-     Output(component_id='imports_between_two_countries_kg', component_property='figure'),
-     Output(component_id='network_plot', component_property='figure'),
-     Output(component_id='table', component_property='data'),
-     Output(component_id='table', component_property='columns')],
+     Output(component_id='imports_between_two_countries_kg', component_property='figure')],
     [Input(component_id='reporter_dropdown', component_property='value'),
     Input(component_id='partner_dropdown', component_property='value')]
 )
 
 def update_lineplot(reporter_country, partner_country):
-    print(reporter_country)
-    print(partner_country)
-    
-    df_cp = df.copy()
-    df_cp = VaccinesTradeNetwork(df_cp, country=reporter_country)
+    fig_lineplot_val, fig_lineplot_kg = create_lineplots(reporter_country, partner_country)
+
+    # The forecast is read from the registry on every call (and not memoized with the plots),
+    # so that the forecasts stored after the dashboard started are shown. The memoized
+    # figure is copied, as it is shared with the other calls.
+    forecast_ts = model_registry.latest_forecast('hwes', series_id(reporter_country, partner_country))
+    if forecast_ts is not None:
+        fig_lineplot_val = go.Figure(fig_lineplot_val)
+        fig_lineplot_val.add_trace(go.Scatter(
+            x=forecast_ts.index,
+            y=forecast_ts.values,
+            name='Forecast (Holt-Winters)',
+            line=dict(color='royalblue', width=2, dash='dash'),
+            mode='lines'))
 
-    df_as_timeseries = df_cp.generateTimeSeries(partner_country=partner_country, timeframe='month')
+    return fig_lineplot_val, fig_lineplot_kg
+
+
+@callback_cache.memoize
+def create_lineplots(reporter_country, partner_country):
+    df_as_timeseries = create_time_series(reporter_country, partner_country)
 
     # Lineplot for Trade Value
     fig_lineplot_val = go.Figure()
@@ -209,8 +228,24 @@ def update_lineplot(reporter_country, partner_country):
             color="#7f7f7f"
         ))
 
+    return fig_lineplot_val, fig_lineplot_kg
+
+
+@app.callback(
+    Output(component_id='network_plot', component_property='figure'),
+    [Input(component_id='reporter_dropdown', component_property='value')]
+)
+
+def update_network_plot(reporter_country):
+    if reporter_country is None:
+        raise PreventUpdate
+
+    return create_network_plot(reporter_country)
+
+
+@callback_cache.memoize
+def create_network_plot(reporter_country):
     # Network graph
-    df_grouped = tnf.groupNodesAndAggregate(df, how='overall', compute_value_per_kg=True)
     reporter_obj = VaccinesTradeNetwork(df, country=reporter_country)
     G = reporter_obj.generateCountryGraph(agg=True)
 
@@ -219,7 +254,9 @@ def update_lineplot(reporter_country, partner_country):
     G.add_edge(reporter_country, reporter_country)
     G.edges[reporter_country, reporter_country]['Trade Value (US$)'] = 0
 
-    pos = nx.layout.spring_layout(G)
+    pos = network_layouts.get(reporter_country)
+    if pos is None or any(node not in pos for node in G.nodes()):
+        pos = nx.layout.spring_layout(G, seed=network_layouts.seed)
 
     edge_x = []
     edge_y = []
@@ -294,11 +331,27 @@ def update_lineplot(reporter_country, partner_country):
                             color="#7f7f7f"
         ))
 
-    # Data Table
-    columns=[{"name": i, "id": i} for i in df_as_timeseries.columns]
-    data = df_as_timeseries.to_dict(orient='records')
+    return fig_network
+
+
+@app.callback(
+    [Output(component_id='table', component_property='data'),
+     Output(component_id='table', component_property='page_count')],
+    [Input(component_id='reporter_dropdown', component_property='value'),
+    Input(component_id='partner_dropdown', component_property='value'),
+    Input(component_id='table', component_property='page_current'),
+    Input(component_id='table', component_property='page_size')]
+)
+
+def update_table(reporter_country, partner_country, page_current, page_size):
+    df_as_timeseries = create_time_series(reporter_country, partner_country)
+
+    # Only the rows of the current page are sent to the browser
+    page_count = max(math.ceil(len(df_as_timeseries) / page_size), 1)
+    page_current = min(page_current or 0, page_count - 1)
+    page = df_as_timeseries.iloc[page_current * page_size:(page_current + 1) * page_size]
 
-    return fig_lineplot_val, fig_lineplot_kg, fig_network, data, columns
+    return page.to_dict(orient='records'), page_count
 
 
 if __name__ == '__main__':
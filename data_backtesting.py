@@ -0,0 +1,60 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    data_backtesting.py
+-- Purpose: Walk-forward backtest of the forecasting models (and of the naive baselines) over
+            the monthly imports of every pair of countries with enough history.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import time
+import argparse
+
+from utilities import backtesting, data_loader
+from utilities.forecasting import forecast_models_dict
+
+dirname = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser(description='Backtests the forecasting models on all the pairs of countries')
+parser.add_argument('--models', nargs='+', type=str, default=['naive', 'seasonal_naive', 'hwes'],
+                    choices=list(backtesting.baseline_models_dict) + list(forecast_models_dict),
+                    help='Models to compare')
+parser.add_argument('--col', type=str, default='Trade Value (US$)',
+                    help='Feature to forecast')
+parser.add_argument('--horizon', type=int, default=12,
+                    help='Number of months forecasted by every fold')
+parser.add_argument('--min-train', type=int, default=36,
+                    help='Number of train months of the first fold')
+parser.add_argument('--step', type=int, default=12,
+                    help='Number of months between two folds')
+parser.add_argument('--window', type=int, default=None,
+                    help='Train months of a rolling window (by default the window is expanding)')
+parser.add_argument('--min-months', type=int, default=36,
+                    help='Smallest number of months with trade of a series')
+parser.add_argument('--processes', type=int, default=None,
+                    help='Number of processes (by default one per core)')
+parser.add_argument('--out-folder', type=str, default=os.path.join(dirname, 'Forecasts'),
+                    help='Folder where the scores of the backtest are written')
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = data_loader.load_trade_data(dirname)
+    scores_df, skipped = backtesting.backtest_pairs(df, models=args.models, layer=args.col,
+                                                    horizon=args.horizon, min_train=args.min_train,
+                                                    step=args.step, window=args.window,
+                                                    min_months=args.min_months, processes=args.processes)
+
+    os.makedirs(args.out_folder, exist_ok=True)
+    out_path = os.path.join(args.out_folder, 'backtest_scores.parquet')
+    scores_df.to_parquet(out_path, engine='pyarrow', index=False)
+
+    print(f"{scores_df.groupby(['Importer', 'Exporter']).ngroups} pairs backtested "
+          f"({scores_df['Fold'].nunique()} folds), {len(skipped)} skipped\n")
+    print(backtesting.summarize_backtest(scores_df))
+    print(f'\nScores: {out_path}\nFinished in {time.perf_counter() - start:.2f}s')
@@ -11,10 +11,19 @@
 
 # Import dependencies
 import os
-import sys
+import io
 import csv
-import pandas as pd
+import json
+import codecs
+import time
+import hashlib
 import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from utilities.data_store import merged_csv_prefix
 
 # Some files received contain no data, as no recorded data exist for all countries.
 # Before we merge the files to a unique file that will contain the clean data,
@@ -23,57 +32,319 @@ import argparse
 # Relative folder path to the executable dataCleaning.py file
 dirname = os.path.dirname(__file__)
 
-parser = argparse.ArgumentParser(description='Parses for year of interest')
-parser.add_argument('year', type=str, help='A required integer positional argumentn defining year of interest')
-args = parser.parse_args()
+parser = argparse.ArgumentParser(description='Parses for years of interest')
+parser.add_argument('years', type=str, nargs='+',
+                    help='Years of interest, as single years and/or ranges (e.g. 2019, or 2010-2020)')
+parser.add_argument('--workers', type=int, default=8, help='Number of threads used to check the files of a year')
+parser.add_argument('--processes', type=int, default=os.cpu_count(), help='Number of years cleaned in parallel')
+parser.add_argument('--full', action='store_true', help='Merge all the files again, even if they did not change')
+
+# Size of the blocks in which the files are read
+chunk_size = 1 << 20
 
-csv_loc = os.path.join(dirname, 'CSVFiles', args.year)
 
+class SniffResult(NamedTuple):
+    csv_name: str
+    valid: bool
+    encoding: Optional[str] = None
+    header: Optional[List[str]] = None
+    reason: Optional[str] = None
+    sha256: Optional[str] = None
 
-def valid_csv_sniffer(csv_name: str, csv_folder: str) -> None:
+
+def detect_encoding(csv_path: str) -> Tuple[str, str]:
+    """
+    Encoding of a file: 'utf-8' if all of its bytes are valid UTF-8, else 'latin-1'.
+    The file is decoded incrementally, block by block, and its SHA-256 is computed in the same pass.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    content_hash = hashlib.sha256()
+    encoding = 'utf-8'
+    with open(csv_path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            content_hash.update(block)
+            if encoding == 'utf-8':
+                try:
+                    decoder.decode(block)
+                except UnicodeDecodeError:
+                    encoding = 'latin-1'
+    if encoding == 'utf-8':
+        try:
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            encoding = 'latin-1'
+    return encoding, content_hash.hexdigest()
+
+
+def valid_csv_sniffer(csv_name: str, csv_folder: str) -> SniffResult:
     """
     Check a CSV file to understand if it contains valid data.
     The CSV files that are not valid will not have a string 'HS' as their first value of the 'Classification' column.
+    Only the header and the first row are parsed.
 
     Args:
     ----
         csv_name: Path to the csv_file that needs checking.
         csv_folder: Path to the folder that contains all the csv files.
+    Returns:
+    -------
+        result: SniffResult with the validity, the encoding, the header and the SHA-256 of the file.
     """
+    csv_path = os.path.join(csv_folder, csv_name)
     try:
-        sniffed_df = pd.read_csv(os.path.join(csv_folder, csv_name), delimiter=',', nrows=1, header=[0])
-        try:
-            if sniffed_df['Classification'][0] != 'HS':
-                print(f'The file {csv_name} does not contain valid data! Deleting file from directory..\n')
-                os.remove(os.path.join(csv_folder, csv_name))
-            else:
-                print(f'File {csv_name} contained data..\n')
-                pass
-        except KeyError:
-                print(f'The file {csv_name} is not a possible argument combination..\n')
-                os.remove(os.path.join(csv_folder, csv_name))
-    except OSError:
-        print(f'Badly formated file: {csv_name}')
-        os.remove(os.path.join(csv_folder, csv_name))
-
-
-def read_dataframe(filepath):
+        encoding, sha256 = detect_encoding(csv_path)
+        with open(csv_path, 'r', encoding=encoding, newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            first_row = next(reader, None)
+    except (OSError, csv.Error):
+        return SniffResult(csv_name, False, reason=f'Badly formated file: {csv_name}')
+
+    if header is None or 'Classification' not in header:
+        return SniffResult(csv_name, False, reason=f'The file {csv_name} is not a possible argument combination..\n')
+    position = header.index('Classification')
+    if first_row is None or len(first_row) <= position or first_row[position] != 'HS':
+        return SniffResult(csv_name, False, reason=f'The file {csv_name} does not contain valid data! Deleting file from directory..\n')
+    return SniffResult(csv_name, True, encoding, header, sha256=sha256)
+
+
+def sniff_files(csv_folder: str, csv_names: List[str], max_workers: int = 8) -> List[SniffResult]:
+    """
+    Check CSV files of a folder in a pool of threads, and delete the files that do not
+    contain valid data.
+
+    Returns:
+    -------
+        valid_files: SniffResult of the files that contain data, in the order of csv_names.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda csv_name: valid_csv_sniffer(csv_name, csv_folder), csv_names))
+
+    for result in results:
+        if result.valid:
+            print(f'File {result.csv_name} contained data..\n')
+        else:
+            print(result.reason)
+            os.remove(os.path.join(csv_folder, result.csv_name))
+    return [result for result in results if result.valid]
+
+
+def list_csvs(csv_folder: str) -> List[str]:
+    """
+    Files of a folder of downloaded CSVs, sorted by name. Unfinished downloads ('.part' files) are ignored.
+    """
+    return sorted(file for file in os.listdir(csv_folder) if not file.endswith('.part'))
+
+
+def append_csv(csv_path: str, sniffed: SniffResult, columns: List[str], out) -> int:
+    """
+    Append the rows of a CSV file to the (open, binary) merged output, block by block.
+    Files with the same columns as the output are copied as text; the rest are parsed in
+    chunks and aligned to the columns of the output.
+
+    Returns:
+    -------
+        n_rows: Number of rows that were appended.
+    """
+    n_rows = 0
+    if sniffed.header == columns:
+        with open(csv_path, 'r', encoding=sniffed.encoding, newline='') as f:
+            f.readline()
+            last = '\n'
+            for block in iter(lambda: f.read(chunk_size), ''):
+                out.write(block.encode('utf-8'))
+                n_rows += block.count('\n')
+                last = block[-1]
+            if last not in '\r\n':
+                out.write(b'\n')
+                n_rows += 1
+    else:
+        for chunk_df in pd.read_csv(csv_path, encoding=sniffed.encoding, chunksize=100000):
+            out.write(chunk_df.reindex(columns=columns).to_csv(header=False, index=False).encode('utf-8'))
+            n_rows += len(chunk_df)
+    return n_rows
+
+
+def copy_segment(source, offset: int, length: int, out) -> None:
+    source.seek(offset)
+    while length > 0:
+        block = source.read(min(chunk_size, length))
+        if not block:
+            raise EOFError('The merged file is shorter than expected')
+        out.write(block)
+        length -= len(block)
+
+
+def merge_state_path(output_path: str) -> str:
+    """
+    Path of the state of the incremental merge of a merged CSV. The name does not start
+    with the prefix of the merged files, so it is not picked up as data.
+    """
+    folder, name = os.path.split(output_path)
+    return os.path.join(folder, f'.{name}.merge_state.json')
+
+
+def load_merge_state(output_path: str) -> Optional[dict]:
+    """
+    State of a previous merge, or None if it is missing or does not match the merged file.
+    """
+    state_path = merge_state_path(output_path)
+    if not os.path.exists(state_path) or not os.path.exists(output_path):
+        return None
     try:
-        df = pd.read_csv(os.path.join(filepath), encoding='utf-8')
-    except UnicodeDecodeError:
-        df = pd.read_csv(os.path.join(filepath), encoding='latin-1')
-    return df
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get('size') == os.path.getsize(output_path) else None
+
+
+def merge_csvs(csv_folder: str, output_path: str, max_workers: int = 8, full: bool = False) -> Dict[str, int]:
+    """
+    Merge the valid CSV files of a folder into a single CSV file, streaming them without
+    loading them in memory. The output has the columns of the first file.
+
+    The merged file is a sequence of one segment of rows per CSV file. The size, modification
+    time, SHA-256 and segment of every file are kept in a state file, so that the next merge
+    only checks and parses the files that were added or modified. The segments of the
+    unchanged files are copied as bytes from the previous merged file.
+
+    Args:
+    ----
+        csv_folder: Folder of the downloaded CSV files of a year.
+        output_path: Path of the merged CSV file.
+        max_workers: Number of threads used to check the files.
+        full: Ignore the state of the previous merge.
+    Returns:
+    -------
+        stats: Dictionary with the number of 'files' merged, the number of 'parsed' files
+               (added or modified), the number of 'removed' files and the total 'rows'.
+    """
+    folder = os.path.dirname(os.path.abspath(output_path))
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    state = None if full else load_merge_state(output_path)
+    old_files = state['files'] if state is not None else {}
+
+    # Files with the same size and modification time as in the previous merge are not read again
+    csv_names = list_csvs(csv_folder)
+    stats = {csv_name: os.stat(os.path.join(csv_folder, csv_name)) for csv_name in csv_names}
+    unchanged = {csv_name for csv_name in csv_names if csv_name in old_files
+                 and old_files[csv_name]['size'] == stats[csv_name].st_size
+                 and old_files[csv_name]['mtime_ns'] == stats[csv_name].st_mtime_ns}
+    sniffed = {result.csv_name: result for result in
+               sniff_files(csv_folder, [csv_name for csv_name in csv_names if csv_name not in unchanged], max_workers)}
+    # Files that were touched without changing their content keep their segment
+    unchanged |= {csv_name for csv_name, result in sniffed.items()
+                  if csv_name in old_files and old_files[csv_name]['sha256'] == result.sha256}
+
+    valid_names = [csv_name for csv_name in csv_names if csv_name in unchanged or csv_name in sniffed]
+    if state is not None:
+        columns = state['columns']
+    else:
+        columns = sniffed[valid_names[0]].header if valid_names else []
+
+    files, n_parsed = {}, 0
+    # The temporary file does not start with the prefix of the merged files either
+    tmp_path = os.path.join(folder, f'.{os.path.basename(output_path)}.part')
+    with open(tmp_path, 'wb') as out:
+        header = io.StringIO()
+        csv.writer(header).writerow(columns)
+        out.write(header.getvalue().encode('utf-8') if columns else b'')
+        with open(output_path, 'rb') if state is not None else io.BytesIO() as previous:
+            for csv_name in valid_names:
+                offset = out.tell()
+                if csv_name in unchanged:
+                    old = old_files[csv_name]
+                    copy_segment(previous, old['offset'], old['length'], out)
+                    n_rows, sha256, encoding = old['rows'], old['sha256'], old['encoding']
+                else:
+                    result = sniffed[csv_name]
+                    n_rows = append_csv(os.path.join(csv_folder, csv_name), result, columns, out)
+                    sha256, encoding = result.sha256, result.encoding
+                    n_parsed += 1
+                files[csv_name] = {'size': stats[csv_name].st_size, 'mtime_ns': stats[csv_name].st_mtime_ns,
+                                   'sha256': sha256, 'encoding': encoding, 'offset': offset,
+                                   'length': out.tell() - offset, 'rows': n_rows}
+        size = out.tell()
+    os.replace(tmp_path, output_path)
+
+    new_state = {'columns': columns, 'size': size, 'files': files}
+    with open(f'{merge_state_path(output_path)}.part', 'w', encoding='utf-8') as f:
+        json.dump(new_state, f)
+    os.replace(f'{merge_state_path(output_path)}.part', merge_state_path(output_path))
+
+    return {'files': len(files), 'parsed': n_parsed,
+            'removed': len(set(old_files) - set(files)),
+            'rows': sum(file['rows'] for file in files.values())}
+
+
+def parse_years(years: List[str]) -> List[int]:
+    """
+    Expand a list of years and year ranges (e.g. ['2010-2012', '2015']) to a sorted list of years.
+    """
+    parsed = set()
+    for year in years:
+        start, _, end = year.partition('-')
+        parsed.update(range(int(start), int(end or start) + 1))
+    return sorted(parsed)
+
+
+def clean_year(year: int, csv_root: str = os.path.join(dirname, 'CSVFiles'),
+               merged_folder: str = os.path.join(dirname, 'Merged_CSVs'), max_workers: int = 8,
+               full: bool = False) -> Dict[str, float]:
+    """
+    Delete the files of a year that do not contain relevant data for our analysis, and merge
+    the rest to a unique csv file. Only the files that changed since the last merge are read.
+
+    Args:
+    ----
+        year: Year of interest.
+        csv_root: Folder with a sub-folder of downloaded CSV files per year.
+        merged_folder: Folder of the merged CSV files.
+        max_workers: Number of threads used to check the files.
+        full: Merge all the files again, even if they did not change.
+    Returns:
+    -------
+        stats: Statistics of merge_csvs(), with the 'year' and the 'seconds' it took.
+    """
+    start = time.perf_counter()
+    stats = merge_csvs(os.path.join(csv_root, str(year)), os.path.join(merged_folder, f'{merged_csv_prefix}{year}'),
+                       max_workers=max_workers, full=full)
+    return dict(stats, year=year, seconds=time.perf_counter() - start)
+
+
+def clean_years(years: List[int], processes: Optional[int] = None, **kwargs) -> List[Dict[str, float]]:
+    """
+    Clean several years in parallel, one process per year (see clean_year() for the arguments).
+    The years without a folder of downloaded files are skipped.
+
+    Returns:
+    -------
+        stats: Statistics of every year, in the order of the years.
+    """
+    csv_root = kwargs.get('csv_root', os.path.join(dirname, 'CSVFiles'))
+    years = [year for year in years if os.path.isdir(os.path.join(csv_root, str(year)))]
+    if processes == 1 or len(years) <= 1:
+        return [clean_year(year, **kwargs) for year in years]
 
+    with ProcessPoolExecutor(max_workers=min(processes or len(years), len(years))) as executor:
+        futures = [executor.submit(clean_year, year, **kwargs) for year in years]
+        return [future.result() for future in futures]
 
-# Run the process to delete the files that do not contain relevant data for our analysis
-for file in os.listdir(csv_loc):
-    valid_csv_sniffer(file, csv_loc)
 
-# Merge the clean CSV files to a unique csv file.
-combined_csvs = pd.concat([read_dataframe(os.path.join(csv_loc, f)) for f in os.listdir(csv_loc)])
+if __name__ == '__main__':
+    args = parser.parse_args()
+    years = parse_years(args.years)
 
-# Create a csv file
-if not os.path.exists(os.path.join(dirname, 'Merged_CSVs')):
-    os.mkdir(os.path.join(dirname, 'Merged_CSVs'))
+    start = time.perf_counter()
+    all_stats = clean_years(years, processes=args.processes, max_workers=args.workers, full=args.full)
+    for stats in all_stats:
+        print(f"{stats['year']}: merged {stats['files']} files ({stats['parsed']} added or modified, "
+              f"{stats['removed']} removed), {stats['rows']} rows in {stats['seconds']:.1f}s")
 
-combined_csvs.to_csv(f"Merged_CSVs\\Comtrade_Vacciness_Data_{args.year}", index=False)
+    missing = sorted(set(years) - {stats['year'] for stats in all_stats})
+    if missing:
+        print(f'No downloaded files for the years: {missing}')
+    print(f'Total: {sum(stats["rows"] for stats in all_stats)} rows in {time.perf_counter() - start:.1f}s')
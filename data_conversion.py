@@ -0,0 +1,34 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    data_conversion.py
+-- Purpose: Convert the merged CSV files (output of data_cleaning.py) into a typed, columnar
+            Parquet store partitioned by year, which is the input of the analysis and the dashboard.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import time
+import argparse
+
+from utilities import data_store
+
+dirname = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser(description='Converts the merged CSV files to a Parquet store')
+parser.add_argument('--csv-folder', type=str, default=os.path.join(dirname, 'Merged_CSVs'),
+                    help='Folder that contains the merged CSV files')
+parser.add_argument('--store-folder', type=str, default=os.path.join(dirname, 'Parquet_Store'),
+                    help='Folder where the Parquet partitions will be written')
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store_files = data_store.convert_csvs_to_store(args.csv_folder, args.store_folder)
+    for year, path in store_files.items():
+        print(f'{year}: {path}')
+    print(f'\nConverted {len(store_files)} years in {time.perf_counter() - start:.2f}s')
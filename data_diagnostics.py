@@ -0,0 +1,50 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    data_diagnostics.py
+-- Purpose: Stationarity and autocorrelation diagnostics of the monthly imports of every pair
+            of countries with enough history, written to a single table without any plot.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import time
+import argparse
+
+from utilities import data_loader, diagnostics
+
+dirname = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser(description='Computes the diagnostics of the time series of all the pairs of countries')
+parser.add_argument('--col', type=str, default='Trade Value (US$)',
+                    help='Feature of the time series')
+parser.add_argument('--window', type=int, default=12,
+                    help='Size of the rolling window of the mean and the standard deviation')
+parser.add_argument('--nlags', type=int, default=24,
+                    help='Number of lags of the ACF and the PACF')
+parser.add_argument('--min-months', type=int, default=36,
+                    help='Smallest number of months with trade of a series')
+parser.add_argument('--processes', type=int, default=None,
+                    help='Number of processes (by default one per core)')
+parser.add_argument('--out-folder', type=str, default=os.path.join(dirname, 'Diagnostics'),
+                    help='Folder where the diagnostics table is written')
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = data_loader.load_trade_data(dirname)
+    diagnostics_df, skipped = diagnostics.diagnose_pairs(df, layer=args.col, min_months=args.min_months,
+                                                         window=args.window, nlags=args.nlags,
+                                                         processes=args.processes)
+
+    os.makedirs(args.out_folder, exist_ok=True)
+    out_path = os.path.join(args.out_folder, 'diagnostics.parquet')
+    diagnostics_df.to_parquet(out_path, engine='pyarrow', index=False)
+
+    print(f"{len(diagnostics_df)} pairs ({diagnostics_df['Stationary'].sum()} stationary at 5%), "
+          f"{len(skipped)} skipped")
+    print(f'\nDiagnostics: {out_path}\nFinished in {time.perf_counter() - start:.2f}s')
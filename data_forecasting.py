@@ -0,0 +1,87 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    data_forecasting.py
+-- Purpose: Forecast the monthly imports of every pair of countries with enough history, in
+            parallel, and write a table with the forecasts and the RMSE of every pair.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import time
+import shutil
+import argparse
+
+from utilities import data_loader, forecasting, lstm_forecast, model_registry
+
+dirname = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser(description='Forecasts the imports of all the pairs of countries')
+parser.add_argument('--model', type=str, default='hwes',
+                    choices=list(forecasting.forecast_models_dict) + ['lstm'],
+                    help='Model fitted to every series (lstm: one network for all the series)')
+parser.add_argument('--col', type=str, default='Trade Value (US$)',
+                    help='Feature to forecast')
+parser.add_argument('--test-months', type=int, default=12,
+                    help='Number of months kept as test set and forecasted')
+parser.add_argument('--min-months', type=int, default=36,
+                    help='Smallest number of months with trade of a series')
+parser.add_argument('--processes', type=int, default=None,
+                    help='Number of processes (by default one per core)')
+parser.add_argument('--chunk-size', type=int, default=32,
+                    help='Number of pairs fitted by a task')
+parser.add_argument('--epochs', type=int, default=500,
+                    help='Training epochs of the lstm model')
+parser.add_argument('--cache-future', action='store_true',
+                    help='Also forecast the months after the data of every pair, and store the models and the '
+                         'forecasts in the model registry (read by the dashboard)')
+parser.add_argument('--registry', type=str, default=os.path.join(dirname, 'Model_Registry'),
+                    help='Folder of the model registry')
+parser.add_argument('--out-folder', type=str, default=os.path.join(dirname, 'Forecasts'),
+                    help='Folder where the forecasts (and the checkpoint of an unfinished run) are written')
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = data_loader.load_trade_data(dirname)
+    if args.model == 'lstm':
+        os.makedirs(args.out_folder, exist_ok=True)
+        forecasts_df, skipped = lstm_forecast.forecast_pairs_lstm(df, layer=args.col,
+                                                                  num_months_test=args.test_months,
+                                                                  min_months=args.min_months,
+                                                                  epochs=args.epochs)
+    else:
+        checkpoint_folder = os.path.join(args.out_folder, f'.checkpoint_{args.model}')
+        forecasts_df, skipped = forecasting.forecast_pairs(df, model=args.model, layer=args.col,
+                                                           num_months_test=args.test_months,
+                                                           min_months=args.min_months,
+                                                           processes=args.processes,
+                                                           chunk_size=args.chunk_size,
+                                                           checkpoint_folder=checkpoint_folder,
+                                                           data_fingerprint=data_loader.data_fingerprint(dirname))
+
+    out_path = os.path.join(args.out_folder, f'forecasts_{args.model}.parquet')
+    forecasts_df.to_parquet(out_path, engine='pyarrow', index=False)
+    if args.model != 'lstm':
+        # The run is complete, so the next run starts from scratch
+        shutil.rmtree(checkpoint_folder)
+
+    rmse = forecasts_df.groupby(['Importer', 'Exporter'])['RMSE'].first()
+    print(f'{len(rmse)} pairs forecasted ({rmse.isna().sum()} failed fits), {len(skipped)} skipped')
+    for reason in sorted(set(skipped.values())):
+        print(f'  {reason}: {sum(value == reason for value in skipped.values())} pairs')
+    print(f'Median RMSE: {rmse.median():.2f}')
+
+    if args.cache_future:
+        registry = model_registry.ModelRegistry(args.registry)
+        model_params = {'epochs': args.epochs} if args.model == 'lstm' else {}
+        counts = model_registry.cache_pair_forecasts(df, registry, model=args.model, layer=args.col,
+                                                     min_months=args.min_months, horizon=args.test_months,
+                                                     **model_params)
+        print(f"Future forecasts: {counts['fitted']} pairs fitted, {counts['cached']} already in the "
+              f"registry, {counts['failed']} failed fits")
+    print(f'\nForecasts: {out_path}\nFinished in {time.perf_counter() - start:.2f}s')
@@ -0,0 +1,38 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    data_layouts.py
+-- Purpose: Precompute the positions of the nodes of the import network of every reporter
+            over a process pool, so that the Dash application only loads them.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import time
+import argparse
+
+from utilities import data_loader
+from utilities.network_layouts import build_layouts, layouts_file
+
+dirname = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser(description='Computes the layouts of the import networks of all the countries')
+parser.add_argument('--seed', type=int, default=42,
+                    help='Seed of the spring layouts')
+parser.add_argument('--processes', type=int, default=None,
+                    help='Number of processes (by default one per core)')
+parser.add_argument('--out', type=str, default=os.path.join(dirname, layouts_file),
+                    help='Path of the .npz file of the layouts')
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = data_loader.load_trade_data(dirname)
+    network_layouts = build_layouts(df, args.out, seed=args.seed, n_jobs=args.processes)
+
+    print(f'{len(network_layouts.countries)} layouts ({len(network_layouts.nodes)} nodes)')
+    print(f'\nLayouts: {args.out}\nFinished in {time.perf_counter() - start:.2f}s')
@@ -0,0 +1,47 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    data_reconciliation.py
+-- Purpose: Reconcile the mirror flows of the whole dataset (a trade reported by both the
+            importer and the exporter is counted once), and write the clean edge table and a
+            report of the data quality anomalies.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import time
+import argparse
+
+from utilities import data_loader, reconciliation
+from utilities.edge_table import reconciliation_policies_ls
+
+dirname = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser(description='Reconciles the mirror flows and reports the anomalies of the data')
+parser.add_argument('--policy', type=str, default='importer', choices=reconciliation_policies_ls,
+                    help='Values used when both countries reported a trade')
+parser.add_argument('--out-folder', type=str, default=os.path.join(dirname, 'Reconciled_Edges'),
+                    help='Folder where the edge table and the anomaly report will be written')
+parser.add_argument('--max-mirror-ratio', type=float, default=2.0,
+                    help='Largest accepted ratio between the trade values of the mirror reports')
+parser.add_argument('--outlier-threshold', type=float, default=3.5,
+                    help='Largest accepted modified z-score of the (log) value per kg within a year')
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = data_loader.load_trade_data(dirname)
+    summary = reconciliation.run_reconciliation(df, args.out_folder, policy=args.policy,
+                                                max_mirror_ratio=args.max_mirror_ratio,
+                                                outlier_threshold=args.outlier_threshold)
+
+    print(f"{summary['records']} records --> {summary['edges']} edges "
+          f"({summary['mirror_pairs']} reported by both countries, policy: {args.policy})")
+    for flag in reconciliation.anomaly_flags_ls:
+        print(f'{flag}: {summary[flag]} edges')
+    print(f"\nEdge table: {summary['edges_path']}\nAnomaly report: {summary['report_path']}")
+    print(f'Finished in {time.perf_counter() - start:.2f}s')
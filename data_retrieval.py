@@ -9,96 +9,281 @@
 """
 
 # Import dependencies
-from typing import List
-import requests
-import csv
-import json
-import time
+from typing import Dict, List, Optional, Tuple
+from datetime import date
 import os
+import time
 import argparse
 
+import pandas as pd
+
+from utilities import comtrade_api, request_planner
+from utilities.fetch_manifest import FetchManifest, csv_periods, file_sha256, status_done, status_failed
+
 parser = argparse.ArgumentParser(description='Provided list of years to retrieve data for')
 
 # Provide as input a list of years
 parser.add_argument('-years', '--arg', nargs='+', type=int, dest='years')
-args = parser.parse_args()
-print('List of years provided {}\n\n Initiating data retrieval process...\n\n'.format(args.years))
+parser.add_argument('--workers', type=int, default=4, help='Number of concurrent API calls')
+parser.add_argument('--requests-per-second', type=float, default=comtrade_api.requests_per_second,
+                    help='Rate limit of the API calls per second')
+parser.add_argument('--requests-per-hour', type=float, default=comtrade_api.requests_per_hour,
+                    help='Rate limit of the API calls per hour')
+parser.add_argument('--base-url', type=str, default=comtrade_api.api_url,
+                    help='URL of the API (e.g. a local server for testing)')
+parser.add_argument('--reporters-url', type=str, default=comtrade_api.reporters_url,
+                    help='URL of the list of the reporter countries')
+parser.add_argument('--manifest', type=str, default=None,
+                    help='Path of the manifest of the calls (default: CSVFiles/fetch_manifest.sqlite)')
+parser.add_argument('--incremental', action='store_true',
+                    help='Only fetch the months after the last month already received per reporter')
+parser.add_argument('--force', action='store_true', help='Fetch again the calls that were already completed')
+parser.add_argument('--dry-run', action='store_true',
+                    help='Print the planned calls and the expected duration, without fetching any data')
 
 # Get the data as separate csv files, each for every year of interest
-outputFilesFolder = f'CSVFiles\\'
+outputFilesFolder = 'CSVFiles'
 
 # Setting up the parameters for the API calls to receive the data
 # Reference: https://comtrade.un.org/data/doc/api/#DataAvailabilityRequests
+# The parameters that are common to all the calls are defined in comtrade_api.default_params:
+#   max=100000, type='C' (Commodities), freq='M' (Monthly), px='HS' (Classification for products),
+#   cc=300220 (Subcategory --> 300220 code for Vaccines), p='all', rg='all', fmt='csv'
+
+
+def output_file_path(reportername: str, year: int, out_folder: str) -> str:
+    return os.path.join(out_folder, f'{year}', f'Comtrade_Vaccines_Data_{reportername}_{year}.csv')
+
+
+def update_file_path(reportername: str, months: List[str], out_folder: str) -> str:
+    return os.path.join(out_folder, 'Updates', f'Comtrade_Vaccines_Data_{reportername}_{months[0]}_{months[-1]}.csv')
+
+
+def month_periods(year: int, after: Optional[str] = None, today: Optional[date] = None) -> List[str]:
+    """
+    Monthly periods (e.g. '201903') of a year that are after a given period and not in the future.
+    """
+    today = today if today is not None else date.today()
+    last_month = 12 if year < today.year else (today.month if year == today.year else 0)
+    months = [f'{year}{month:02d}' for month in range(1, last_month + 1)]
+    return [month for month in months if after is None or month > after]
+
+
+def plan_jobs(reporters: List[dict], years: List[int], out_folder: str, manifest: FetchManifest,
+              incremental: bool = False, force: bool = False, today: Optional[date] = None) -> List[dict]:
+    """
+    Create the list of the calls that need to be made. The calls that were completed in a
+    previous run (and whose files are unchanged) are skipped. In incremental mode the
+    completed calls are refreshed with a call for only the months after the last month
+    that was received.
+
+    Args:
+    ----
+        reporters: List of {'id': reporter id, 'text': reporter name} of the countries of interest.
+        years: Years of interest.
+        out_folder: Folder where a sub-folder per year will be created.
+        manifest: FetchManifest with the calls of the previous runs.
+        incremental: Fetch the newest months of the completed calls.
+        force: Fetch again the completed calls.
+        today: Date used to find the latest month (default: today).
+    Returns:
+    -------
+        jobs: List of {'params', 'path', 'name', 'reporter_id', 'reporter', 'year', 'target'},
+              where target is the file of the reporter and year. An update call is downloaded
+              to path and then merged into target.
+    """
+    jobs = []
+    for year in years:
+        for reporter in reporters:
+            reporter_id, reportername = str(reporter['id']), reporter['text']
+            target = output_file_path(reportername, year, out_folder)
+            job = {'params': comtrade_api.request_params(reporter_id, str(year)), 'path': target,
+                   'name': f'{reportername} ({year})', 'reporter_id': reporter_id,
+                   'reporter': reportername, 'year': year, 'target': target}
+
+            if not force and manifest.is_done(reporter_id, year):
+                if not incremental:
+                    continue
+                entry = manifest.get(reporter_id, year)
+                months = month_periods(year, after=entry.last_period, today=today)
+                if not months:
+                    continue
+                # A reporter without any data for the year is asked for the whole year again
+                if entry.last_period is not None and len(months) <= request_planner.max_periods_per_call:
+                    job.update(params=comtrade_api.request_params(reporter_id, ','.join(months)),
+                               path=update_file_path(reportername, months, out_folder),
+                               name=f'{reportername} ({months[0]}-{months[-1]})')
+            jobs.append(job)
+    return jobs
+
+
+def read_dataframe(filepath: str) -> pd.core.frame.DataFrame:
+    try:
+        return pd.read_csv(filepath, dtype=str, keep_default_na=False, encoding='utf-8')
+    except UnicodeDecodeError:
+        return pd.read_csv(filepath, dtype=str, keep_default_na=False, encoding='latin-1')
+
+
+def merge_update(target: str, update_path: str) -> List[str]:
+    """
+    Merge the CSV of an update call into the CSV of the reporter and year: the rows of the
+    months in the update replace the rows of the same months in the target file.
+
+    Returns:
+    -------
+        periods: Periods contained in the merged file.
+    """
+    update_periods = csv_periods(update_path)
+    target_periods = csv_periods(target)
+    if not update_periods:
+        os.remove(update_path)
+        return target_periods
+    if not target_periods:
+        os.replace(update_path, target)
+        return update_periods
+
+    target_df = read_dataframe(target)
+    update_df = read_dataframe(update_path)
+    merged_df = pd.concat([target_df[~target_df['Period'].isin(update_periods)], update_df], ignore_index=True)
+    merged_df = merged_df.sort_values('Period', kind='stable')
+
+    tmp_path = f'{target}.part'
+    merged_df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, target)
+    os.remove(update_path)
+    return sorted(set(target_periods) | set(update_periods))
 
-max_rec = 100000
-output_fmt = 'csv'
-trade_type = 'C'            # Commodities
-frequency = 'M'             # Monthly
-px = 'HS'                   # Classification for products
-cc = 300220                 # Subcategory --> 300220 code for Vaccines
-reporter = 'all'
-partner = 'all'                 # world
-rg ='all'
 
-# Connection string to comtrade.un.org based on the parameters above
-api_call_string = f'http://comtrade.un.org/api/get?max={max_rec}&type={trade_type}&freq={frequency}&px={px}&ps=year&r=reporter&p={partner}&rg={rg}&cc={cc}&fmt={output_fmt}'
+def split_response(path: str, members: List[dict]) -> Dict[Tuple[str, int], List[str]]:
+    """
+    Split the CSV of a call for several reporters and years into the CSV file of every
+    (reporter, year). No file is written for the reporters and years without data.
+
+    Returns:
+    -------
+        periods: Dictionary of {(reporter id, year): periods contained in the file}.
+    """
+    periods = {(member['reporter_id'], member['year']): [] for member in members}
+    if csv_periods(path):
+        response_df = read_dataframe(path)
+        targets = {(member['reporter_id'], member['year']): member['target'] for member in members}
+        reporter_codes = response_df['Reporter Code'].astype(int).astype(str)
+        years = response_df['Year'].astype(int)
+        for (reporter_id, year), member_df in response_df.groupby([reporter_codes, years], sort=False):
+            if (reporter_id, year) not in targets:
+                continue
+            target = targets[(reporter_id, year)]
+            os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+            member_df.to_csv(f'{target}.part', index=False)
+            os.replace(f'{target}.part', target)
+            periods[(reporter_id, year)] = sorted(member_df['Period'].unique())
+    os.remove(path)
+    return periods
 
 
-def collect_data(api_string: str, reporterid: str, reportername: str, year: int, out_folder: str) -> None:
+def collect_data(fetcher: comtrade_api.ComtradeFetcher, requests: List[dict],
+                 manifest: FetchManifest, out_folder: str) -> List[comtrade_api.FetchResult]:
     """
-    Create a CSV file that contains the monthly data as received from  https://comtrade.un.org/Data/, for a specified year.
+    Create a CSV file per reporter and year that contains the monthly data as received from
+    https://comtrade.un.org/Data/. The calls run concurrently within the rate limits of the API,
+    the failed calls are retried, and the outcome of every (reporter, year) is stored in the
+    manifest. A call whose response reached the record limit of the API is split and made again.
 
     Args:
     ----
-        api_string: String that contains the URL for the API call. The string already contains all the paremeters required for the call.
-        reporterid, reportername: Id and Name of the country of interest.
-        year: Specify year of interest.
+        fetcher: ComtradeFetcher used for the API calls.
+        requests: Calls to make, as created by request_planner.plan_requests().
+        manifest: FetchManifest where the calls are recorded.
+        out_folder: Folder of the temporary files of the split calls.
     Returns:
     -------
-        None: The output is a .csv file that contains the data for a specified country/year.
+        results: FetchResult of every call, including the calls that were split.
     """
-    csv_by_year_out_loc = os.path.join(out_folder, f'{year}')
-    if not os.path.exists(csv_by_year_out_loc):
-        os.makedirs(name=csv_by_year_out_loc)
+    for request in requests:
+        for job in request['members']:
+            manifest.mark_pending(job['reporter_id'], job['reporter'], job['year'], job['target'])
+
+    def record_failure(request, result, error):
+        print(f"Could not access the API for {request['name']}: {error}")
+        for job in request['members']:
+            manifest.record(job['reporter_id'], job['year'], status_failed, attempts=result.attempts, error=error)
+
+    def record(request, result):
+        if not result.ok:
+            record_failure(request, result, result.error)
+            return
 
-    api_string = api_string.replace('year', f'{year}').replace('reporter', f'{reporterid}')
-    print(api_string)
+        if request_planner.count_rows(request['path']) >= request_planner.max_records:
+            sub_requests = request_planner.split_request(request, out_folder)
+            if not sub_requests:
+                record_failure(request, result, 'Response truncated at the record limit of the API')
+                return
+            print(f"The response for {request['name']} was truncated, splitting the call in {len(sub_requests)}")
+            os.remove(request['path'])
+            next_requests.extend(sub_requests)
+            return
 
-    response = requests.get(url=api_string, verify=False)
+        print(f"Received the data for {request['name']}: {result.n_bytes} bytes")
+        job = request['members'][0]
+        if len(request['members']) > 1:
+            periods = split_response(request['path'], request['members'])
+        elif request['path'] != job['target']:
+            periods = {(job['reporter_id'], job['year']): merge_update(job['target'], request['path'])}
+        else:
+            periods = {(job['reporter_id'], job['year']): csv_periods(job['target'])}
 
-    if response.status_code != 200:
-        print('Could not access the API!')
-    else:
-        decoded_data = response.content.decode('utf-8')
-        csv_file = csv.reader(decoded_data.splitlines())
-        datalines = list(csv_file)
+        for job in request['members']:
+            job_periods = periods[(job['reporter_id'], job['year'])]
+            has_file = bool(job_periods) or request['path'] == job['target']
+            sha256 = result.sha256 if request['path'] == job['target'] else (file_sha256(job['target']) if has_file else None)
+            manifest.record(job['reporter_id'], job['year'], status_done, attempts=result.attempts,
+                            n_bytes=os.path.getsize(job['target']) if has_file else 0, sha256=sha256,
+                            last_period=job_periods[-1] if job_periods else None)
 
-        with open(os.path.join(csv_by_year_out_loc, f'Comtrade_Vaccines_Data_{reportername}_{year}.csv'), 'w', newline='') as f:
-            writer = csv.writer(f, delimiter=',')
-            writer.writerows(datalines)
+    results = []
+    while requests:
+        next_requests: List[dict] = []
+        results += fetcher.fetch_all(requests, on_result=record)
+        requests = next_requests
+    return results
 
 
-# Retrieve the data
+if __name__ == '__main__':
+    args = parser.parse_args()
+    print('List of years provided {}\n\n Initiating data retrieval process...\n\n'.format(args.years))
 
-# Because the API doesn not allow to call multiple countries as a Reporter in one call, we will need to create
-# separate calls for each country.
+    # The calls of the last hour (also by previous runs) count towards the hourly quota
+    manifest = FetchManifest(args.manifest or os.path.join(outputFilesFolder, 'fetch_manifest.sqlite'))
+    rate_limiter = comtrade_api.RateLimiter.for_quota(per_second=args.requests_per_second,
+                                                       per_hour=args.requests_per_hour,
+                                                       history=manifest.recent_calls(time.time()),
+                                                       on_call=manifest.record_call)
+    fetcher = comtrade_api.ComtradeFetcher(base_url=args.base_url, max_workers=args.workers,
+                                           rate_limiter=rate_limiter, verify=False)
 
-# Receive the list of countries and their respective IDs as described in https://comtrade.un.org/Data/cache/reporterAreas.json
+    # Receive the list of countries and their respective IDs as described in https://comtrade.un.org/Data/cache/reporterAreas.json
+    json_data = fetcher.get_json(args.reporters_url)
+    reporters_list = [rep for rep in json_data['results']]
 
-reporters_url = 'https://comtrade.un.org/Data/cache/partnerAreas.json'
-reporters_resp = requests.get(url=reporters_url, verify=False)
-json_data = json.loads(reporters_resp.text)
+    jobs = plan_jobs(reporters_list, args.years, outputFilesFolder, manifest,
+                     incremental=args.incremental, force=args.force)
+    previous_bytes = {(entry.reporter_id, entry.year): entry.n_bytes for entry in manifest.entries()
+                      if entry.n_bytes}
+    requests = request_planner.plan_requests(jobs, outputFilesFolder, n_bytes=previous_bytes)
+    wall_time = request_planner.estimate_wall_time(len(requests), args.requests_per_second,
+                                                   args.requests_per_hour, args.workers,
+                                                   recent_calls=len(manifest.recent_calls(time.time())))
+    print(f'{len(jobs)} reporters/years to fetch ({len(reporters_list) * len(args.years) - len(jobs)} already completed) '
+          f'in {len(requests)} calls, expected duration {wall_time / 60:.1f} minutes\n')
+    if args.dry_run:
+        for request in requests:
+            print(f"  {request['name']}")
+        raise SystemExit(0)
 
-reporters_list = [rep for rep in json_data['results']]
+    results = collect_data(fetcher, requests, manifest, outputFilesFolder)
+    fetcher.close()
 
-for api_check, reporter in enumerate(reporters_list):
-    # Need to make the script to sleep every 100 calls, as the API is blocking us for an hour for every 100 calls.
-    if api_check !=0 and api_check % 100 == 0:
-        time.sleep(3600)
-    countryname = reporter['text']
-    country_id = reporter['id']
-    print(f'\nCountry..: {countryname}')
-    for year in args.years:
-        print(f'\nReceiving the data for {year} from https://comtrade.un.org/...\n')
-        collect_data(api_call_string, reporterid=country_id, reportername=countryname, year=year, out_folder=outputFilesFolder)
-        time.sleep(6)
+    failed = [result for result in results if not result.ok]
+    print(f'\nFinished: {len(results) - len(failed)} calls succeeded, {len(failed)} failed.')
+    print(f'Manifest: {manifest.status_counts()}')
+    manifest.close()
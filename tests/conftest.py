@@ -0,0 +1,61 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    conftest.py
+-- Purpose: Fixtures shared by the tests: a small project folder with merged CSV files of
+            synthetic trade data.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utilities import data_loader, data_store
+
+countries_dict = {36: 'Australia', 76: 'Brazil', 250: 'France', 826: 'United Kingdom',
+                  842: 'United States of America'}
+
+
+def synthetic_trade_df(years=(2017, 2018, 2019), seed: int = 0) -> pd.core.frame.DataFrame:
+    """
+    Monthly imports and exports (in the columns of the merged CSV files) between every
+    pair of countries, with a seasonal trade value and a few months without trade.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for year in years:
+        for month in range(1, 13):
+            for reporter_code, reporter in countries_dict.items():
+                for partner_code, partner in countries_dict.items():
+                    if partner_code == reporter_code or rng.random() < 0.1:
+                        continue
+                    flow = 'Imports' if rng.random() < 0.7 else 'Exports'
+                    value = int(1000 * (1 + reporter_code % 7) * (1.5 + np.sin(month / 2)) + rng.integers(0, 500))
+                    rows.append({'Year': year, 'Period': f'{year}{month:02d}', 'Trade Flow': flow,
+                                 'Reporter Code': reporter_code, 'Reporter': reporter,
+                                 'Partner Code': partner_code, 'Partner': partner,
+                                 'Commodity': 'Vaccines; for human medicine',
+                                 'Netweight (kg)': value / 50.0, 'Trade Value (US$)': value})
+        rows.append({'Year': year, 'Period': f'{year}01', 'Trade Flow': 'Imports', 'Reporter Code': 36,
+                     'Reporter': 'Australia', 'Partner Code': 0, 'Partner': 'World',
+                     'Commodity': 'Vaccines; for human medicine', 'Netweight (kg)': 1.0,
+                     'Trade Value (US$)': 10})
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def trade_project(tmp_path):
+    """
+    Project folder with a 'Merged_CSVs' folder of synthetic data (one file per year).
+    """
+    csv_folder = tmp_path / 'Merged_CSVs'
+    csv_folder.mkdir()
+    for year, year_df in synthetic_trade_df().groupby('Year'):
+        year_df.to_csv(os.path.join(csv_folder, f'{data_store.merged_csv_prefix}{year}'), index=False)
+    yield str(tmp_path)
+    data_loader.clear_cache()
@@ -0,0 +1,74 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    test_comtrade_api.py
+-- Purpose: Tests of the rate limits of the Comtrade client, with a fake clock.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import bisect
+
+from utilities.comtrade_api import RateLimiter
+from utilities.fetch_manifest import FetchManifest
+
+
+class FakeClock:
+    """
+    Clock whose time only moves when the code under test sleeps.
+    """
+
+    def __init__(self, start: float = 1_700_000_000.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def max_calls_in_window(timestamps, window: float = 3600) -> int:
+    timestamps = sorted(timestamps)
+    return max(bisect.bisect_left(timestamps, t + window) - i for i, t in enumerate(timestamps))
+
+
+def test_hourly_quota_is_never_exceeded():
+    clock = FakeClock()
+    limiter = RateLimiter.for_quota(per_second=1, per_hour=100, clock=clock, sleep=clock.sleep)
+
+    calls = []
+    for _ in range(450):
+        limiter.acquire()
+        calls.append(clock())
+
+    assert max_calls_in_window(calls) <= 100
+    # The first hour makes exactly the quota, without a burst on top of it
+    assert sum(call < calls[0] + 3600 for call in calls) == 100
+    # ... and at most one call per second
+    assert min(b - a for a, b in zip(calls, calls[1:])) >= 1 - 1e-9
+
+
+def test_restarted_run_keeps_to_the_quota(tmp_path):
+    clock = FakeClock()
+    manifest = FetchManifest(str(tmp_path / 'fetch_manifest.sqlite'))
+
+    first_run = RateLimiter.for_quota(per_second=1, per_hour=100, clock=clock, sleep=clock.sleep,
+                                      history=manifest.recent_calls(clock()), on_call=manifest.record_call)
+    calls = []
+    for _ in range(60):
+        first_run.acquire()
+        calls.append(clock())
+    clock.sleep(30)
+
+    # A new process starts from the calls recorded by the first one
+    second_run = RateLimiter.for_quota(per_second=1, per_hour=100, clock=clock, sleep=clock.sleep,
+                                       history=manifest.recent_calls(clock()), on_call=manifest.record_call)
+    for _ in range(200):
+        second_run.acquire()
+        calls.append(clock())
+
+    assert len(manifest.recent_calls(clock(), window=86400)) == 260
+    assert max_calls_in_window(calls) <= 100
+    manifest.close()
@@ -0,0 +1,44 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    test_country_index.py
+-- Purpose: Tests of the country index that is shared by the objects created on the
+            dataframe of the data loader.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import numpy as np
+import pytest
+
+from utilities import data_loader
+from utilities.country_index import CountryIndex
+from VaccinesTradeNetworkClass import VaccinesTradeNetwork
+
+
+@pytest.mark.parametrize('copy_on_write', [True, False])
+def test_instances_share_one_index(trade_project, monkeypatch, copy_on_write):
+    # Without copy-on-write the loader returns deep copies, which must still share the index
+    monkeypatch.setattr(data_loader, '_copy_on_write_enabled', lambda: copy_on_write)
+    df = data_loader.load_trade_data(trade_project)
+
+    uk = VaccinesTradeNetwork(df, country='United Kingdom')
+    usa = VaccinesTradeNetwork(df, country='USA')
+    assert uk.country_index is usa.country_index
+
+    # ... also between the frames of two calls of the loader
+    other = VaccinesTradeNetwork(data_loader.load_trade_data(trade_project), country='France')
+    assert other.country_index is uk.country_index
+
+
+def test_other_frames_get_their_own_index(trade_project):
+    df = data_loader.load_trade_data(trade_project)
+    recent_df = df[df['Year'] == 2019]
+    assert data_loader.loaded_frame_fingerprint(recent_df) is None
+    assert CountryIndex.for_frame(recent_df) is not CountryIndex.for_frame(recent_df)
+
+    uk_rows = CountryIndex.for_frame(recent_df).positions_for('United Kingdom')
+    expected = np.flatnonzero(((recent_df['Reporter'] == 'United Kingdom') |
+                               (recent_df['Partner'] == 'United Kingdom')).to_numpy())
+    np.testing.assert_array_equal(uk_rows, expected)
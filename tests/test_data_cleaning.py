@@ -0,0 +1,110 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    test_data_cleaning.py
+-- Purpose: Tests of the incremental merge of the downloaded CSV files against a full rebuild.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import json
+
+import pytest
+
+import data_cleaning
+
+header = 'Classification,Year,Period,Reporter Code,Reporter,Partner,Trade Value (US$)\n'
+
+
+def csv_rows(reporter: str, months, value: int = 100) -> str:
+    return ''.join(f'HS,2019,2019{month:02d},1,{reporter},World,{value * month}\n' for month in months)
+
+
+def write(path: str, content: str, encoding: str = 'utf-8') -> None:
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        f.write(content)
+
+
+def bump_mtime(path: str) -> None:
+    # Make sure that the modification time differs from the one of the previous merge
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def read_bytes(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def csv_folder(tmp_path):
+    folder = tmp_path / 'CSVFiles' / '2019'
+    folder.mkdir(parents=True)
+    write(folder / 'Comtrade_Vaccines_Data_Austria_2019.csv', header + csv_rows('Austria', range(1, 13)))
+    write(folder / 'Comtrade_Vaccines_Data_Belgium_2019.csv', header + csv_rows('Belgium', range(1, 7)))
+    # Different column order (parsed and aligned) and encoding
+    write(folder / 'Comtrade_Vaccines_Data_Cote_2019.csv',
+          'Year,Classification,Period,Reporter Code,Reporter,Partner,Trade Value (US$)\n'
+          '2019,HS,201903,2,Côte d\'Ivoire,World,5\n', encoding='latin-1')
+    # No data, deleted by the merge
+    write(folder / 'Comtrade_Vaccines_Data_Denmark_2019.csv', 'No data matches your query or your query is too complex.\n')
+    return str(folder)
+
+
+def assert_same_as_full_merge(csv_folder: str, output_path: str) -> None:
+    rebuilt_path = f'{output_path}_rebuilt'
+    data_cleaning.merge_csvs(csv_folder, rebuilt_path, max_workers=2, full=True)
+    assert read_bytes(output_path) == read_bytes(rebuilt_path)
+
+
+def test_incremental_merge_matches_full_rebuild(csv_folder, tmp_path):
+    output_path = str(tmp_path / 'Merged_CSVs' / 'Comtrade_Vacciness_Data_2019')
+
+    stats = data_cleaning.merge_csvs(csv_folder, output_path, max_workers=2)
+    assert (stats['files'], stats['parsed'], stats['removed'], stats['rows']) == (3, 3, 0, 19)
+    assert not os.path.exists(os.path.join(csv_folder, 'Comtrade_Vaccines_Data_Denmark_2019.csv'))
+    with open(data_cleaning.merge_state_path(output_path), encoding='utf-8') as f:
+        state = json.load(f)
+    assert state['size'] == os.path.getsize(output_path)
+    assert sorted(state['files']) == ['Comtrade_Vaccines_Data_Austria_2019.csv',
+                                      'Comtrade_Vaccines_Data_Belgium_2019.csv',
+                                      'Comtrade_Vaccines_Data_Cote_2019.csv']
+    assert_same_as_full_merge(csv_folder, output_path)
+
+    # Nothing changed: every segment is copied from the previous merged file
+    stats = data_cleaning.merge_csvs(csv_folder, output_path, max_workers=2)
+    assert (stats['parsed'], stats['rows']) == (0, 19)
+
+    # Rows appended to one source: only that file is parsed again
+    belgium = os.path.join(csv_folder, 'Comtrade_Vaccines_Data_Belgium_2019.csv')
+    with open(belgium, 'a', encoding='utf-8', newline='') as f:
+        f.write(csv_rows('Belgium', range(7, 13)))
+    bump_mtime(belgium)
+    stats = data_cleaning.merge_csvs(csv_folder, output_path, max_workers=2)
+    assert (stats['parsed'], stats['rows']) == (1, 25)
+    assert_same_as_full_merge(csv_folder, output_path)
+
+    # A source that shrinks
+    austria = os.path.join(csv_folder, 'Comtrade_Vaccines_Data_Austria_2019.csv')
+    write(austria, header + csv_rows('Austria', range(1, 4)))
+    bump_mtime(austria)
+    stats = data_cleaning.merge_csvs(csv_folder, output_path, max_workers=2)
+    assert (stats['parsed'], stats['rows']) == (1, 16)
+    assert_same_as_full_merge(csv_folder, output_path)
+
+    # A source that changes with the same size, and one that is only touched
+    write(austria, header + csv_rows('Austria', range(1, 4), value=200))
+    bump_mtime(austria)
+    bump_mtime(belgium)
+    stats = data_cleaning.merge_csvs(csv_folder, output_path, max_workers=2)
+    assert stats['parsed'] == 1
+    assert_same_as_full_merge(csv_folder, output_path)
+
+    # A source that is removed, and a new one
+    os.remove(belgium)
+    write(os.path.join(csv_folder, 'Comtrade_Vaccines_Data_Estonia_2019.csv'), header + csv_rows('Estonia', [1, 2]))
+    stats = data_cleaning.merge_csvs(csv_folder, output_path, max_workers=2)
+    assert (stats['files'], stats['parsed'], stats['removed'], stats['rows']) == (3, 1, 1, 6)
+    assert_same_as_full_merge(csv_folder, output_path)
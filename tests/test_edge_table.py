@@ -0,0 +1,43 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    test_edge_table.py
+-- Purpose: Tests of the reconciliation of the mirror flows of the edge table.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import pandas as pd
+import pytest
+
+from utilities.edge_table import build_import_flows, reconcile_import_flows
+
+
+def raw_flows_df() -> pd.core.frame.DataFrame:
+    # France -> UK reported by both (exporter larger), USA -> UK by both (importer larger),
+    # Brazil -> UK only by the exporter and Australia -> UK only by the importer
+    rows = [('United Kingdom', 'France', 'Imports', 100), ('France', 'United Kingdom', 'Exports', 140),
+            ('United Kingdom', 'USA', 'Imports', 300), ('USA', 'United Kingdom', 'Exports', 200),
+            ('Brazil', 'United Kingdom', 'Exports', 50),
+            ('United Kingdom', 'Australia', 'Imports', 70)]
+    return pd.DataFrame({'Reporter': [row[0] for row in rows], 'Partner': [row[1] for row in rows],
+                         'Trade Flow': [row[2] for row in rows],
+                         'Period': pd.Timestamp('2019-01-01'),
+                         'Trade Value (US$)': [row[3] for row in rows],
+                         'Netweight (kg)': [row[3] / 10 for row in rows]})
+
+
+@pytest.mark.parametrize('policy, expected_values, expected_mirror', [
+    ('importer', [70, 50, 100, 300], [False, True, False, False]),
+    ('exporter', [70, 50, 140, 200], [False, True, True, True]),
+    ('mean', [70, 50, 120, 250], [False, True, True, True]),
+    ('max', [70, 50, 140, 300], [False, True, True, False]),
+])
+def test_mirror_flags_the_values_of_the_exporter(policy, expected_values, expected_mirror):
+    edges_df = reconcile_import_flows(build_import_flows(raw_flows_df()), policy=policy)
+    edges_df = edges_df.set_index('Exporter').loc[['Australia', 'Brazil', 'France', 'USA']]
+
+    assert (edges_df['Importer'] == 'United Kingdom').all()
+    assert edges_df['Trade Value (US$)'].tolist() == expected_values
+    assert edges_df['Mirror'].tolist() == expected_mirror
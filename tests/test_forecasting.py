@@ -0,0 +1,78 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    test_forecasting.py
+-- Purpose: Tests of the resume of an interrupted forecasting run from its checkpoint.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from utilities import data_loader, forecasting
+
+run_kwargs = {'num_months_test': 6, 'min_months': 24, 'processes': 1, 'chunk_size': 3}
+
+
+def chunk_files(checkpoint_folder: str):
+    return sorted(name for name in os.listdir(checkpoint_folder) if name.endswith('.parquet'))
+
+
+def test_resumed_run_equals_uninterrupted_run(trade_project, tmp_path, monkeypatch):
+    df = data_loader.load_trade_data(trade_project)
+    checkpoint_folder = str(tmp_path / 'checkpoint')
+    expected_df, expected_skipped = forecasting.forecast_pairs(df, **run_kwargs)
+    assert expected_df[['Importer', 'Exporter']].drop_duplicates().shape[0] > 3 * run_kwargs['chunk_size']
+
+    # Interrupt the run after 3 chunks
+    original_chunk = forecasting.forecast_chunk
+    finished = []
+
+    def interrupted_chunk(*args):
+        if len(finished) == 3:
+            raise KeyboardInterrupt
+        finished.append(1)
+        return original_chunk(*args)
+
+    monkeypatch.setattr(forecasting, 'forecast_chunk', interrupted_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        forecasting.forecast_pairs(df, checkpoint_folder=checkpoint_folder, data_fingerprint='v1', **run_kwargs)
+    assert chunk_files(checkpoint_folder) == ['chunk_000000.parquet', 'chunk_000001.parquet', 'chunk_000002.parquet']
+
+    # Chunks of a pool finish in any order: the resume must not overwrite the chunks after a gap
+    os.remove(os.path.join(checkpoint_folder, 'chunk_000001.parquet'))
+    kept_df = pd.read_parquet(os.path.join(checkpoint_folder, 'chunk_000002.parquet'))
+
+    fitted = []
+
+    def counted_chunk(model, pairs, *args):
+        fitted.extend(pairs)
+        return original_chunk(model, pairs, *args)
+
+    monkeypatch.setattr(forecasting, 'forecast_chunk', counted_chunk)
+    resumed_df, resumed_skipped = forecasting.forecast_pairs(df, checkpoint_folder=checkpoint_folder,
+                                                             data_fingerprint='v1', **run_kwargs)
+
+    pd.testing.assert_frame_equal(resumed_df, expected_df)
+    assert resumed_skipped == expected_skipped
+    # Only the pairs that were not in the checkpoint were fitted again
+    n_pairs = expected_df[['Importer', 'Exporter']].drop_duplicates().shape[0]
+    assert len(fitted) == n_pairs - 2 * run_kwargs['chunk_size']
+    pd.testing.assert_frame_equal(pd.read_parquet(os.path.join(checkpoint_folder, 'chunk_000002.parquet')), kept_df)
+
+
+def test_checkpoint_of_another_configuration_is_rejected(trade_project, tmp_path):
+    df = data_loader.load_trade_data(trade_project)
+    checkpoint_folder = str(tmp_path / 'checkpoint')
+    forecasting.forecast_pairs(df, pairs=[('United Kingdom', 'France')], checkpoint_folder=checkpoint_folder,
+                               data_fingerprint='v1', **run_kwargs)
+
+    with pytest.raises(ValueError, match='different configuration'):
+        forecasting.forecast_pairs(df, checkpoint_folder=checkpoint_folder, data_fingerprint='v2', **run_kwargs)
+    with pytest.raises(ValueError, match='different configuration'):
+        forecasting.forecast_pairs(df, checkpoint_folder=checkpoint_folder, data_fingerprint='v1',
+                                   **dict(run_kwargs, num_months_test=12))
@@ -0,0 +1,131 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    test_request_planner.py
+-- Purpose: Tests of the planned API calls of data_retrieval.py, made against a local stub
+            of the comtrade.un.org API.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import data_retrieval
+from utilities import comtrade_api, request_planner
+from utilities.fetch_manifest import FetchManifest, status_done
+
+csv_header = 'Classification,Year,Period,Reporter Code,Reporter,Partner Code,Partner,Trade Flow,Trade Value (US$)\n'
+
+reporters_ls = [{'id': str(reporter_id), 'text': f'Country{reporter_id}'} for reporter_id in range(1, 8)]
+years_ls = [2018, 2019]
+
+
+class StubComtrade(ThreadingHTTPServer):
+    """
+    Local API that returns 12 months of data for every reporter and year of a call (except
+    the reporters without data), and fails the first call of some reporters with HTTP 500.
+    """
+
+    def __init__(self, no_data=(), fail_once=()):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.no_data = set(no_data)
+        self.fail_once = set(fail_once)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/api/get'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        reporter_ids, years = query['r'][0].split(','), query['ps'][0].split(',')
+        with self.server.lock:
+            self.server.calls.append((reporter_ids, years))
+            failing = self.server.fail_once & set(reporter_ids)
+            self.server.fail_once -= failing
+
+        if failing:
+            self.send_response(500)
+            self.end_headers()
+            return
+
+        rows = [f'HS,{year},{year}{month:02d},{reporter_id},Country{reporter_id},0,World,Imports,{month * 100}\n'
+                for reporter_id in reporter_ids if reporter_id not in self.server.no_data
+                for year in years for month in range(1, 13)]
+        body = (csv_header + ''.join(rows)).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_api():
+    server = StubComtrade(no_data=['7'], fail_once=['6'])
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def run_retrieval(stub_api, out_folder: str, manifest: FetchManifest):
+    jobs = data_retrieval.plan_jobs(reporters_ls, years_ls, out_folder, manifest)
+    requests = request_planner.plan_requests(jobs, out_folder)
+    fetcher = comtrade_api.ComtradeFetcher(base_url=stub_api.url, max_workers=2,
+                                           rate_limiter=comtrade_api.RateLimiter.for_quota(per_second=1000,
+                                                                                           per_hour=1000),
+                                           sleep=lambda seconds: None)
+    try:
+        results = data_retrieval.collect_data(fetcher, requests, manifest, out_folder)
+    finally:
+        fetcher.close()
+    return jobs, requests, results
+
+
+def test_planned_calls_against_stub_api(stub_api, tmp_path):
+    out_folder = str(tmp_path / 'CSVFiles')
+    manifest = FetchManifest(os.path.join(out_folder, 'fetch_manifest.sqlite'))
+
+    jobs, requests, results = run_retrieval(stub_api, out_folder, manifest)
+
+    # 14 reporters/years in 2 calls of up to 5 reporters and both years
+    assert len(jobs) == len(reporters_ls) * len(years_ls)
+    assert [(request['reporter_ids'], request['periods']) for request in requests] == \
+        [(['1', '2', '3', '4', '5'], ['2018', '2019']), (['6', '7'], ['2018', '2019'])]
+
+    # The call that failed with HTTP 500 is retried once
+    assert sorted(stub_api.calls) == sorted([(['1', '2', '3', '4', '5'], ['2018', '2019'])] +
+                                            [(['6', '7'], ['2018', '2019'])] * 2)
+    assert all(result.ok for result in results)
+    assert sorted(result.attempts for result in results) == [1, 2]
+
+    # Every reporter and year with data gets its own file, and all of them are done
+    for job in jobs:
+        has_data = job['reporter_id'] != '7'
+        assert os.path.exists(job['target']) == has_data
+        entry = manifest.get(job['reporter_id'], job['year'])
+        assert entry.status == status_done
+        assert entry.last_period == (f"{job['year']}12" if has_data else None)
+    assert not os.listdir(os.path.join(out_folder, 'Batches'))
+
+    # A second run has nothing left to fetch
+    n_calls = len(stub_api.calls)
+    jobs, requests, results = run_retrieval(stub_api, out_folder, manifest)
+    assert jobs == [] and requests == [] and results == []
+    assert len(stub_api.calls) == n_calls
+    manifest.close()
@@ -0,0 +1,67 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    test_trade_cube.py
+-- Purpose: Tests of the roll-ups of the trade cube against a groupby of the records.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import pandas as pd
+import pytest
+
+from utilities import data_loader
+from utilities import trade_network_functions as tnf
+from utilities.trade_cube import TradeCube
+
+
+def groupby_statistics(df: pd.core.frame.DataFrame, feature: str, kind: str, year: str) -> pd.core.frame.DataFrame:
+    # Filter and groupby over the records, as tnf.getAggregateStatistics() used to do
+    if year == 'all':
+        return (df.loc[df['Trade Flow'] == kind, [feature, 'Year', 'Reporter']]
+                .groupby(['Year', 'Reporter'], observed=True).agg(['sum']).reset_index())
+    df = (df.loc[(df['Trade Flow'] == kind) & (df['Period'] > f'{year}-01-01') & (df['Period'] <= f'{year}-12-31'),
+                 [feature, 'Reporter']].groupby(['Reporter'], observed=True).agg(['sum']).reset_index())
+    df['Year'] = int(year)
+    return df
+
+
+@pytest.mark.parametrize('feature', ['Trade Value (US$)', 'Netweight (kg)'])
+@pytest.mark.parametrize('kind', ['Imports', 'Exports'])
+@pytest.mark.parametrize('year', ['all', '2018'])
+def test_aggregates_match_groupby(trade_project, feature, kind, year):
+    df = data_loader.load_trade_data(trade_project)
+
+    def by_keys(stats_df):
+        keys = [('Year', ''), ('Reporter', '')]
+        return stats_df.astype({('Reporter', ''): str}).sort_values(keys).reset_index(drop=True)[keys + [(feature, 'sum')]]
+
+    result = tnf.getAggregateStatistics(df, feature=feature, kind=kind, year=year)
+    expected = groupby_statistics(df, feature, kind, year)
+    # Same sums to the last digit, sorted from the largest
+    pd.testing.assert_frame_equal(by_keys(result), by_keys(expected), check_dtype=False)
+    assert result[(feature, 'sum')].is_monotonic_decreasing
+
+
+@pytest.mark.parametrize('copy_on_write', [True, False])
+def test_cube_is_built_once(trade_project, monkeypatch, copy_on_write):
+    monkeypatch.setattr(data_loader, '_copy_on_write_enabled', lambda: copy_on_write)
+    built = []
+    original_init = TradeCube.__init__
+
+    def counting_init(self, *args, **kwargs):
+        built.append(1)
+        original_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(TradeCube, '__init__', counting_init)
+
+    for year in ['all', '2017', '2018', '2019']:
+        tnf.getAggregateStatistics(data_loader.load_trade_data(trade_project), feature='Trade Value (US$)',
+                                   kind='Imports', year=year)
+    assert len(built) == 1
+
+    # A frame that is not the one of the loader is not cached
+    df = data_loader.load_trade_data(trade_project)
+    tnf.getAggregateStatistics(df[df['Year'] == 2019], feature='Trade Value (US$)', kind='Imports', year='2019')
+    assert len(built) == 2
@@ -0,0 +1,219 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    backtesting.py
+-- Purpose: Walk-forward backtests of the forecasting models over many series at once: the
+            folds are arrays of indices, the baselines are computed for all the series and
+            folds together, the fitted models run over a process pool, and RMSE/MAPE are
+            computed in bulk.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utilities.forecasting import forecast_models_dict, select_series
+from utilities.trade_panel import TradePanel
+
+
+def walk_forward_folds(n_steps: int, horizon: int, min_train: int, step: int = 1,
+                       window: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indices of the walk-forward folds of a series with n_steps observations. Fold k is trained
+    on the observations before train_ends[k] and tested on the next horizon observations.
+
+    Args:
+    ----
+        n_steps: Length of the series.
+        horizon: Number of test observations of a fold.
+        min_train: Number of train observations of the first fold.
+        step: Number of observations between the starts of two folds.
+        window: None for an expanding window (the train set starts at 0), or the number of train
+                observations of a rolling window.
+    Returns:
+    -------
+        train_ends: Array of shape (n_folds,) with the (exclusive) end of every train set.
+        test_idx: Array of shape (n_folds, horizon) with the test indices of every fold.
+    """
+    train_ends = np.arange(min_train, n_steps - horizon + 1, step)
+    if window is not None:
+        train_ends = train_ends[train_ends >= window]
+    return train_ends, train_ends[:, None] + np.arange(horizon)
+
+
+def train_index(train_ends: np.ndarray, window: int) -> np.ndarray:
+    """
+    Array of shape (n_folds, window) with the train indices of the rolling window folds.
+    """
+    return train_ends[:, None] - window + np.arange(window)
+
+
+def rmse(actual: np.ndarray, forecast: np.ndarray, axis: int = -1) -> np.ndarray:
+    """
+    Root mean squared error along an axis (by default the horizon), for any number of series
+    and folds at once.
+    """
+    return np.sqrt(np.mean((np.asarray(actual, dtype=np.float64) - forecast) ** 2, axis=axis))
+
+
+def mape(actual: np.ndarray, forecast: np.ndarray, axis: int = -1) -> np.ndarray:
+    """
+    Mean absolute percentage error (in %) along an axis. The observations where the actual
+    value is 0 are left out, and a fold without any non-zero actual value gets NaN.
+    """
+    actual = np.asarray(actual, dtype=np.float64)
+    nonzero = actual != 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        errors = np.where(nonzero, np.abs((actual - forecast) / actual), 0)
+        return 100 * errors.sum(axis=axis) / nonzero.sum(axis=axis)
+
+
+def naive_forecasts(values: np.ndarray, train_ends: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    Last train observation repeated over the horizon, for all the series and folds.
+    Returns an array of shape (n_series, n_folds, horizon).
+    """
+    last = values[:, train_ends - 1].astype(np.float64)
+    return np.repeat(last[:, :, None], horizon, axis=2)
+
+
+def seasonal_naive_forecasts(values: np.ndarray, train_ends: np.ndarray, horizon: int,
+                             seasonal_periods: int = 12) -> np.ndarray:
+    """
+    Observation of the same month of the last train season, for all the series and folds.
+    Returns an array of shape (n_series, n_folds, horizon).
+    """
+    if len(train_ends) and train_ends.min() < seasonal_periods:
+        raise ValueError('The train sets of the folds need at least one season of observations')
+    idx = train_ends[:, None] - seasonal_periods + np.arange(horizon) % seasonal_periods
+    return values[:, idx].astype(np.float64)
+
+
+# Models computed for all the series and folds at once: {name: function(values, train_ends, horizon)}
+baseline_models_dict: Dict[str, Callable[..., np.ndarray]] = {'naive': naive_forecasts,
+                                                              'seasonal_naive': seasonal_naive_forecasts}
+
+
+def fit_folds(model: str, values: np.ndarray, train_ends: np.ndarray, horizon: int,
+              window: Optional[int], model_kwargs: Dict[str, object]) -> np.ndarray:
+    """
+    Fit a model of forecasting.forecast_models_dict on every fold of every series (runs in the
+    workers). A fit that fails gives NaN forecasts.
+
+    Returns:
+    -------
+        forecasts: Array of shape (n_series, n_folds, horizon).
+    """
+    forecast_fn = forecast_models_dict[model]
+    forecasts = np.full((len(values), len(train_ends), horizon), np.nan)
+    for i, series_values in enumerate(values):
+        for k, end in enumerate(train_ends):
+            train = pd.Series(series_values[0 if window is None else end - window:end])
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    forecasts[i, k] = forecast_fn(train, horizon, **model_kwargs)
+            except Exception:
+                pass
+    return forecasts
+
+
+def backtest(values: np.ndarray, models: List[str] = ('naive', 'seasonal_naive', 'hwes'),
+             horizon: int = 12, min_train: int = 36, step: int = 12, window: Optional[int] = None,
+             processes: Optional[int] = None, chunk_size: int = 32,
+             **model_kwargs) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Walk-forward backtest of several models over a batch of series of the same length.
+
+    Args:
+    ----
+        values: Array of shape (n_series, time).
+        models: Names of baseline_models_dict or forecasting.forecast_models_dict.
+        horizon, min_train, step, window: Folds of the backtest (see walk_forward_folds()).
+        processes: Number of processes of the fitted models (all the cores by default,
+                   1 runs in this process).
+        chunk_size: Number of series fitted by a task.
+        model_kwargs: Keyword arguments of the fitted models.
+    Returns:
+    -------
+        results: {model: {'forecasts': (n_series, n_folds, horizon), 'rmse': (n_series, n_folds),
+                 'mape': (n_series, n_folds)}}, plus 'train_ends' with the folds.
+    """
+    values = np.atleast_2d(values)
+    train_ends, test_idx = walk_forward_folds(values.shape[1], horizon, min_train, step, window)
+    actual = values[:, test_idx]
+
+    results = {'train_ends': train_ends}
+    for model in models:
+        if model in baseline_models_dict:
+            forecasts = baseline_models_dict[model](values, train_ends, horizon)
+        elif model in forecast_models_dict:
+            chunks = [values[start:start + chunk_size] for start in range(0, len(values), chunk_size)]
+            if processes == 1 or len(chunks) <= 1:
+                forecasts_ls = [fit_folds(model, chunk, train_ends, horizon, window, model_kwargs)
+                                for chunk in chunks]
+            else:
+                with ProcessPoolExecutor(max_workers=processes) as executor:
+                    futures = [executor.submit(fit_folds, model, chunk, train_ends, horizon, window, model_kwargs)
+                               for chunk in chunks]
+                    forecasts_ls = [future.result() for future in futures]
+            forecasts = np.concatenate(forecasts_ls) if forecasts_ls else np.empty(actual.shape)
+        else:
+            raise ValueError(f'Unknown model {model} - Please pick one of '
+                             f'{list(baseline_models_dict) + list(forecast_models_dict)}')
+
+        results[model] = {'forecasts': forecasts, 'rmse': rmse(actual, forecasts), 'mape': mape(actual, forecasts)}
+    return results
+
+
+def backtest_pairs(df: pd.core.frame.DataFrame, pairs: Optional[List[Tuple[str, str]]] = None,
+                   models: List[str] = ('naive', 'seasonal_naive', 'hwes'), layer: str = 'Trade Value (US$)',
+                   horizon: int = 12, min_train: int = 36, step: int = 12, window: Optional[int] = None,
+                   min_months: int = 36, processes: Optional[int] = None,
+                   **model_kwargs) -> Tuple[pd.core.frame.DataFrame, Dict[Tuple[str, str], str]]:
+    """
+    Walk-forward backtest of several models over the monthly series of the pairs of the panel
+    of a dataframe (see backtest() and forecasting.select_series() for the arguments).
+
+    Returns:
+    -------
+        scores_df: Tidy dataframe with one row per pair, model and fold ('Importer', 'Exporter',
+                   'Model', 'Fold', 'Train End' (first test month), 'RMSE', 'MAPE').
+        skipped: {(importer, exporter): reason} of the pairs that were left out.
+    """
+    panel = TradePanel.for_frame(df)
+    positions, skipped = select_series(panel, pairs, min_months, horizon, layer)
+    results = backtest(panel.layer(layer)[positions], models, horizon, min_train, step, window,
+                       processes, **model_kwargs)
+
+    train_ends = results['train_ends']
+    n_pairs, n_folds = len(positions), len(train_ends)
+    pair_index = panel.pairs[positions]
+    scores_ls = []
+    for model in models:
+        scores_ls.append(pd.DataFrame({'Importer': np.repeat(pair_index.get_level_values(0).astype(str), n_folds),
+                                       'Exporter': np.repeat(pair_index.get_level_values(1).astype(str), n_folds),
+                                       'Model': model,
+                                       'Fold': np.tile(np.arange(n_folds), n_pairs),
+                                       'Train End': np.tile(panel.months[train_ends], n_pairs),
+                                       'RMSE': results[model]['rmse'].ravel(),
+                                       'MAPE': results[model]['mape'].ravel()}))
+    return pd.concat(scores_ls, ignore_index=True), skipped
+
+
+def summarize_backtest(scores_df: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+    """
+    Median RMSE/MAPE of every model over all the pairs and folds, and the share of the
+    pairs where the model has the lowest mean RMSE, sorted from the best model.
+    """
+    pair_rmse = scores_df.groupby(['Importer', 'Exporter', 'Model'], observed=True)['RMSE'].mean().unstack('Model')
+    best = pair_rmse.dropna(how='all').idxmin(axis=1).value_counts(normalize=True)
+    summary_df = scores_df.groupby('Model', observed=True)[['RMSE', 'MAPE']].median()
+    summary_df['Best Share'] = best.reindex(summary_df.index, fill_value=0)
+    return summary_df.sort_values('RMSE')
@@ -0,0 +1,129 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    callback_cache.py
+-- Purpose: Memoization of the outputs of the Dash callbacks, with a bounded in-memory LRU
+            cache and an optional disk cache that can be shared by several server processes.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import pickle
+import hashlib
+import tempfile
+import threading
+import functools
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+_missing = object()
+
+
+class CallbackCache:
+    """
+    Cache of callback results keyed on the callback arguments.
+
+    Results are kept in memory in LRU order, up to maxsize entries. If cache_dir is given the
+    results are also pickled to that folder (up to disk_maxsize files, least recently used
+    files are deleted first), so that the workers of a multi-process server (e.g. gunicorn)
+    reuse each other's results. The namespace (e.g. a fingerprint of the data) is part of
+    every key, so results computed on older data are never returned.
+    """
+
+    def __init__(self, maxsize: int = 128, cache_dir: Optional[str] = None,
+                 disk_maxsize: int = 1024, namespace: str = ''):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self.disk_maxsize = disk_maxsize
+        self.namespace = namespace
+        self._memory: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir is not None and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, name: str, args: Tuple) -> str:
+        return hashlib.sha1(repr((self.namespace, name, args)).encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.pkl')
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        if self.cache_dir is not None:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'rb') as f:
+                    value = pickle.load(f)
+                # The modification time is used as the last access time of the LRU eviction
+                os.utime(path)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                return default
+            self._set_memory(key, value)
+            return value
+
+        return default
+
+    def _set_memory(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def set(self, key: str, value: Any) -> None:
+        self._set_memory(key, value)
+
+        if self.cache_dir is not None:
+            # Write to a temporary file first, so other processes never read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._disk_path(key))
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        files = [os.path.join(self.cache_dir, file) for file in os.listdir(self.cache_dir)
+                 if file.endswith('.pkl')]
+        if len(files) <= self.disk_maxsize:
+            return
+
+        def mtime(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return 0
+
+        for path in sorted(files, key=mtime)[:len(files) - self.disk_maxsize]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self.cache_dir is not None:
+            for file in os.listdir(self.cache_dir):
+                if file.endswith('.pkl'):
+                    os.remove(os.path.join(self.cache_dir, file))
+
+    def memoize(self, func: Callable) -> Callable:
+        """
+        Decorator that caches the results of a function, keyed on its positional arguments.
+        """
+        @functools.wraps(func)
+        def wrapper(*args):
+            key = self.make_key(func.__qualname__, args)
+            value = self.get(key, _missing)
+            if value is _missing:
+                value = func(*args)
+                self.set(key, value)
+            return value
+
+        return wrapper
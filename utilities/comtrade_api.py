@@ -0,0 +1,336 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    comtrade_api.py
+-- Purpose: Concurrent, rate limited client for the comtrade.un.org API, which streams the
+            responses straight to CSV files and retries the failed calls.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import time
+import random
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Reference: https://comtrade.un.org/data/doc/api/#DataAvailabilityRequests
+api_url = 'http://comtrade.un.org/api/get'
+reporters_url = 'https://comtrade.un.org/Data/cache/partnerAreas.json'
+
+# Parameters of the API calls that are the same for every call
+default_params = {'max': 100000,        # Maximum number of records per call
+                  'type': 'C',          # Commodities
+                  'freq': 'M',          # Monthly
+                  'px': 'HS',           # Classification for products
+                  'p': 'all',           # Partners
+                  'rg': 'all',          # Trade flows
+                  'cc': 300220,         # Subcategory --> 300220 code for Vaccines
+                  'fmt': 'csv'}
+
+# Usage limits of the API for guest users: 1 request per second and 100 requests per hour
+requests_per_second = 1
+requests_per_hour = 100
+
+retry_status_codes = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket: tokens are added at a constant rate up to the capacity, and
+    every call consumes one token, waiting until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """
+        Seconds until a token is available (0 if there is one already).
+        """
+        with self._lock:
+            self._refill()
+            return max(0.0, (1 - self.tokens) / self.rate)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        while not self.try_acquire():
+            self.sleep(max(self.wait_time(), 0.01))
+
+
+class SlidingWindowLimit:
+    """
+    Thread safe limit of at most `limit` calls in any window of `window` seconds, kept as
+    the timestamps of the calls of the last window. Unlike a token bucket it never allows
+    a burst above the limit, and it can start from the calls of a previous run (history),
+    so that a restarted process does not exceed the quota.
+    """
+
+    def __init__(self, limit: int, window: float, clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], None] = time.sleep, history: Sequence[float] = (),
+                 on_acquire: Optional[Callable[[float], None]] = None):
+        self.limit = int(limit)
+        self.window = window
+        self.clock = clock
+        self.sleep = sleep
+        self.on_acquire = on_acquire
+        self.calls = deque(sorted(history))
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        while self.calls and self.calls[0] <= now - self.window:
+            self.calls.popleft()
+
+    def wait_time(self) -> float:
+        """
+        Seconds until a call is allowed (0 if it is allowed already).
+        """
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            if len(self.calls) < self.limit:
+                return 0.0
+            return max(0.0, self.calls[-self.limit] + self.window - now)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            if len(self.calls) >= self.limit:
+                return False
+            self.calls.append(now)
+        if self.on_acquire is not None:
+            self.on_acquire(now)
+        return True
+
+    def acquire(self) -> None:
+        while not self.try_acquire():
+            self.sleep(max(self.wait_time(), 0.01))
+
+
+class RateLimiter:
+    """
+    Combination of limits (e.g. a per second token bucket and a per hour sliding window)
+    where a call proceeds only when all the limits allow it.
+    """
+
+    def __init__(self, limits: Sequence):
+        self.limits = list(limits)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_quota(cls, per_second: float = requests_per_second,
+                  per_hour: Optional[float] = requests_per_hour, clock: Callable[[], float] = time.time,
+                  sleep: Callable[[float], None] = time.sleep, history: Sequence[float] = (),
+                  on_call: Optional[Callable[[float], None]] = None) -> 'RateLimiter':
+        """
+        Limiter for the quota of the API. The hourly quota is a sliding window over the
+        timestamps of the calls (history holds the calls of the last hour made by previous
+        runs, on_call is called with the timestamp of every new call, e.g. to persist it).
+        """
+        limits = [TokenBucket(rate=per_second, capacity=max(per_second, 1), clock=clock, sleep=sleep)]
+        if per_hour is not None:
+            limits.append(SlidingWindowLimit(per_hour, 3600, clock=clock, sleep=sleep, history=history,
+                                             on_acquire=on_call))
+        return cls(limits)
+
+    def acquire(self) -> None:
+        # A call is taken from all the limits at once, so that one limit is not consumed
+        # while another one is exhausted
+        with self._lock:
+            while True:
+                wait = max(limit.wait_time() for limit in self.limits)
+                if wait == 0:
+                    for limit in self.limits:
+                        limit.try_acquire()
+                    return
+                self.limits[0].sleep(wait)
+
+
+class FetchResult(NamedTuple):
+    path: str
+    status_code: Optional[int]
+    n_bytes: int
+    attempts: int
+    error: Optional[str] = None
+    sha256: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code == 200 and self.error is None
+
+
+def request_params(reporter_id: str, period: str, **overrides) -> Dict[str, object]:
+    """
+    Parameters of the API call for a reporter and a period (a year, e.g. '2019').
+    """
+    params = dict(default_params, r=reporter_id, ps=period)
+    params.update(overrides)
+    return params
+
+
+def make_session(pool_size: int = 4) -> requests.Session:
+    """
+    Session with a pool of keep-alive connections that is shared by the worker threads.
+    Retries are handled by ComtradeFetcher, so the adapter does not retry.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class ComtradeFetcher:
+    """
+    Client that downloads API calls to files, with a shared rate limiter, a pool of
+    keep-alive connections, and retries with exponential backoff.
+    """
+
+    def __init__(self, base_url: str = api_url, max_workers: int = 4,
+                 rate_limiter: Optional[RateLimiter] = None, max_retries: int = 5,
+                 backoff: float = 2.0, max_backoff: float = 300.0, timeout: float = 120.0,
+                 verify: bool = True, chunk_size: int = 1 << 16,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.base_url = base_url
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter.for_quota()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.verify = verify
+        self.chunk_size = chunk_size
+        self.sleep = sleep
+        self.session = make_session(max_workers)
+
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            return float(response.headers['Retry-After'])
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def fetch_to_file(self, params: Dict[str, object], path: str) -> FetchResult:
+        """
+        Download an API call to a file. The response body is streamed to a temporary file
+        which replaces path only when the download is complete.
+
+        Args:
+        ----
+            params: Query parameters of the call (see request_params()).
+            path: Path of the output file.
+        Returns:
+        -------
+            result: FetchResult with the status of the last attempt, the number of bytes written
+                    and the SHA-256 of the content.
+        """
+        folder = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f'{path}.part'
+
+        status_code, error = None, None
+        for attempt in range(1, self.max_retries + 2):
+            self.rate_limiter.acquire()
+            response = None
+            try:
+                response = self.session.get(self.base_url, params=params, stream=True,
+                                            timeout=self.timeout, verify=self.verify)
+                status_code = response.status_code
+                if status_code == 200:
+                    n_bytes, content_hash = 0, hashlib.sha256()
+                    with open(tmp_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=self.chunk_size):
+                            f.write(chunk)
+                            content_hash.update(chunk)
+                            n_bytes += len(chunk)
+                    os.replace(tmp_path, path)
+                    return FetchResult(path, status_code, n_bytes, attempt, sha256=content_hash.hexdigest())
+
+                error = f'HTTP {status_code}'
+                if status_code not in retry_status_codes:
+                    break
+            except requests.RequestException as exc:
+                status_code, error = None, repr(exc)
+            finally:
+                if response is not None:
+                    response.close()
+
+            if attempt <= self.max_retries:
+                self.sleep(self._retry_delay(attempt, response))
+
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return FetchResult(path, status_code, 0, attempt, error)
+
+    def fetch_all(self, jobs: List[Dict[str, object]],
+                  on_result: Optional[Callable[[Dict[str, object], FetchResult], None]] = None) -> List[FetchResult]:
+        """
+        Download many API calls concurrently.
+
+        Args:
+        ----
+            jobs: List of {'params': query parameters, 'path': output file}.
+            on_result: Optional function called with (job, result) when a call finishes.
+        Returns:
+        -------
+            results: FetchResult of every job, in the order of the jobs.
+        """
+        def run(job):
+            result = self.fetch_to_file(job['params'], job['path'])
+            if on_result is not None:
+                on_result(job, result)
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(run, jobs))
+
+    def get_json(self, url: str) -> dict:
+        """
+        Download a (small) JSON document, e.g. the list of reporters, with the same retries.
+        """
+        for attempt in range(1, self.max_retries + 2):
+            self.rate_limiter.acquire()
+            response = None
+            try:
+                response = self.session.get(url, timeout=self.timeout, verify=self.verify)
+            except requests.RequestException:
+                if attempt > self.max_retries:
+                    raise
+            else:
+                if response.status_code == 200:
+                    return response.json()
+                if response.status_code not in retry_status_codes or attempt > self.max_retries:
+                    response.raise_for_status()
+            if attempt <= self.max_retries:
+                self.sleep(self._retry_delay(attempt, response))
+        raise requests.HTTPError(f'Could not access {url}')
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,139 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    country_index.py
+-- Purpose: Index from each country to the positions of the rows where it appears as a
+            Reporter or a Partner, so that country specific data can be selected without
+            scanning the whole dataframe.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utilities import data_loader
+
+
+def country_codes(df: pd.core.frame.DataFrame,
+                  columns: Tuple[str, ...] = ('Reporter', 'Partner')) -> Tuple[List[np.ndarray], pd.Index]:
+    """
+    Encode the country columns of a dataframe with a common set of integer codes.
+    Missing countries get the code -1.
+
+    Args:
+    ----
+        df: Dataframe that contains the country columns.
+        columns: Names of the country columns (by default 'Reporter' and 'Partner').
+    Returns:
+    -------
+        codes: List with the integer codes of every column.
+        countries: Index of the country names, where the position is the code.
+    """
+    series = [df[col] for col in columns]
+
+    if all(isinstance(ser.dtype, pd.CategoricalDtype) and ser.dtype == series[0].dtype for ser in series):
+        # Data from the data_loader share the categories, so the codes can be used directly
+        return [ser.cat.codes.to_numpy(dtype=np.int64) for ser in series], series[0].cat.categories
+
+    codes, countries = pd.factorize(pd.concat([ser.astype(object) for ser in series],
+                                              ignore_index=True), sort=True)
+    codes = codes.astype(np.int64)
+    return [codes[i * len(df):(i + 1) * len(df)] for i in range(len(series))], pd.Index(countries)
+
+
+def shared_per_frame(cache: Dict[tuple, Any], df: pd.core.frame.DataFrame,
+                     build: Callable[[], Any], *key) -> Any:
+    """
+    Return an object derived from a dataframe. The objects of the dataframes returned by
+    data_loader.load_trade_data() are built once per version of the data and shared, while
+    any other dataframe (which could be modified in place, or only be used once) gets an
+    object built from scratch.
+
+    Args:
+    ----
+        cache: Dictionary used as cache, owned by the caller.
+        df: Dataframe from which the object is derived.
+        build: Function with no arguments that builds the object.
+        key: Optional extra parts of the cache key.
+    """
+    fingerprint = data_loader.loaded_frame_fingerprint(df)
+    if fingerprint is None:
+        return build()
+
+    cached = cache.get((fingerprint,) + key)
+    if cached is not None:
+        return cached
+
+    # Drop the objects of older versions of the data
+    for old_key in [k for k in cache if k[0] != fingerprint]:
+        del cache[old_key]
+
+    obj = build()
+    cache[(fingerprint,) + key] = obj
+    return obj
+
+
+class CountryIndex:
+    """
+    CSR-style index of a dataframe by country. The row positions of each country are
+    stored contiguously (sorted by country code and then by position), and
+    offsets[code]:offsets[code + 1] gives the slice of the positions of a country.
+
+    Indexes of the dataframes of data_loader.load_trade_data() are built once and shared
+    through CountryIndex.for_frame().
+    """
+
+    # Shared indexes: {(fingerprint of the data, columns): index}
+    _indexes: Dict[tuple, 'CountryIndex'] = {}
+
+    def __init__(self, df: pd.core.frame.DataFrame, columns: Tuple[str, ...] = ('Reporter', 'Partner')):
+        self.columns = tuple(columns)
+        codes, self.countries = country_codes(df, self.columns)
+
+        # A row is indexed only once per country, even if it appears in several columns
+        rows = np.arange(len(df), dtype=np.int64)
+        all_rows, all_keys = [rows], [codes[0]]
+        for i in range(1, len(codes)):
+            new_country = np.logical_and.reduce([codes[i] != codes[j] for j in range(i)])
+            all_rows.append(rows[new_country])
+            all_keys.append(codes[i][new_country])
+        rows, keys = np.concatenate(all_rows), np.concatenate(all_keys)
+
+        valid = keys >= 0
+        rows, keys = rows[valid], keys[valid]
+
+        order = np.lexsort((rows, keys))
+        self.positions = rows[order]
+        self.offsets = np.zeros(len(self.countries) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=len(self.countries)), out=self.offsets[1:])
+
+    @classmethod
+    def for_frame(cls, df: pd.core.frame.DataFrame,
+                  columns: Tuple[str, ...] = ('Reporter', 'Partner')) -> 'CountryIndex':
+        """
+        Return the index of a dataframe, shared if the dataframe comes from the data loader
+        (see shared_per_frame()).
+        """
+        return shared_per_frame(cls._indexes, df, lambda: cls(df, columns), tuple(columns))
+
+    def positions_for(self, country: str) -> np.ndarray:
+        """
+        Positions (in ascending order) of the rows where the country appears in one of
+        the indexed columns. An empty array is returned for unknown countries.
+        """
+        code = self.countries.get_indexer([country])[0]
+        if code < 0:
+            return np.empty(0, dtype=np.int64)
+        return self.positions[self.offsets[code]:self.offsets[code + 1]]
+
+    def select(self, df: pd.core.frame.DataFrame, country: str) -> pd.core.frame.DataFrame:
+        """
+        Filter the indexed dataframe to the rows where the country appears in one of the
+        indexed columns (by default 'Reporter' = country or 'Partner' = country).
+        The rows keep their original order and index labels.
+        """
+        return df.iloc[self.positions_for(country)]
@@ -0,0 +1,207 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    data_loader.py
+-- Purpose: Single entry point to load the cleaned and normalized vaccines trade data,
+            shared by the analysis script, the notebooks and the Dash application.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import hashlib
+import weakref
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utilities import data_store
+
+# Root folder of the project (parent of the utilities folder)
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# We will consider both 'Re-imports' and 'Re-exports' as 'Imports' and 'Exports' respectively
+trade_flow_dict = {'Re-imports':'Imports',
+                   'Re-exports':'Exports',
+                   'Imports':'Imports',
+                   'Exports':'Exports'}
+
+country_names_dict = {'United States of America':'USA'}
+
+# Per process memo of the normalized frame: {store folder: (fingerprint, frame)}
+_loaded_frames: Dict[str, Tuple[str, pd.core.frame.DataFrame]] = {}
+
+# Frames returned by load_trade_data(): {id(df): (weak reference to df, fingerprint, shape, columns)}
+_returned_frames: Dict[int, tuple] = {}
+
+
+def source_fingerprint(*folders: str) -> str:
+    """
+    Compute a fingerprint of the files contained in the given folders, based on their
+    names, sizes and modification times.
+    """
+    fingerprint = hashlib.sha1()
+    for folder in folders:
+        if not os.path.isdir(folder):
+            continue
+        for file in sorted(os.listdir(folder)):
+            stat = os.stat(os.path.join(folder, file))
+            fingerprint.update(f'{folder}/{file}:{stat.st_size}:{stat.st_mtime_ns};'.encode('utf-8'))
+    return fingerprint.hexdigest()
+
+
+def data_fingerprint(project_folder: str = project_dir) -> str:
+    """
+    Fingerprint of the data of the project (merged CSV files and data store), e.g. to
+    invalidate results that have been computed on older data.
+    """
+    return source_fingerprint(os.path.join(project_folder, 'Merged_CSVs'),
+                              os.path.join(project_folder, 'Parquet_Store'))
+
+
+def recode_categorical(series: pd.core.series.Series, mapping: Dict[str, str],
+                       categories: Optional[pd.Index] = None) -> pd.core.series.Series:
+    """
+    Map the categories of a categorical series to new values, working on the
+    categories and integer codes instead of the rows. Categories not present in
+    the mapping are kept as they are.
+
+    Args:
+    ----
+        series: Categorical series.
+        mapping: Dictionary of {old category: new category}.
+        categories: Optional categories of the output. Defaults to the sorted mapped categories.
+    Returns:
+    -------
+        series: Categorical series with the mapped values.
+    """
+    mapped = pd.Index([mapping.get(cat, cat) for cat in series.cat.categories])
+    if categories is None:
+        categories = pd.Index(sorted(mapped.dropna().unique()))
+
+    # Lookup table from the old codes to the new ones, where -1 (missing) stays -1
+    code_map = np.append(categories.get_indexer(mapped), -1)
+    codes = code_map[series.cat.codes.to_numpy()]
+
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories),
+                     index=series.index, name=series.name)
+
+
+def normalize_trade_data(df: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+    """
+    Apply the cleaning steps of the analysis to a dataframe loaded from the data store:
+        - Map 'Re-imports'/'Re-exports' to 'Imports'/'Exports'.
+        - Rename 'United States of America' to 'USA'.
+        - Drop the rows where the Partner is 'World' or the Reporter is missing.
+
+    The mappings are applied on the categories, so only the final row filter touches
+    every row. 'Reporter' and 'Partner' share the same categories, so the integer codes
+    of the two columns can be used as country ids.
+
+    Args:
+    ----
+        df: Dataframe with categorical 'Reporter', 'Partner' and 'Trade Flow' columns.
+    Returns:
+    -------
+        df: Normalized dataframe with a fresh RangeIndex.
+    """
+    reporter = recode_categorical(df['Reporter'], country_names_dict)
+    partner = recode_categorical(df['Partner'], country_names_dict)
+    # Values of 'Trade Flow' that are not part of the dictionary become missing
+    trade_flow = recode_categorical(df['Trade Flow'], trade_flow_dict,
+                                    categories=pd.Index(sorted(set(trade_flow_dict.values()))))
+
+    keep = (partner != 'World').to_numpy() & reporter.notna().to_numpy()
+    reporter, partner = reporter[keep], partner[keep]
+
+    countries = pd.Index(sorted(set(reporter.dropna().unique()) | set(partner.dropna().unique())))
+    country_dtype = pd.CategoricalDtype(countries)
+
+    df = df.loc[keep].assign(**{'Reporter': reporter.astype(country_dtype),
+                                'Partner': partner.astype(country_dtype),
+                                'Trade Flow': trade_flow[keep]})
+    return df.reset_index(drop=True)
+
+
+def _copy_on_write_enabled() -> bool:
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    try:
+        return pd.get_option('mode.copy_on_write') is True
+    except KeyError:
+        return False
+
+
+def load_trade_data(project_folder: str = project_dir, refresh: bool = False) -> pd.core.frame.DataFrame:
+    """
+    Load the cleaned trade data of all the years.
+
+    The normalized frame is built once per process and memoized. It is rebuilt when the
+    fingerprint of the merged CSV files or of the data store changes (the store itself
+    is rebuilt from the CSVs when they are newer than it).
+
+    The memoized frame is shared, so callers must not modify it in place. With pandas
+    copy-on-write (default from pandas 3) callers get a cheap shallow copy, which can
+    never write through to the shared frame; otherwise they get a deep copy.
+
+    The returned frame is registered with the fingerprint of its data (see
+    loaded_frame_fingerprint()), so that the structures derived from it (country index,
+    cube, panel, ...) are shared with the other frames of the same data. It should be
+    treated as read-only: modify a copy of it instead.
+
+    Args:
+    ----
+        project_folder: Root folder of the project, which contains the 'Merged_CSVs' and
+                        'Parquet_Store' folders.
+        refresh: Force reloading the data from disk.
+    Returns:
+    -------
+        df: Normalized dataframe with the useful features of the data.
+    """
+    csv_folder = os.path.join(project_folder, 'Merged_CSVs')
+    store_folder = os.path.join(project_folder, 'Parquet_Store')
+
+    fingerprint = data_fingerprint(project_folder)
+    cached = _loaded_frames.get(store_folder)
+
+    if refresh or cached is None or cached[0] != fingerprint:
+        df = data_store.load_or_build_store(store_folder, csv_folder,
+                                            columns=data_store.useful_features_ls)
+        df = normalize_trade_data(df)
+        # The store might have been rebuilt while loading
+        cached = (data_fingerprint(project_folder), df)
+        _loaded_frames[store_folder] = cached
+
+    df = cached[1].copy(deep=not _copy_on_write_enabled())
+    _register_frame(df, cached[0])
+    return df
+
+
+def _register_frame(df: pd.core.frame.DataFrame, fingerprint: str) -> None:
+    for dead_id in [frame_id for frame_id, (ref, *_) in _returned_frames.items() if ref() is None]:
+        del _returned_frames[dead_id]
+    _returned_frames[id(df)] = (weakref.ref(df), fingerprint, df.shape, tuple(df.columns))
+
+
+def loaded_frame_fingerprint(df: pd.core.frame.DataFrame) -> Optional[str]:
+    """
+    Fingerprint of the data of a dataframe returned by load_trade_data(), or None for any
+    other dataframe (e.g. a filtered or sorted copy). A returned dataframe whose columns
+    or shape have changed since is not recognised either.
+    """
+    entry = _returned_frames.get(id(df))
+    if entry is None or entry[0]() is not df:
+        return None
+    _, fingerprint, shape, columns = entry
+    if df.shape != shape or tuple(df.columns) != columns:
+        return None
+    return fingerprint
+
+
+def clear_cache() -> None:
+    """
+    Drop all the memoized frames of the current process.
+    """
+    _loaded_frames.clear()
@@ -0,0 +1,168 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    data_store.py
+-- Purpose: Columnar (Parquet) store of the merged Comtrade CSV files, pruned to the
+            features used by the analysis and partitioned by year.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import re
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+
+# Columns of the raw Comtrade CSVs that are used throughout the analysis
+useful_features_ls = ['Year', 'Period', 'Reporter Code', 'Reporter', 'Partner Code',
+                      'Partner', 'Trade Flow', 'Commodity', 'Netweight (kg)',
+                      'Trade Value (US$)']
+
+# Columns that are stored as categoricals. The categories are shared across all
+# the yearly partitions, so that concatenating years keeps the categorical dtype.
+categorical_features_ls = ['Reporter', 'Partner', 'Trade Flow', 'Commodity']
+
+csv_dtypes = {'Year': 'int16',
+              'Period': 'str',
+              'Reporter Code': 'int32',
+              'Partner Code': 'int32',
+              'Netweight (kg)': 'float64'}
+
+merged_csv_prefix = 'Comtrade_Vacciness_Data_'
+store_file_prefix = 'Comtrade_Vaccines_Data_'
+
+
+def store_file_path(store_folder: str, year: int) -> str:
+    """
+    Path of the Parquet partition that holds the data for a given year.
+    """
+    return os.path.join(store_folder, f'{store_file_prefix}{year}.parquet')
+
+
+def list_store_files(store_folder: str, years: Optional[List[int]] = None) -> Dict[int, str]:
+    """
+    Map every year available in the store to the path of its partition.
+
+    Args:
+    ----
+        store_folder: Folder that contains the Parquet partitions.
+        years: Optional list of years of interest. By default all years are returned.
+    Returns:
+    -------
+        store_files: Dictionary of {year: path}, sorted by year.
+    """
+    pattern = re.compile(rf'^{store_file_prefix}(\d{{4}})\.parquet$')
+    store_files = {}
+    if os.path.isdir(store_folder):
+        for file in os.listdir(store_folder):
+            match = pattern.match(file)
+            if match is not None:
+                store_files[int(match.group(1))] = os.path.join(store_folder, file)
+    if years is not None:
+        years = set(map(int, years))
+        store_files = {year: path for year, path in store_files.items() if year in years}
+    return dict(sorted(store_files.items()))
+
+
+def read_merged_csv(filepath: str) -> pd.core.frame.DataFrame:
+    """
+    Read a merged Comtrade CSV file, parsing only the useful features.
+
+    Args:
+    ----
+        filepath: Path to a file of the Merged_CSVs folder.
+    Returns:
+    -------
+        df: Dataframe with the useful features, where 'Period' is a datetime column.
+    """
+    df = pd.read_csv(filepath, usecols=useful_features_ls, dtype=csv_dtypes)
+    df['Period'] = pd.to_datetime(df['Period'], format='%Y%m')
+    return df[useful_features_ls]
+
+
+def convert_csvs_to_store(csv_folder: str, store_folder: str) -> Dict[int, str]:
+    """
+    Convert the merged CSV files into a typed, column-pruned Parquet store with one
+    partition per year.
+
+    Args:
+    ----
+        csv_folder: Folder that contains the merged CSV files (e.g. 'Merged_CSVs').
+        store_folder: Folder where the Parquet partitions will be written.
+    Returns:
+    -------
+        store_files: Dictionary of {year: path} of the partitions that have been written.
+    """
+    df = pd.concat([read_merged_csv(os.path.join(csv_folder, file))
+                    for file in sorted(os.listdir(csv_folder)) if file.startswith(merged_csv_prefix)],
+                   ignore_index=True)
+
+    # Categories are computed on the full data, so that every partition shares them
+    df = df.astype({col: pd.CategoricalDtype(sorted(df[col].dropna().unique()))
+                    for col in categorical_features_ls})
+
+    if not os.path.exists(store_folder):
+        os.makedirs(store_folder)
+
+    store_files = {}
+    for year, year_df in df.groupby('Year', sort=True):
+        year = int(year)
+        store_files[year] = store_file_path(store_folder, year)
+        year_df.reset_index(drop=True).to_parquet(store_files[year], engine='pyarrow', index=False)
+
+    return store_files
+
+
+def load_store(store_folder: str, columns: Optional[List[str]] = None,
+               years: Optional[List[int]] = None) -> pd.core.frame.DataFrame:
+    """
+    Load the data from the Parquet store, reading only the requested columns.
+
+    Args:
+    ----
+        store_folder: Folder that contains the Parquet partitions.
+        columns: Columns to read. Defaults to all the useful features.
+        years: Optional list of years to read. Defaults to all the available years.
+    Returns:
+    -------
+        df: Dataframe with categorical 'Reporter', 'Partner', 'Trade Flow' columns and a
+            datetime 'Period' column.
+    """
+    store_files = list_store_files(store_folder, years=years)
+    if not store_files:
+        raise FileNotFoundError(f'No data found in the store: {store_folder}')
+
+    columns = useful_features_ls if columns is None else list(columns)
+    df = pd.concat([pd.read_parquet(path, engine='pyarrow', columns=columns)
+                    for path in store_files.values()], ignore_index=True)
+    return df
+
+
+def store_is_stale(store_folder: str, csv_folder: str) -> bool:
+    """
+    Check if the store needs to be (re)built, i.e. it does not exist or one of the
+    merged CSV files has been modified after the store was written.
+    """
+    store_files = list_store_files(store_folder)
+    if not store_files:
+        return True
+    if not os.path.isdir(csv_folder):
+        return False
+
+    store_mtime = min(os.path.getmtime(path) for path in store_files.values())
+    return any(os.path.getmtime(os.path.join(csv_folder, file)) > store_mtime
+               for file in os.listdir(csv_folder) if file.startswith(merged_csv_prefix))
+
+
+def load_or_build_store(store_folder: str, csv_folder: str, columns: Optional[List[str]] = None,
+                        years: Optional[List[int]] = None) -> pd.core.frame.DataFrame:
+    """
+    Load the data from the Parquet store, converting the merged CSV files first if
+    the store has not been created yet or is older than the CSV files.
+    """
+    if store_is_stale(store_folder, csv_folder):
+        convert_csvs_to_store(csv_folder, store_folder)
+    return load_store(store_folder, columns=columns, years=years)
@@ -0,0 +1,177 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    diagnostics.py
+-- Purpose: Headless diagnostics of a panel of time series (rolling mean and standard deviation,
+            Augmented Dickey-Fuller test, ACF and PACF), computed over a process pool into a
+            single columnar table. The plots are an optional step on top of the results.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.stattools import acf, pacf, adfuller
+
+from utilities.trade_panel import TradePanel, select_series
+
+# Same names as the results of tnf.check_stationarity()
+adf_columns_ls = ['Test Statistic', 'P-value', '#Lags Used', 'Number of Observations Used',
+                  'Critical Value (1%)', 'Critical Value (5%)', 'Critical Value (10%)']
+
+
+def rolling_stats(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rolling mean and standard deviation (ddof=1, as pd.Series.rolling(window).std()) of every
+    row of a (n_series, time) array. The first window - 1 values are NaN.
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    rolling_mn = np.full(values.shape, np.nan)
+    rolling_std = np.full(values.shape, np.nan)
+    if values.shape[1] >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=-1)
+        rolling_mn[:, window - 1:] = windows.mean(axis=-1)
+        rolling_std[:, window - 1:] = windows.std(axis=-1, ddof=1)
+    return rolling_mn, rolling_std
+
+
+def adf_test(series_values: np.ndarray) -> List[float]:
+    """
+    Augmented Dickey-Fuller test of a series (autolag='AIC'), with the values of adf_columns_ls.
+    A series where the test cannot run (e.g. constant) gets NaN values.
+    """
+    try:
+        fuller_test = adfuller(series_values, autolag='AIC')
+    except (ValueError, np.linalg.LinAlgError):
+        return [np.nan] * len(adf_columns_ls)
+    return list(fuller_test[0:4]) + [fuller_test[4][key] for key in ('1%', '5%', '10%')]
+
+
+def diagnose_chunk(values: np.ndarray, window: int, nlags: int) -> Dict[str, list]:
+    """
+    Diagnostics of every row of a (n_series, time) array (runs in the workers).
+
+    Returns:
+    -------
+        columns: {column: list with one value per series}, with the columns of adf_columns_ls
+                 and the arrays 'Rolling Mean', 'Rolling Std', 'ACF', 'PACF'.
+    """
+    rolling_mn, rolling_std = rolling_stats(values, window)
+    # The PACF can only be estimated up to half of the observations
+    pacf_lags = min(nlags, values.shape[1] // 2 - 1)
+
+    columns = {col: [] for col in adf_columns_ls + ['ACF', 'PACF']}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for series_values in np.asarray(values, dtype=np.float64):
+            for col, value in zip(adf_columns_ls, adf_test(series_values)):
+                columns[col].append(value)
+            if np.ptp(series_values) == 0:
+                columns['ACF'].append(np.full(nlags + 1, np.nan))
+                columns['PACF'].append(np.full(pacf_lags + 1, np.nan))
+            else:
+                columns['ACF'].append(acf(series_values, nlags=nlags, fft=True))
+                columns['PACF'].append(pacf(series_values, nlags=pacf_lags))
+
+    columns['Rolling Mean'] = list(rolling_mn)
+    columns['Rolling Std'] = list(rolling_std)
+    return columns
+
+
+def diagnose_series(values: np.ndarray, window: int = 12, nlags: int = 24, processes: Optional[int] = None,
+                    chunk_size: int = 64) -> pd.core.frame.DataFrame:
+    """
+    Diagnostics of a batch of series of the same length.
+
+    Args:
+    ----
+        values: Array of shape (n_series, time).
+        window: Size of the rolling window.
+        nlags: Number of lags of the ACF (and of the PACF, if the series are long enough).
+        processes: Number of processes (all the cores by default, 1 runs in this process).
+        chunk_size: Number of series of a task.
+    Returns:
+    -------
+        diagnostics_df: One row per series, with the ADF results (adf_columns_ls), 'Stationary'
+                        (P-value below 0.05) and the arrays 'Rolling Mean', 'Rolling Std',
+                        'ACF' and 'PACF'.
+    """
+    values = np.atleast_2d(values)
+    chunks = [values[start:start + chunk_size] for start in range(0, len(values), chunk_size)]
+    if processes == 1 or len(chunks) <= 1:
+        results = [diagnose_chunk(chunk, window, nlags) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(diagnose_chunk, chunk, window, nlags) for chunk in chunks]
+            results = [future.result() for future in futures]
+
+    columns_ls = adf_columns_ls + ['Rolling Mean', 'Rolling Std', 'ACF', 'PACF']
+    diagnostics_df = pd.DataFrame({col: [value for result in results for value in result[col]]
+                                   for col in columns_ls}, columns=columns_ls)
+    diagnostics_df.insert(len(adf_columns_ls), 'Stationary', diagnostics_df['P-value'] < 0.05)
+    return diagnostics_df
+
+
+def diagnose_pairs(df: pd.core.frame.DataFrame, pairs: Optional[List[Tuple[str, str]]] = None,
+                   layer: str = 'Trade Value (US$)', min_months: int = 36, window: int = 12,
+                   nlags: int = 24, processes: Optional[int] = None
+                   ) -> Tuple[pd.core.frame.DataFrame, Dict[Tuple[str, str], str]]:
+    """
+    Diagnostics of the monthly series of the pairs of the panel of a dataframe
+    (see diagnose_series() and trade_panel.select_series() for the arguments).
+
+    Returns:
+    -------
+        diagnostics_df: One row per pair, with 'Importer' and 'Exporter' columns.
+        skipped: {(importer, exporter): reason} of the pairs that were left out.
+    """
+    panel = TradePanel.for_frame(df)
+    positions, skipped = select_series(panel, pairs, min_months, 0, layer)
+    diagnostics_df = diagnose_series(panel.layer(layer)[positions], window, nlags, processes)
+
+    pair_index = panel.pairs[positions]
+    diagnostics_df.insert(0, 'Exporter', pair_index.get_level_values(1).astype(str))
+    diagnostics_df.insert(0, 'Importer', pair_index.get_level_values(0).astype(str))
+    return diagnostics_df, skipped
+
+
+def render_diagnostics(diagnostics: pd.core.series.Series, time_series: Optional[pd.core.series.Series] = None,
+                       kind: str = 'stationarity', figsize=(10,6)) -> None:
+    """
+    Plot the diagnostics of a single series (a row of diagnose_series() / diagnose_pairs()).
+
+    Args:
+    ----
+        diagnostics: Row of the diagnostics table.
+        time_series: The series itself ('stationarity' only), whose index is used for the x axis.
+        kind: 'stationarity' (series with the rolling mean and st.dev.), 'acf' or 'pacf'.
+    """
+    if kind not in ['stationarity', 'acf', 'pacf']:
+        raise ValueError('Not a valid plot')
+
+    # Imported here, so that the headless computation does not need a display backend
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=figsize)
+    if kind == 'stationarity':
+        index = time_series.index if time_series is not None else np.arange(len(diagnostics['Rolling Mean']))
+        if time_series is not None:
+            plt.plot(time_series, color = 'blue',label = 'Original TS')
+        plt.plot(index, diagnostics['Rolling Mean'], color = 'red', label = 'Rolling Mean')
+        plt.plot(index, diagnostics['Rolling Std'], color = 'black', label = 'Rolling St.Dev.')
+        plt.legend(loc = 'best')
+        plt.grid(True, color = 'lightgrey')
+        plt.title(f"Rolling Mean & Standard Deviation (ADF p-value: {diagnostics['P-value']:.3f})", fontsize = 10)
+    else:
+        values = np.asarray(diagnostics[kind.upper()])
+        plt.stem(np.arange(len(values)), values)
+        plt.axhline(0, color='black', linewidth=0.8)
+        plt.title('Autocorrelation' if kind == 'acf' else 'Partial Autocorrelation')
+        plt.ylabel('Correlation')
+        plt.xlabel('Lag Values')
+    plt.show()
@@ -0,0 +1,253 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    edge_table.py
+-- Purpose: Importer oriented view of the whole trade network, built in a single pass over
+            the data, and canonical table of directed edges (importer <--- exporter) where
+            the mirror reports of the two countries have been reconciled.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from utilities.country_index import CountryIndex, country_codes, shared_per_frame
+
+
+def swap_countries(df: pd.core.frame.DataFrame, swap: np.ndarray) -> pd.core.frame.DataFrame:
+    """
+    Swap the 'Reporter'/'Partner' (and 'Reporter Code'/'Partner Code' if present) values
+    of the rows where swap is True.
+
+    Args:
+    ----
+        df: Dataframe that contains the data.
+        swap: Boolean array with the rows that need to be swapped.
+    Returns:
+    -------
+        df: New dataframe with the swapped values.
+    """
+    (reporter_codes, partner_codes), countries = country_codes(df)
+    country_dtype = pd.CategoricalDtype(countries)
+
+    swapped = {'Reporter': pd.Categorical.from_codes(np.where(swap, partner_codes, reporter_codes),
+                                                     dtype=country_dtype),
+               'Partner': pd.Categorical.from_codes(np.where(swap, reporter_codes, partner_codes),
+                                                    dtype=country_dtype)}
+    if 'Reporter Code' in df.columns and 'Partner Code' in df.columns:
+        swapped['Reporter Code'] = np.where(swap, df['Partner Code'], df['Reporter Code'])
+        swapped['Partner Code'] = np.where(swap, df['Reporter Code'], df['Partner Code'])
+
+    return df.assign(**swapped)
+
+
+def build_import_flows(df: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+    """
+    Orient every record of the data as an import, for all the countries at once:
+        Country in Reporter , 'Imports' in flow --> kept as it is
+        Country in Partner,   'Exports' in flow --> Reporter and Partner are swapped
+
+    In the result 'Reporter' is always the importer and 'Partner' the exporter, 'Trade Flow'
+    is 'Imports' and 'Reported By' tells which of the two countries reported the record.
+    Rows with a missing 'Trade Flow' are dropped. The rows keep their order and index labels,
+    so that the imports of a country are exactly the rows of create_trade_flow_df().
+
+    Args:
+    ----
+        df: Dataframe with (at least) 'Reporter', 'Partner' and 'Trade Flow' columns.
+    Returns:
+    -------
+        flows_df: Importer oriented dataframe.
+    """
+    trade_flow = df['Trade Flow'].to_numpy(dtype=object)
+    exports = trade_flow == 'Exports'
+    known_flow = exports | (trade_flow == 'Imports')
+
+    flows_df = swap_countries(df[known_flow], exports[known_flow])
+    flows_df['Trade Flow'] = pd.Categorical(np.full(len(flows_df), 'Imports'),
+                                            categories=['Exports', 'Imports'])
+    flows_df['Reported By'] = pd.Categorical(np.where(exports[known_flow], 'Exporter', 'Importer'),
+                                             categories=['Exporter', 'Importer'])
+    return flows_df
+
+
+# Policies to pick the values of an edge when both countries reported it (see reconcile_import_flows())
+reconciliation_policies_ls = ['importer', 'exporter', 'mean', 'max']
+
+value_cols_ls = ['Trade Value (US$)', 'Netweight (kg)']
+
+
+def match_mirror_flows(flows_df: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+    """
+    Match the mirror reports of the importer oriented flows: one row per (importer, exporter,
+    period) with the values reported by the importer and by the exporter side by side.
+
+    Args:
+    ----
+        flows_df: Output of build_import_flows().
+    Returns:
+    -------
+        matched_df: Dataframe with the columns 'Importer', 'Exporter', 'Period', and for each
+                    of 'Importer' and 'Exporter': 'Reported By <side>' (whether the country
+                    reported the trade), 'Trade Value (US$) <side>' and 'Netweight (kg) <side>'.
+                    The rows are sorted by importer, exporter and period.
+    """
+    summed = flows_df.groupby(['Reporter', 'Partner', 'Period', 'Reported By'], observed=True,
+                              sort=True)[value_cols_ls].sum(min_count=1)
+    summed['Reported'] = True
+
+    matched = summed.unstack('Reported By')
+    matched = matched.reindex(columns=pd.MultiIndex.from_product([value_cols_ls + ['Reported'],
+                                                                  ['Importer', 'Exporter']]))
+    matched_df = pd.DataFrame({'Importer': matched.index.get_level_values('Reporter'),
+                               'Exporter': matched.index.get_level_values('Partner'),
+                               'Period': matched.index.get_level_values('Period')})
+    for side in ['Importer', 'Exporter']:
+        matched_df[f'Reported By {side}'] = matched[('Reported', side)].notna().to_numpy()
+        for col in value_cols_ls:
+            matched_df[f'{col} {side}'] = matched[(col, side)].to_numpy(dtype=np.float64)
+    return matched_df
+
+
+def reconcile_import_flows(flows_df: pd.core.frame.DataFrame, policy: str = 'importer',
+                           matched_df: Optional[pd.core.frame.DataFrame] = None) -> pd.core.frame.DataFrame:
+    """
+    Collapse the importer oriented flows to one directed edge per (importer, exporter, period).
+    When both countries reported the same trade (mirror flows), the values are picked by the
+    policy; when only one of them did, its report is used.
+        'importer' --> the importer's report (imports are usually recorded more reliably)
+        'exporter' --> the exporter's report
+        'mean'     --> the average of the two reports
+        'max'      --> the largest of the two reports
+
+    Args:
+    ----
+        flows_df: Output of build_import_flows().
+        policy: One of reconciliation_policies_ls.
+        matched_df: Optional output of match_mirror_flows(flows_df), if already computed.
+    Returns:
+    -------
+        edges_df: Dataframe with the columns 'Importer', 'Exporter', 'Period',
+                  'Trade Value (US$)', 'Netweight (kg)' and 'Mirror', where 'Mirror' is True
+                  when the trade value of the edge was taken from the exporter's report, for
+                  every policy: the exporter was the only one to report the trade, or both
+                  did and the policy used the exporter's value ('exporter', 'mean', or 'max'
+                  when the exporter's value is the largest).
+    """
+    if policy not in reconciliation_policies_ls:
+        raise ValueError(f'Incorrect policy - Please pick one of {reconciliation_policies_ls}')
+    if matched_df is None:
+        matched_df = match_mirror_flows(flows_df)
+
+    by_importer = matched_df['Reported By Importer'].to_numpy()
+    by_exporter = matched_df['Reported By Exporter'].to_numpy()
+    both = by_importer & by_exporter
+
+    edges_df = matched_df[['Importer', 'Exporter', 'Period']].copy()
+    for col in value_cols_ls:
+        importer_values = matched_df[f'{col} Importer'].to_numpy()
+        exporter_values = matched_df[f'{col} Exporter'].to_numpy()
+        values = np.where(by_importer, importer_values, exporter_values)
+        # Rows whose value uses the exporter's report
+        from_exporter = ~by_importer
+        if policy == 'exporter':
+            values = np.where(by_exporter, exporter_values, importer_values)
+            from_exporter = by_exporter
+        elif policy == 'mean':
+            mean_values = np.where(np.isnan(importer_values), exporter_values,
+                                   np.where(np.isnan(exporter_values), importer_values,
+                                            (importer_values + exporter_values) / 2))
+            values = np.where(both, mean_values, values)
+            from_exporter = np.where(both, ~np.isnan(exporter_values), from_exporter)
+        elif policy == 'max':
+            values = np.where(both, np.fmax(importer_values, exporter_values), values)
+            exporter_larger = (exporter_values > importer_values) | (np.isnan(importer_values) &
+                                                                     ~np.isnan(exporter_values))
+            from_exporter = np.where(both, exporter_larger, from_exporter)
+        if col == 'Trade Value (US$)':
+            mirror = from_exporter
+
+        # Integer columns (e.g. the trade value) keep their type when the values are whole
+        if np.issubdtype(flows_df[col].dtype, np.integer) and policy != 'mean' and not np.isnan(values).any():
+            values = values.astype(flows_df[col].dtype)
+        edges_df[col] = values
+
+    edges_df['Mirror'] = mirror
+    return edges_df.reset_index(drop=True)
+
+
+class TradeEdgeTable:
+    """
+    Importer oriented flows and reconciled edges of a whole dataset, indexed by importer
+    and by exporter. Shared through TradeEdgeTable.for_frame().
+    """
+
+    # Shared tables: {(fingerprint of the data,): table}
+    _tables: Dict[tuple, 'TradeEdgeTable'] = {}
+
+    def __init__(self, df: pd.core.frame.DataFrame):
+        self.flows_df = build_import_flows(df)
+        self.importer_index = CountryIndex(self.flows_df, columns=('Reporter',))
+        self.exporter_index = CountryIndex(self.flows_df, columns=('Partner',))
+        self._matched_df = None
+        self._edges = {}
+
+    @classmethod
+    def for_frame(cls, df: pd.core.frame.DataFrame) -> 'TradeEdgeTable':
+        """
+        Return the edge table of a dataframe, building it only the first time that the
+        dataframe is seen.
+        """
+        return shared_per_frame(cls._tables, df, lambda: cls(df))
+
+    @property
+    def matched_df(self) -> pd.core.frame.DataFrame:
+        """
+        Mirror reports matched side by side (see match_mirror_flows()), computed on first access.
+        """
+        if self._matched_df is None:
+            self._matched_df = match_mirror_flows(self.flows_df)
+        return self._matched_df
+
+    def reconciled(self, policy: str = 'importer') -> pd.core.frame.DataFrame:
+        """
+        Reconciled (importer, exporter, period) edges under a policy, computed once per policy.
+        """
+        if policy not in self._edges:
+            self._edges[policy] = reconcile_import_flows(self.flows_df, policy, matched_df=self.matched_df)
+        return self._edges[policy]
+
+    @property
+    def edges_df(self) -> pd.core.frame.DataFrame:
+        """
+        Reconciled (importer, exporter, period) edges where the importer's report wins.
+        """
+        return self.reconciled('importer')
+
+    def flow_view(self, country: str, tradeflow: str = 'Imports') -> pd.core.frame.DataFrame:
+        """
+        Slice the flows of a country.
+
+        Args:
+        ----
+            country: Name of the country.
+            tradeflow: 'Imports' -> 'Reporter' is the country and 'Partner' the exporters.
+                       'Exports' -> 'Reporter' is the country and 'Partner' the importers.
+        Returns:
+        -------
+            df: Dataframe of the flows, without the 'Reported By' column.
+        """
+        if tradeflow == 'Imports':
+            df = self.importer_index.select(self.flows_df, country)
+        elif tradeflow == 'Exports':
+            df = self.exporter_index.select(self.flows_df, country)
+            df = swap_countries(df, np.ones(len(df), dtype=bool))
+            df['Trade Flow'] = pd.Categorical(np.full(len(df), 'Exports'), categories=['Exports', 'Imports'])
+        else:
+            raise ValueError('Trade flow is not set to Imports or Exports')
+
+        return df.drop(columns='Reported By')
@@ -0,0 +1,203 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    fetch_manifest.py
+-- Purpose: Persistent (SQLite) manifest of the API calls of the data retrieval process, so
+            that interrupted runs can be resumed and refreshes only fetch the newest months.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional
+
+import pandas as pd
+
+# Status of a (reporter, year) entry of the manifest
+status_pending = 'pending'
+status_done = 'done'
+status_failed = 'failed'
+
+_schema = """
+CREATE TABLE IF NOT EXISTS fetches (
+    reporter_id TEXT NOT NULL,
+    reporter    TEXT NOT NULL,
+    year        INTEGER NOT NULL,
+    path        TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    n_bytes     INTEGER,
+    sha256      TEXT,
+    last_period TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    error       TEXT,
+    updated_at  TEXT NOT NULL,
+    PRIMARY KEY (reporter_id, year)
+)
+"""
+
+# Timestamps (seconds since the epoch) of the API calls, for the hourly quota of the API
+_calls_schema = """
+CREATE TABLE IF NOT EXISTS api_calls (
+    called_at REAL NOT NULL
+)
+"""
+
+
+class ManifestEntry(NamedTuple):
+    reporter_id: str
+    reporter: str
+    year: int
+    path: str
+    status: str
+    n_bytes: Optional[int]
+    sha256: Optional[str]
+    last_period: Optional[str]
+    attempts: int
+    error: Optional[str]
+    updated_at: str
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 16) -> str:
+    content_hash = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def csv_periods(path: str) -> List[str]:
+    """
+    Periods (e.g. '201903') contained in a CSV file as received from the API. Files that
+    contain no data (e.g. 'No data matches your query') have no periods.
+    """
+    try:
+        periods = pd.read_csv(path, usecols=['Period'], dtype=str)['Period']
+    except (ValueError, OSError, pd.errors.EmptyDataError, pd.errors.ParserError):
+        return []
+    return sorted(periods.dropna().unique())
+
+
+class FetchManifest:
+    """
+    Record of every (reporter, year) call with its status, the size and SHA-256 of the
+    downloaded file, and the last monthly period that the file contains, and of the times
+    of the recent API calls (so that a restarted run keeps to the hourly quota).
+
+    The manifest can be updated from the worker threads of the fetcher.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        folder = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(_schema)
+            self._connection.execute(_calls_schema)
+
+    def get(self, reporter_id: str, year: int) -> Optional[ManifestEntry]:
+        with self._lock:
+            row = self._connection.execute('SELECT * FROM fetches WHERE reporter_id = ? AND year = ?',
+                                           (str(reporter_id), int(year))).fetchone()
+        return ManifestEntry(*row) if row is not None else None
+
+    def entries(self, status: Optional[str] = None) -> List[ManifestEntry]:
+        query, args = 'SELECT * FROM fetches', ()
+        if status is not None:
+            query, args = query + ' WHERE status = ?', (status,)
+        with self._lock:
+            rows = self._connection.execute(query + ' ORDER BY year, reporter', args).fetchall()
+        return [ManifestEntry(*row) for row in rows]
+
+    def status_counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._connection.execute('SELECT status, COUNT(*) FROM fetches GROUP BY status').fetchall()
+        return dict(rows)
+
+    def mark_pending(self, reporter_id: str, reporter: str, year: int, path: str) -> None:
+        """
+        Add a call that is about to be made. The details of a previous download, if any,
+        are kept until the call finishes.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                """INSERT INTO fetches (reporter_id, reporter, year, path, status, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (reporter_id, year) DO UPDATE SET
+                       reporter = excluded.reporter, path = excluded.path,
+                       status = CASE WHEN fetches.status = 'done' THEN 'done' ELSE excluded.status END,
+                       updated_at = excluded.updated_at""",
+                (str(reporter_id), reporter, int(year), path, status_pending, _now()))
+
+    def record(self, reporter_id: str, year: int, status: str, attempts: int = 0,
+               n_bytes: Optional[int] = None, sha256: Optional[str] = None,
+               last_period: Optional[str] = None, error: Optional[str] = None) -> None:
+        """
+        Store the outcome of a call. A failed call keeps the details of the last successful
+        download, so that the file it refers to is still used.
+        """
+        with self._lock, self._connection:
+            if status == status_done:
+                self._connection.execute(
+                    """UPDATE fetches SET status = ?, n_bytes = ?, sha256 = ?, last_period = ?,
+                           attempts = attempts + ?, error = NULL, updated_at = ?
+                       WHERE reporter_id = ? AND year = ?""",
+                    (status, n_bytes, sha256, last_period, attempts, _now(), str(reporter_id), int(year)))
+            else:
+                self._connection.execute(
+                    """UPDATE fetches SET status = CASE WHEN status = 'done' THEN 'done' ELSE ? END,
+                           attempts = attempts + ?, error = ?, updated_at = ?
+                       WHERE reporter_id = ? AND year = ?""",
+                    (status, attempts, error, _now(), str(reporter_id), int(year)))
+
+    def is_done(self, reporter_id: str, year: int, verify_hash: bool = False) -> bool:
+        """
+        Whether the call was completed and its file is still on disk, unchanged (same size,
+        and same SHA-256 if verify_hash). A completed call without any data is always done.
+        """
+        entry = self.get(reporter_id, year)
+        if entry is None or entry.status != status_done:
+            return False
+        # The files without data are not kept (see data_cleaning.py), so there is nothing to check
+        if entry.last_period is None:
+            return True
+        if not os.path.exists(entry.path):
+            return False
+        if os.path.getsize(entry.path) != entry.n_bytes:
+            return False
+        return not verify_hash or file_sha256(entry.path) == entry.sha256
+
+    def record_call(self, called_at: float) -> None:
+        """
+        Store the timestamp of an API call (see comtrade_api.RateLimiter.for_quota(on_call=...)),
+        and drop the calls older than a day.
+        """
+        with self._lock, self._connection:
+            self._connection.execute('INSERT INTO api_calls (called_at) VALUES (?)', (called_at,))
+            self._connection.execute('DELETE FROM api_calls WHERE called_at < ?', (called_at - 86400,))
+
+    def recent_calls(self, now: float, window: float = 3600) -> List[float]:
+        """
+        Timestamps of the API calls made in the last window seconds before now, by this or
+        by previous runs.
+        """
+        with self._lock:
+            rows = self._connection.execute('SELECT called_at FROM api_calls WHERE called_at > ? '
+                                            'ORDER BY called_at', (now - window,)).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
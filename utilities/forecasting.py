@@ -0,0 +1,181 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    forecasting.py
+-- Purpose: Forecasts of the monthly imports of every (importer, exporter) pair with enough
+            history, with the model fits spread over a process pool and the finished
+            chunks of pairs checkpointed, so that an interrupted run can be resumed.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import json
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+from utilities import trade_network_functions as tnf
+from utilities.trade_panel import TradePanel, select_series
+
+forecast_columns_ls = ['Importer', 'Exporter', 'Model', 'Period', 'Actual', 'Forecast', 'RMSE']
+
+
+def forecast_hwes(train: pd.core.series.Series, horizon: int, seasonal_periods: int = 12,
+                  trend: Optional[str] = None, seasonal: Optional[str] = 'add') -> np.ndarray:
+    """
+    Holt-Winters Exponential Smoothing forecast of the next horizon months of a series.
+    The default seasonality is additive, as the multiplicative one ('mul') only works
+    for series without zeros.
+    """
+    model = ExponentialSmoothing(train.to_numpy(dtype=np.float64), trend=trend, seasonal=seasonal,
+                                 seasonal_periods=seasonal_periods)
+    return model.fit().forecast(horizon)
+
+
+# Models that can be fitted by forecast_pairs(): {name: function(train, horizon, **kwargs)}
+forecast_models_dict: Dict[str, Callable[..., np.ndarray]] = {'hwes': forecast_hwes}
+
+
+def forecast_chunk(model: str, pairs: List[Tuple[str, str]], values: np.ndarray, months: pd.DatetimeIndex,
+                   num_months_test: int, model_kwargs: Dict[str, object]) -> pd.core.frame.DataFrame:
+    """
+    Fit a model to every series of a chunk and forecast its test months (runs in the workers).
+    A fit that fails gives NaN forecasts, so that the pair is not retried on resume.
+
+    Returns:
+    -------
+        forecasts_df: One row per pair and test month, with the columns of forecast_columns_ls.
+    """
+    forecast_fn = forecast_models_dict[model]
+    chunk_ls = []
+    for (importer, exporter), series_values in zip(pairs, values):
+        train, test = tnf.split_test_train(pd.Series(series_values, index=months), num_months_test)
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                forecast = np.asarray(forecast_fn(train, len(test), **model_kwargs), dtype=np.float64)
+            rmse = tnf.compute_RMSE(test, forecast, p_output=False)
+        except Exception:
+            forecast, rmse = np.full(len(test), np.nan), np.nan
+
+        chunk_ls.append(pd.DataFrame({'Importer': importer, 'Exporter': exporter, 'Model': model,
+                                      'Period': test.index, 'Actual': test.to_numpy(dtype=np.float64),
+                                      'Forecast': forecast, 'RMSE': rmse}))
+    if not chunk_ls:
+        return pd.DataFrame(columns=forecast_columns_ls)
+    return pd.concat(chunk_ls, ignore_index=True)
+
+
+def load_checkpoint(checkpoint_folder: str, config: Dict[str, object]) -> Dict[int, pd.core.frame.DataFrame]:
+    """
+    Forecasts of the chunks finished by a previous run with the same configuration, by chunk id.
+    The folder is created (with the configuration) if it does not exist.
+    """
+    config_path = os.path.join(checkpoint_folder, 'config.json')
+    if not os.path.exists(config_path):
+        os.makedirs(checkpoint_folder, exist_ok=True)
+        with open(config_path, 'w') as f:
+            json.dump(config, f, indent=2)
+        return {}
+
+    with open(config_path) as f:
+        saved_config = json.load(f)
+    if saved_config != config:
+        raise ValueError(f'The checkpoint in {checkpoint_folder} was created with a different '
+                         f'configuration ({saved_config}) - Please use another folder')
+    return {int(name[len('chunk_'):-len('.parquet')]): pd.read_parquet(os.path.join(checkpoint_folder, name))
+            for name in sorted(os.listdir(checkpoint_folder))
+            if name.startswith('chunk_') and name.endswith('.parquet')}
+
+
+def save_chunk(checkpoint_folder: str, chunk_id: int, forecasts_df: pd.core.frame.DataFrame) -> None:
+    path = os.path.join(checkpoint_folder, f'chunk_{chunk_id:06d}.parquet')
+    forecasts_df.to_parquet(f'{path}.part', engine='pyarrow', index=False)
+    os.replace(f'{path}.part', path)
+
+
+def forecast_pairs(df: pd.core.frame.DataFrame, model: str = 'hwes',
+                   pairs: Optional[List[Tuple[str, str]]] = None, layer: str = 'Trade Value (US$)',
+                   num_months_test: int = 12, min_months: int = 36, processes: Optional[int] = None,
+                   chunk_size: int = 32, checkpoint_folder: Optional[str] = None,
+                   data_fingerprint: Optional[str] = None,
+                   **model_kwargs) -> Tuple[pd.core.frame.DataFrame, Dict[Tuple[str, str], str]]:
+    """
+    Forecast the last num_months_test months of the imports of every pair with enough history,
+    and score the forecasts with tnf.compute_RMSE().
+
+    The series are the monthly series of VaccinesTradeNetwork.generateTimeSeries(), sliced from
+    the shared TradePanel of the dataframe (so the months without trade are 0 and every series
+    covers the same months), and split with tnf.split_test_train(). Only the arrays of the
+    series are sent to the workers, in chunks of chunk_size pairs.
+
+    Args:
+    ----
+        df: Dataframe of the (normalized) trade data.
+        model: Name of a model of forecast_models_dict (e.g. 'hwes').
+        pairs: (importer, exporter) pairs of interest, or None for all the pairs.
+        layer: Feature to forecast.
+        num_months_test: Number of months kept as test set and forecasted.
+        min_months: Smallest number of months with records of a series.
+        processes: Number of processes (all the cores by default, 1 runs in this process).
+        chunk_size: Number of pairs fitted by a task.
+        checkpoint_folder: Folder where the finished chunks are saved. A run with the same folder
+                           (and configuration) only fits the pairs that are not in the folder.
+        data_fingerprint: Fingerprint of the data (see data_loader.data_fingerprint()), stored in the
+                          configuration of the checkpoint so that it is not reused after a revision
+                          of the data.
+        model_kwargs: Keyword arguments of the model function.
+    Returns:
+    -------
+        forecasts_df: Tidy dataframe with one row per pair and test month (forecast_columns_ls).
+        skipped: {(importer, exporter): reason} of the pairs that were not forecasted.
+    """
+    if model not in forecast_models_dict:
+        raise ValueError(f'Unknown model {model} - Please pick one of {list(forecast_models_dict)}')
+
+    panel = TradePanel.for_frame(df)
+    positions, skipped = select_series(panel, pairs, min_months, num_months_test, layer)
+
+    done_chunks = {}
+    if checkpoint_folder is not None:
+        config = {'model': model, 'layer': layer, 'num_months_test': num_months_test,
+                  'first_month': str(panel.months[0].date()), 'last_month': str(panel.months[-1].date()),
+                  'data_fingerprint': data_fingerprint, 'model_kwargs': model_kwargs}
+        done_chunks = load_checkpoint(checkpoint_folder, config)
+        done = set().union(*[zip(done_df['Importer'], done_df['Exporter']) for done_df in done_chunks.values()])
+        positions = np.array([position for position in positions if panel.pairs[position] not in done],
+                             dtype=np.int64)
+
+    values = panel.layer(layer)
+    chunks = [positions[start:start + chunk_size] for start in range(0, len(positions), chunk_size)]
+    # The chunks of a pool finish in any order, so the saved ids can have gaps
+    first_chunk_id = max(done_chunks) + 1 if done_chunks else 0
+    tasks = [(model, list(panel.pairs[chunk]), values[chunk], panel.months, num_months_test, model_kwargs)
+             for chunk in chunks]
+
+    new_ls = []
+    if processes == 1 or len(tasks) <= 1:
+        for chunk_id, task in enumerate(tasks, start=first_chunk_id):
+            new_ls.append(forecast_chunk(*task))
+            if checkpoint_folder is not None:
+                save_chunk(checkpoint_folder, chunk_id, new_ls[-1])
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = {executor.submit(forecast_chunk, *task): chunk_id
+                       for chunk_id, task in enumerate(tasks, start=first_chunk_id)}
+            for future in as_completed(futures):
+                new_ls.append(future.result())
+                if checkpoint_folder is not None:
+                    save_chunk(checkpoint_folder, futures[future], new_ls[-1])
+
+    all_ls = [chunk_df for chunk_df in list(done_chunks.values()) + new_ls if not chunk_df.empty]
+    if not all_ls:
+        return pd.DataFrame(columns=forecast_columns_ls), skipped
+    forecasts_df = pd.concat(all_ls, ignore_index=True)
+    return forecasts_df.sort_values(['Importer', 'Exporter', 'Period'], kind='stable').reset_index(drop=True), skipped
@@ -0,0 +1,205 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    lstm_forecast.py
+-- Purpose: Recursive multi-step forecasts of a batch of series with the Bidirectional LSTM of
+            the analysis, where every step is a single forward pass over all the series (on
+            the CPU), fed from a preallocated ring buffer of the last observations.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utilities import trade_network_functions as tnf
+from utilities.forecasting import forecast_columns_ls, select_series
+from utilities.trade_panel import TradePanel
+
+
+def scale_series(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Min-max scale every row of a (n_series, time) array to [0, 1], as sklearn's MinMaxScaler
+    does for a single series (a constant row is only shifted to 0).
+
+    Returns:
+    -------
+        scaled: Scaled values (float32, the dtype of the network).
+        mins, ranges: Minimum and range of every row, used by unscale_series().
+    """
+    values = np.asarray(values, dtype=np.float64)
+    mins = values.min(axis=-1, keepdims=True)
+    ranges = values.max(axis=-1, keepdims=True) - mins
+    ranges[ranges == 0] = 1
+    return ((values - mins) / ranges).astype(np.float32), mins, ranges
+
+
+def unscale_series(scaled: np.ndarray, mins: np.ndarray, ranges: np.ndarray) -> np.ndarray:
+    """
+    Inverse of scale_series().
+    """
+    return scaled.astype(np.float64) * ranges + mins
+
+
+def recursive_forecast(predict_fn: Callable[[np.ndarray], np.ndarray], histories: np.ndarray,
+                       horizon: int, n_steps_past: int, batch_size: int = 4096) -> np.ndarray:
+    """
+    Forecast the next horizon steps of a batch of series, feeding every prediction back as
+    the newest observation of its series.
+
+    The last n_steps_past observations of the series are kept in a ring buffer of twice that
+    length, where every value is written twice, so that the window of any step is a slice of
+    the buffer. A step copies the windows into a preallocated input array and makes a single
+    call of predict_fn for all the series (per batch_size series).
+
+    Args:
+    ----
+        predict_fn: Function from an array of shape (batch, n_steps_past, 1) to the predictions
+                    of shape (batch, 1), e.g. keras_predict_fn(model).
+        histories: Array of shape (n_series, time) with time >= n_steps_past (scaled values).
+        horizon: Number of steps to forecast.
+        n_steps_past: Number of past steps in the input of the model.
+        batch_size: Largest number of series of a forward pass.
+    Returns:
+    -------
+        forecasts: Array of shape (n_series, horizon) (float32).
+    """
+    histories = np.atleast_2d(histories)
+    n_series = histories.shape[0]
+
+    ring = np.empty((n_series, 2 * n_steps_past), dtype=np.float32)
+    ring[:, :n_steps_past] = histories[:, -n_steps_past:]
+    ring[:, n_steps_past:] = histories[:, -n_steps_past:]
+    inputs = np.empty((n_series, n_steps_past, 1), dtype=np.float32)
+    forecasts = np.empty((n_series, horizon), dtype=np.float32)
+
+    oldest = 0
+    for step in range(horizon):
+        np.copyto(inputs[:, :, 0], ring[:, oldest:oldest + n_steps_past])
+        for start in range(0, n_series, batch_size):
+            batch = inputs[start:start + batch_size]
+            forecasts[start:start + batch_size, step] = np.asarray(predict_fn(batch)).reshape(len(batch))
+
+        # The prediction replaces the oldest observation of the window
+        ring[:, oldest] = forecasts[:, step]
+        ring[:, oldest + n_steps_past] = forecasts[:, step]
+        oldest = (oldest + 1) % n_steps_past
+
+    return forecasts
+
+
+def keras_predict_fn(model) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Forward pass of a Keras model on the CPU, for recursive_forecast(). The model is called
+    directly (in inference mode, so without dropout), which avoids the per call overhead of
+    model.predict().
+    """
+    import tensorflow as tf
+    try:
+        tf.config.set_visible_devices([], 'GPU')
+    except RuntimeError:
+        # The devices cannot be changed after TensorFlow has been initialized
+        pass
+
+    def predict(batch: np.ndarray) -> np.ndarray:
+        with tf.device('/CPU:0'):
+            return model(batch, training=False).numpy()
+
+    return predict
+
+
+def build_lstm_model(n_steps_past: int, n_features: int = 1, units: int = 50, dropout: float = 0.2):
+    """
+    Bidirectional LSTM of the analysis (see vaccines.py).
+    """
+    from keras.models import Sequential
+    from keras.layers import LSTM, Bidirectional, Dense, Dropout
+
+    model = Sequential()
+    model.add(Bidirectional(LSTM(units, activation='relu'), input_shape=(n_steps_past, n_features)))
+    model.add(Dropout(dropout))
+    model.add(Dense(n_features))
+    model.compile(optimizer='adam', loss='mean_squared_error')
+    return model
+
+
+def fit_lstm(train_scaled: np.ndarray, n_steps_past: int = 12, epochs: int = 500,
+             batch_size: int = 32, model=None, verbose: int = 0):
+    """
+    Fit a single LSTM on the samples of all the (scaled) train series, made with
+    tnf.split_into_samples() in batched mode.
+
+    Args:
+    ----
+        train_scaled: Array of shape (n_series, time) with the scaled train series.
+        n_steps_past: Number of past steps in the input of the model.
+        epochs, batch_size: Training parameters of model.fit().
+        model: Model to train further, or None to build a new one.
+    Returns:
+    -------
+        model: Fitted model.
+    """
+    X, y = tnf.split_into_samples(np.atleast_2d(train_scaled), n_steps_past=n_steps_past, n_steps_future=1)
+    X = X.reshape((-1, n_steps_past, 1))
+    y = y.reshape((-1, 1))
+
+    if model is None:
+        model = build_lstm_model(n_steps_past)
+    model.fit(X, y, epochs=epochs, batch_size=batch_size, verbose=verbose)
+    return model
+
+
+def forecast_pairs_lstm(df: pd.core.frame.DataFrame, pairs: Optional[List[Tuple[str, str]]] = None,
+                        layer: str = 'Trade Value (US$)', num_months_test: int = 12, min_months: int = 36,
+                        n_steps_past: int = 12, epochs: int = 500, batch_size: int = 32,
+                        model=None) -> Tuple[pd.core.frame.DataFrame, Dict[Tuple[str, str], str]]:
+    """
+    Forecast the last num_months_test months of the imports of every pair with enough history
+    with one LSTM for all the pairs, in the same format as forecasting.forecast_pairs().
+    Every series is scaled with the minimum and maximum of its train months.
+
+    Args:
+    ----
+        df: Dataframe of the (normalized) trade data.
+        pairs: (importer, exporter) pairs of interest, or None for all the pairs.
+        layer: Feature to forecast.
+        num_months_test: Number of months kept as test set and forecasted.
+        min_months: Smallest number of months with records of a series.
+        n_steps_past: Number of past steps in the input of the model.
+        epochs, batch_size: Training parameters (see fit_lstm()).
+        model: Fitted model to use, or None to fit one on the train months of the pairs.
+    Returns:
+    -------
+        forecasts_df: Tidy dataframe with one row per pair and test month (forecast_columns_ls).
+        skipped: {(importer, exporter): reason} of the pairs that were not forecasted.
+    """
+    panel = TradePanel.for_frame(df)
+    positions, skipped = select_series(panel, pairs, min_months, num_months_test, layer)
+    if len(positions) == 0:
+        return pd.DataFrame(columns=forecast_columns_ls), skipped
+
+    values = panel.layer(layer)[positions]
+    n_train = values.shape[1] - num_months_test
+    train_scaled, mins, ranges = scale_series(values[:, :n_train])
+
+    if model is None:
+        model = fit_lstm(train_scaled, n_steps_past=n_steps_past, epochs=epochs, batch_size=batch_size)
+    forecasts = unscale_series(recursive_forecast(keras_predict_fn(model), train_scaled,
+                                                  horizon=num_months_test, n_steps_past=n_steps_past),
+                               mins, ranges)
+
+    test_values = values[:, n_train:].astype(np.float64)
+    rmse = np.array([tnf.compute_RMSE(actual, forecast, p_output=False)
+                     for actual, forecast in zip(test_values, forecasts)])
+    pair_index = panel.pairs[positions]
+    forecasts_df = pd.DataFrame({'Importer': np.repeat(pair_index.get_level_values(0).astype(str), num_months_test),
+                                 'Exporter': np.repeat(pair_index.get_level_values(1).astype(str), num_months_test),
+                                 'Model': 'lstm',
+                                 'Period': np.tile(panel.months[n_train:], len(positions)),
+                                 'Actual': test_values.ravel(),
+                                 'Forecast': forecasts.ravel(),
+                                 'RMSE': np.repeat(rmse, num_months_test)})
+    return forecasts_df, skipped
@@ -0,0 +1,339 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    model_registry.py
+-- Purpose: Local registry of the fitted forecasting models and their forecasts, keyed on a
+            hash of the series and of the hyperparameters, so that a model is only trained
+            again when its data changed (and then warm-started when months were appended).
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import json
+import pickle
+import sqlite3
+import hashlib
+import warnings
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+_schema = """
+CREATE TABLE IF NOT EXISTS models (
+    key             TEXT PRIMARY KEY,
+    model           TEXT NOT NULL,
+    series_id       TEXT NOT NULL,
+    params_hash     TEXT NOT NULL,
+    params          TEXT NOT NULL,
+    n_values        INTEGER NOT NULL,
+    data_hash       TEXT NOT NULL,
+    last_period     TEXT,
+    warm_start_from TEXT,
+    has_forecast    INTEGER NOT NULL,
+    created_at      TEXT NOT NULL
+)
+"""
+
+# How the fitted models are stored: 'keras' models with model.save(), the rest with pickle
+model_formats_dict = {'lstm': 'keras'}
+
+
+class RegistryEntry(NamedTuple):
+    key: str
+    model: str
+    series_id: str
+    params_hash: str
+    params: str
+    n_values: int
+    data_hash: str
+    last_period: Optional[str]
+    warm_start_from: Optional[str]
+    has_forecast: int
+    created_at: str
+
+
+def series_id(importer: str, exporter: str, layer: str = 'Trade Value (US$)') -> str:
+    """
+    Name of the series of the imports of importer from exporter in the registry.
+    """
+    return f'{importer} <- {exporter} | {layer}'
+
+
+def row_hashes(ts: pd.core.series.Series) -> np.ndarray:
+    """
+    Hash of every (period, value) of a series, so that the hash of any prefix of the series
+    can be computed (see data_hash()).
+    """
+    return pd.util.hash_pandas_object(ts.astype(np.float64), index=True).to_numpy()
+
+
+def data_hash(hashes: np.ndarray) -> str:
+    return hashlib.sha256(np.ascontiguousarray(hashes).tobytes()).hexdigest()
+
+
+def params_hash(params: Dict[str, object]) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ModelRegistry:
+    """
+    Fitted models and forecasts on disk (root/<model>/<key>/), with an SQLite index. An entry
+    is identified by the model, the name of the series, the hyperparameters and the hash of
+    the data of the series. The registry can be used from several threads (e.g. the callbacks
+    of the dashboard).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        if not os.path.exists(root):
+            os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(os.path.join(root, 'registry.sqlite'), check_same_thread=False)
+        with self._connection:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(_schema)
+
+    def _query(self, query: str, args: tuple) -> List[RegistryEntry]:
+        with self._lock:
+            rows = self._connection.execute(query, args).fetchall()
+        return [RegistryEntry(*row) for row in rows]
+
+    def _folder(self, entry: RegistryEntry) -> str:
+        return os.path.join(self.root, entry.model, entry.key)
+
+    def _model_path(self, entry: RegistryEntry) -> str:
+        extension = '.keras' if model_formats_dict.get(entry.model) == 'keras' else '.pkl'
+        return os.path.join(self._folder(entry), 'model' + extension)
+
+    def get(self, model: str, series_id: str, ts: pd.core.series.Series,
+            params: Dict[str, object]) -> Optional[RegistryEntry]:
+        """
+        Entry of a model fitted on exactly this series with these hyperparameters, if any.
+        """
+        entries = self._query('SELECT * FROM models WHERE model = ? AND series_id = ? AND params_hash = ? '
+                              'AND n_values = ? AND data_hash = ?',
+                              (model, series_id, params_hash(params), len(ts), data_hash(row_hashes(ts))))
+        return entries[0] if entries else None
+
+    def warm_start_entry(self, model: str, series_id: str, ts: pd.core.series.Series,
+                         params: Dict[str, object]) -> Optional[RegistryEntry]:
+        """
+        Entry of the model with the same hyperparameters fitted on the longest prefix of the
+        series (i.e. before the last months were appended), if any.
+        """
+        hashes = row_hashes(ts)
+        entries = self._query('SELECT * FROM models WHERE model = ? AND series_id = ? AND params_hash = ? '
+                              'AND n_values < ? ORDER BY n_values DESC',
+                              (model, series_id, params_hash(params), len(ts)))
+        for entry in entries:
+            if entry.data_hash == data_hash(hashes[:entry.n_values]):
+                return entry
+        return None
+
+    def latest(self, model: str, series_id: str) -> Optional[RegistryEntry]:
+        """
+        Most recent entry of a series with a forecast, whatever the data and hyperparameters.
+        """
+        entries = self._query('SELECT * FROM models WHERE model = ? AND series_id = ? AND has_forecast = 1 '
+                              'ORDER BY created_at DESC, n_values DESC LIMIT 1', (model, series_id))
+        return entries[0] if entries else None
+
+    def load_model(self, entry: RegistryEntry):
+        path = self._model_path(entry)
+        if model_formats_dict.get(entry.model) == 'keras':
+            from keras.models import load_model
+            return load_model(path)
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def load_forecast(self, entry: RegistryEntry) -> Optional[pd.core.series.Series]:
+        if not entry.has_forecast:
+            return None
+        return pd.read_parquet(os.path.join(self._folder(entry), 'forecast.parquet'))['Forecast']
+
+    def latest_forecast(self, model: str, series_id: str) -> Optional[pd.core.series.Series]:
+        """
+        Most recent forecast of a series, read from disk without fitting anything (None if the
+        series was never forecasted).
+        """
+        entry = self.latest(model, series_id)
+        return self.load_forecast(entry) if entry is not None else None
+
+    def save(self, model: str, series_id: str, ts: pd.core.series.Series, params: Dict[str, object],
+             fitted, forecast: Optional[pd.core.series.Series] = None,
+             warm_start_from: Optional[str] = None) -> RegistryEntry:
+        """
+        Store a fitted model (and its forecast) of a series.
+        """
+        hashes = row_hashes(ts)
+        p_hash, d_hash = params_hash(params), data_hash(hashes)
+        key = hashlib.sha256(f'{model}|{series_id}|{p_hash}|{d_hash}'.encode()).hexdigest()[:32]
+        entry = RegistryEntry(key, model, series_id, p_hash, json.dumps(params, sort_keys=True, default=str),
+                              len(ts), d_hash, str(ts.index[-1]) if len(ts) else None, warm_start_from,
+                              int(forecast is not None), _now())
+
+        folder = self._folder(entry)
+        os.makedirs(folder, exist_ok=True)
+        model_path = self._model_path(entry)
+        if model_formats_dict.get(model) == 'keras':
+            fitted.save(model_path)
+        else:
+            with open(f'{model_path}.part', 'wb') as f:
+                pickle.dump(fitted, f)
+            os.replace(f'{model_path}.part', model_path)
+        if forecast is not None:
+            forecast.rename('Forecast').to_frame().to_parquet(os.path.join(folder, 'forecast.parquet'),
+                                                              engine='pyarrow')
+
+        with self._lock, self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO models VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                     tuple(entry))
+        return entry
+
+    def fit_cached(self, model: str, series_id: str, ts: pd.core.series.Series, params: Dict[str, object],
+                   fit_fn: Callable[[pd.core.series.Series, Optional[object]], object],
+                   forecast_fn: Optional[Callable[[object, pd.core.series.Series], pd.core.series.Series]] = None
+                   ) -> Tuple[object, Optional[pd.core.series.Series]]:
+        """
+        Return the fitted model and the forecast of a series, from the registry if the model was
+        already fitted on the same data with the same hyperparameters. Otherwise the model is
+        fitted (warm-started from the model of the series before its last months, if any) and
+        stored.
+
+        Args:
+        ----
+            model: Name of the model (e.g. 'hwes', 'lstm').
+            series_id: Name of the series (e.g. series_id(importer, exporter)).
+            ts: Series used to fit the model.
+            params: Hyperparameters of the model (everything that changes the fit or the forecast).
+            fit_fn: Function (ts, warm_model) --> fitted model, where warm_model is the model to
+                    continue training, or None to train from scratch.
+            forecast_fn: Function (fitted model, ts) --> forecast, or None to store only the model.
+        Returns:
+        -------
+            fitted: The fitted model.
+            forecast: The forecast, or None without forecast_fn.
+        """
+        entry = self.get(model, series_id, ts, params)
+        if entry is not None and (forecast_fn is None or entry.has_forecast):
+            return self.load_model(entry), self.load_forecast(entry)
+
+        warm_entry = self.warm_start_entry(model, series_id, ts, params)
+        warm_model = self.load_model(warm_entry) if warm_entry is not None else None
+        fitted = fit_fn(ts, warm_model)
+        forecast = forecast_fn(fitted, ts) if forecast_fn is not None else None
+        self.save(model, series_id, ts, params, fitted, forecast,
+                  warm_start_from=warm_entry.key if warm_entry is not None else None)
+        return fitted, forecast
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='microseconds')
+
+
+def future_index(ts: pd.core.series.Series, horizon: int) -> pd.DatetimeIndex:
+    """
+    Index of the horizon months after the last month of a monthly series.
+    """
+    return pd.date_range(ts.index[-1] + pd.offsets.MonthBegin(1), periods=horizon, freq='MS', name='Period')
+
+
+def hwes_spec(horizon: int = 12, **params) -> Tuple[Dict[str, object], Callable, Callable]:
+    """
+    Hyperparameters, fit and forecast functions of a Holt-Winters forecast of the next horizon
+    months (see forecasting.forecast_hwes() for the hyperparameters), for fit_cached(). The fit
+    is cheap, so a series with new months is fitted from scratch.
+    """
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+    hwes_params = {'seasonal_periods': 12, 'trend': None, 'seasonal': 'add', **params}
+
+    def fit(series, warm_model):
+        return ExponentialSmoothing(series.to_numpy(dtype=np.float64), **hwes_params).fit()
+
+    def forecast(fitted, series):
+        return pd.Series(fitted.forecast(horizon), index=future_index(series, horizon))
+
+    return {**hwes_params, 'horizon': horizon}, fit, forecast
+
+
+def lstm_spec(horizon: int = 12, n_steps_past: int = 12, epochs: int = 500, warm_epochs: int = 50,
+              batch_size: int = 32) -> Tuple[Dict[str, object], Callable, Callable]:
+    """
+    Hyperparameters, fit and forecast functions of an LSTM forecast of the next horizon months,
+    for fit_cached(). When months were appended to a series that is in the registry, the stored
+    network is trained for warm_epochs on the new data instead of epochs from scratch.
+    """
+    from utilities import lstm_forecast
+
+    def fit(series, warm_model):
+        scaled, _, _ = lstm_forecast.scale_series(series.to_numpy())
+        return lstm_forecast.fit_lstm(scaled, n_steps_past=n_steps_past, batch_size=batch_size,
+                                      epochs=epochs if warm_model is None else warm_epochs, model=warm_model)
+
+    def forecast(fitted, series):
+        scaled, mins, ranges = lstm_forecast.scale_series(series.to_numpy())
+        forecasts = lstm_forecast.recursive_forecast(lstm_forecast.keras_predict_fn(fitted), scaled,
+                                                     horizon=horizon, n_steps_past=n_steps_past)
+        return pd.Series(lstm_forecast.unscale_series(forecasts, mins, ranges)[0], index=future_index(series, horizon))
+
+    params = {'horizon': horizon, 'n_steps_past': n_steps_past, 'epochs': epochs,
+              'warm_epochs': warm_epochs, 'batch_size': batch_size}
+    return params, fit, forecast
+
+
+# Forecasts of the months after a series: {model: function(**hyperparameters) --> (params, fit, forecast)}
+model_specs_dict = {'hwes': hwes_spec, 'lstm': lstm_spec}
+
+
+def forecast_cached(registry: ModelRegistry, model: str, series_name: str, ts: pd.core.series.Series,
+                    **params) -> pd.core.series.Series:
+    """
+    Forecast of the months after a series with a model of model_specs_dict, fitted only if the
+    registry does not have it yet.
+    """
+    model_params, fit, forecast = model_specs_dict[model](**params)
+    return registry.fit_cached(model, series_name, ts, model_params, fit, forecast)[1]
+
+
+def cache_pair_forecasts(df: pd.core.frame.DataFrame, registry: ModelRegistry, model: str = 'hwes',
+                         pairs: Optional[List[Tuple[str, str]]] = None, layer: str = 'Trade Value (US$)',
+                         min_months: int = 36, **params) -> Dict[str, int]:
+    """
+    Store in the registry the forecast of the months after the data of every pair with enough
+    history (e.g. for the dashboard). The pairs whose series did not change are not fitted again.
+
+    Returns:
+    -------
+        counts: Number of 'cached' (already in the registry), 'fitted' and 'failed' pairs.
+    """
+    from utilities.trade_panel import TradePanel, select_series
+
+    model_params, fit, forecast = model_specs_dict[model](**params)
+    panel = TradePanel.for_frame(df)
+    positions, _ = select_series(panel, pairs, min_months, 0, layer)
+
+    counts = {'cached': 0, 'fitted': 0, 'failed': 0}
+    for position in positions:
+        importer, exporter = panel.pairs[position]
+        name = series_id(importer, exporter, layer)
+        ts = panel.series(importer, exporter, layer).astype(np.float64)
+        if registry.get(model, name, ts, model_params) is not None:
+            counts['cached'] += 1
+            continue
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                registry.fit_cached(model, name, ts, model_params, fit, forecast)
+            counts['fitted'] += 1
+        except Exception:
+            counts['failed'] += 1
+    return counts
@@ -0,0 +1,189 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    network_layouts.py
+-- Purpose: Precomputed, deterministic positions of the nodes of the import network of every
+            reporter country, stored in a single compact .npz file for the Dash application.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+from utilities.trade_graph import TradeNetworkGraph
+
+# File of the layouts, relative to the project folder (see data_layouts.py)
+layouts_file = os.path.join('Network_Layouts', 'import_networks.npz')
+
+
+def import_graph(country: str, exporters: List[str]) -> nx.classes.digraph.DiGraph:
+    """
+    Graph of the imports of a country, with the same nodes (and node order) as the network
+    plot of the Dash application: the exporters point to the country, which has a self loop
+    so that it is drawn even without imports.
+    """
+    graph = nx.DiGraph()
+    graph.add_node(country)
+    graph.add_edges_from((exporter, country) for exporter in exporters)
+    graph.add_edge(country, country)
+    return graph
+
+
+def compute_layout(country: str, exporters: List[str], seed: int = 42) -> Tuple[List[str], np.ndarray]:
+    """
+    Spring layout of the import graph of a country, which is always the same for the same
+    exporters and seed.
+
+    Returns:
+    -------
+        nodes: Names of the nodes.
+        positions: Array of shape (len(nodes), 2) with the x, y coordinates of the nodes.
+    """
+    graph = import_graph(country, exporters)
+    pos = nx.layout.spring_layout(graph, seed=seed)
+    nodes = list(graph.nodes())
+    return nodes, np.array([pos[node] for node in nodes], dtype=np.float32)
+
+
+def layout_signature(exporters: List[str], seed: int) -> str:
+    """
+    Hash of the inputs of a layout, used to find the countries that need to be recomputed.
+    """
+    return hashlib.sha1(repr((seed, sorted(exporters))).encode('utf-8')).hexdigest()
+
+
+def _compute_layouts(jobs: List[Tuple[str, List[str]]], seed: int) -> List[Tuple[str, List[str], np.ndarray]]:
+    return [(country, *compute_layout(country, exporters, seed)) for country, exporters in jobs]
+
+
+class NetworkLayouts:
+    """
+    Node positions of the import graph of every country.
+
+    The positions are stored in CSR form: the nodes of country i are
+    nodes[offsets[i]:offsets[i + 1]] with coordinates positions[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, countries: List[str], signatures: List[str], offsets: np.ndarray,
+                 nodes: List[str], positions: np.ndarray, seed: int = 42):
+        self.countries = pd.Index(countries)
+        self.signatures = list(signatures)
+        self.offsets = offsets
+        self.nodes = np.asarray(nodes, dtype=object)
+        self.positions = positions
+        self.seed = seed
+
+    @classmethod
+    def load(cls, path: str) -> 'NetworkLayouts':
+        with np.load(path, allow_pickle=False) as data:
+            return cls(countries=data['countries'].tolist(), signatures=data['signatures'].tolist(),
+                       offsets=data['offsets'], nodes=data['nodes'].tolist(),
+                       positions=data['positions'], seed=int(data['seed']))
+
+    def save(self, path: str) -> None:
+        folder = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        # Write to a temporary file first, so readers never see a partial file
+        tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez_compressed(tmp_path, countries=np.array(self.countries, dtype=str),
+                            signatures=np.array(self.signatures, dtype=str), offsets=self.offsets,
+                            nodes=np.array(self.nodes, dtype=str), positions=self.positions,
+                            seed=np.array(self.seed))
+        os.replace(tmp_path, path)
+
+    def get(self, country: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Positions of the nodes of the import graph of a country, as {node: array([x, y])},
+        or None if the layout of the country has not been computed.
+        """
+        i = self.countries.get_indexer([country])[0]
+        if i < 0:
+            return None
+        block = slice(self.offsets[i], self.offsets[i + 1])
+        return dict(zip(self.nodes[block], self.positions[block]))
+
+    def layouts(self) -> Dict[str, Tuple[str, List[str], np.ndarray]]:
+        """
+        Dictionary of {country: (signature, nodes, positions)}.
+        """
+        return {country: (self.signatures[i], list(self.nodes[self.offsets[i]:self.offsets[i + 1]]),
+                          self.positions[self.offsets[i]:self.offsets[i + 1]])
+                for i, country in enumerate(self.countries)}
+
+    @classmethod
+    def from_layouts(cls, layouts: Dict[str, Tuple[str, List[str], np.ndarray]], seed: int) -> 'NetworkLayouts':
+        countries = sorted(layouts)
+        offsets = np.zeros(len(countries) + 1, dtype=np.int64)
+        np.cumsum([len(layouts[country][1]) for country in countries], out=offsets[1:])
+        nodes = [node for country in countries for node in layouts[country][1]]
+        positions = (np.concatenate([layouts[country][2] for country in countries])
+                     if countries else np.empty((0, 2), dtype=np.float32))
+        return cls(countries, [layouts[country][0] for country in countries], offsets, nodes,
+                   positions.astype(np.float32), seed)
+
+
+def build_layouts(df: pd.core.frame.DataFrame, path: str, seed: int = 42, n_jobs: Optional[int] = 1,
+                  previous: Optional[NetworkLayouts] = None) -> NetworkLayouts:
+    """
+    Compute the layouts of the import graphs of all the reporter countries and save them.
+    Only the countries whose exporters changed since the previous layouts (or that are new)
+    are recomputed.
+
+    Args:
+    ----
+        df: Dataframe of the (normalized) trade data.
+        path: Path of the .npz file of the layouts.
+        seed: Seed of the spring layouts.
+        n_jobs: Number of processes used to compute the layouts (None: one per core).
+        previous: Layouts to update. By default the file at path is used, if it exists.
+    Returns:
+    -------
+        layouts: NetworkLayouts object with the layouts of all the countries.
+    """
+    if previous is None and os.path.exists(path):
+        previous = NetworkLayouts.load(path)
+    old_layouts = previous.layouts() if previous is not None and previous.seed == seed else {}
+
+    graph = TradeNetworkGraph.for_frame(df)
+    importers, exporters, _ = graph.edge_weights()
+    reporters = df['Reporter'].dropna().unique()
+
+    layouts, jobs = {}, []
+    for country in sorted(map(str, reporters)):
+        node = graph.countries.get_indexer([country])[0]
+        country_exporters = [] if node < 0 else list(graph.countries[exporters[importers == node]])
+        country_exporters = [exporter for exporter in country_exporters if exporter != country]
+        signature = layout_signature(country_exporters, seed)
+        if country in old_layouts and old_layouts[country][0] == signature:
+            layouts[country] = old_layouts[country]
+        else:
+            jobs.append((country, country_exporters))
+
+    n_jobs = n_jobs if n_jobs is not None else os.cpu_count() or 1
+    if n_jobs == 1 or len(jobs) <= 1:
+        results = _compute_layouts(jobs, seed)
+    else:
+        chunks = [jobs[i::n_jobs] for i in range(n_jobs)]
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = [result for chunk_results in executor.map(_compute_layouts, chunks, [seed] * n_jobs)
+                       for result in chunk_results]
+
+    for country, nodes, positions in results:
+        exporters_of_country = [node for node in nodes if node != country]
+        layouts[country] = (layout_signature(exporters_of_country, seed), nodes, positions)
+
+    if not results and set(layouts) == set(old_layouts) and previous is not None:
+        return previous
+
+    network_layouts = NetworkLayouts.from_layouts(layouts, seed)
+    network_layouts.save(path)
+    return network_layouts
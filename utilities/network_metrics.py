@@ -0,0 +1,197 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    network_metrics.py
+-- Purpose: Batch computation of network centrality metrics (strength, PageRank, HITS and
+            betweenness) of every country for every period of the trade network.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+import scipy.sparse as sp
+
+from utilities.trade_tensor import TradeTensor
+
+metrics_ls = ['In_Strength', 'Out_Strength', 'PageRank', 'Hub', 'Authority', 'Betweenness']
+
+
+def pagerank(adjacency: sp.csr_matrix, alpha: float = 0.85, x0: Optional[np.ndarray] = None,
+             tol: float = 1e-6, max_iter: int = 100) -> Tuple[np.ndarray, int]:
+    """
+    Weighted PageRank of a directed graph by power iteration, where the adjacency matrix
+    has the importers as rows and the exporters as columns (edges go from the exporter to
+    the importer, as in the networkx graphs of the project). The rank of countries with no
+    exports (dangling nodes) is spread uniformly, as in nx.pagerank.
+
+    Args:
+    ----
+        adjacency: Importers x exporters matrix of the weights.
+        alpha: Damping factor.
+        x0: Optional starting vector (e.g. the PageRank of the previous period).
+        tol, max_iter: Convergence criteria, as in nx.pagerank.
+    Returns:
+    -------
+        x: PageRank of every node (sums to 1).
+        n_iter: Number of iterations that were needed.
+    """
+    n_nodes = adjacency.shape[0]
+    out_strength = np.asarray(adjacency.sum(axis=0)).ravel()
+    dangling = out_strength == 0
+    inv_out = np.divide(1.0, out_strength, out=np.zeros(n_nodes), where=~dangling)
+
+    x = np.full(n_nodes, 1.0 / n_nodes) if x0 is None else x0 / x0.sum()
+    for n_iter in range(1, max_iter + 1):
+        x_last = x
+        x = alpha * (adjacency @ (x_last * inv_out) + x_last[dangling].sum() / n_nodes) + (1 - alpha) / n_nodes
+        if np.abs(x - x_last).sum() < n_nodes * tol:
+            break
+    return x, n_iter
+
+
+def hits(adjacency: sp.csr_matrix, h0: Optional[np.ndarray] = None, tol: float = 1e-8,
+         max_iter: int = 100) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    HITS hubs and authorities by power iteration, for the same orientation as pagerank():
+    hubs are the exporters that supply the main importers (authorities).
+
+    Returns:
+    -------
+        hubs, authorities: Scores of every node, each summing to 1.
+    """
+    n_nodes = adjacency.shape[0]
+    hubs = np.full(n_nodes, 1.0 / n_nodes) if h0 is None else h0 / h0.sum()
+    for _ in range(max_iter):
+        hubs_last = hubs
+        authorities = adjacency @ hubs_last
+        hubs = adjacency.T @ authorities
+        if hubs.sum() == 0:
+            break
+        hubs = hubs / hubs.sum()
+        if np.abs(hubs - hubs_last).sum() < tol:
+            break
+
+    authorities = adjacency @ hubs
+    if authorities.sum() > 0:
+        authorities = authorities / authorities.sum()
+    return hubs, authorities
+
+
+def betweenness(adjacency: sp.csr_matrix) -> np.ndarray:
+    """
+    Normalized (unweighted) betweenness centrality of every node, with edges from the
+    exporters to the importers.
+    """
+    graph = nx.from_scipy_sparse_array(sp.csr_matrix(adjacency.T), create_using=nx.DiGraph)
+    scores = nx.betweenness_centrality(graph, weight=None)
+    return np.array([scores[node] for node in range(adjacency.shape[0])])
+
+
+def period_chunk_metrics(matrices: List[sp.csr_matrix], periods: List[pd.Timestamp], countries: List[str],
+                         alpha: float = 0.85, compute_betweenness: bool = True) -> pd.core.frame.DataFrame:
+    """
+    Metrics of consecutive periods. Only the countries that traded in a period are part of
+    its graph. PageRank and HITS of each period start from the scores of the previous one.
+
+    Args:
+    ----
+        matrices: Importers x exporters matrix of every period.
+        periods: Period of every matrix.
+        countries: Names of the nodes of the matrices.
+        alpha: Damping factor of PageRank.
+        compute_betweenness: Compute the betweenness centrality (the slowest of the metrics).
+    Returns:
+    -------
+        metrics_df: Tidy dataframe with a row per (period, country).
+    """
+    countries = np.asarray(countries, dtype=object)
+    n_nodes = len(countries)
+    last_pagerank, last_hubs = np.zeros(n_nodes), np.zeros(n_nodes)
+    period_dfs = []
+
+    for adjacency, period in zip(matrices, periods):
+        in_strength = np.asarray(adjacency.sum(axis=1)).ravel()
+        out_strength = np.asarray(adjacency.sum(axis=0)).ravel()
+        active = np.flatnonzero((adjacency.getnnz(axis=1) > 0) | (adjacency.getnnz(axis=0) > 0))
+        if len(active) == 0:
+            continue
+        sub = adjacency[active][:, active]
+
+        # Warm start: countries that were not part of the previous graph start from the mean
+        x0 = last_pagerank[active]
+        x0 = np.where(x0 > 0, x0, 1.0 / len(active)) if x0.any() else None
+        h0 = last_hubs[active]
+        h0 = np.where(h0 > 0, h0, h0[h0 > 0].mean()) if h0.any() else None
+
+        rank, _ = pagerank(sub, alpha=alpha, x0=x0)
+        hubs, authorities = hits(sub, h0=h0)
+        last_pagerank[:], last_hubs[:] = 0, 0
+        last_pagerank[active], last_hubs[active] = rank, hubs
+
+        period_dfs.append(pd.DataFrame({'Period': period,
+                                        'Country': countries[active],
+                                        'In_Strength': in_strength[active],
+                                        'Out_Strength': out_strength[active],
+                                        'PageRank': rank,
+                                        'Hub': hubs,
+                                        'Authority': authorities,
+                                        'Betweenness': betweenness(sub) if compute_betweenness else np.nan}))
+
+    if not period_dfs:
+        return pd.DataFrame(columns=['Period', 'Country'] + metrics_ls)
+    return pd.concat(period_dfs, ignore_index=True)
+
+
+def compute_network_metrics(df: pd.core.frame.DataFrame, timeframe: str = 'month',
+                            layer: str = 'Trade Value (US$)', alpha: float = 0.85,
+                            compute_betweenness: bool = True, reconciled: bool = False,
+                            n_jobs: int = 1) -> pd.core.frame.DataFrame:
+    """
+    Compute the centrality metrics of every country for every period of the network.
+    The graphs of the periods are slices of the shared TradeTensor of the dataframe.
+
+    Args:
+    ----
+        df: Dataframe of the (normalized) trade data.
+        timeframe: 'month' or 'year'
+        layer: Edge weights, 'Trade Value (US$)' or 'Netweight (kg)'
+        alpha: Damping factor of PageRank.
+        compute_betweenness: Compute the betweenness centrality (the slowest of the metrics).
+        reconciled: Count the mirror reports once (see utilities/edge_table.py).
+        n_jobs: Number of processes. The periods are split in contiguous chunks, one per
+                process, and the warm start of PageRank/HITS is kept within each chunk.
+    Returns:
+    -------
+        metrics_df: Tidy dataframe with the columns 'Period', 'Country', 'In_Strength',
+                    'Out_Strength', 'PageRank', 'Hub', 'Authority' and 'Betweenness'.
+    """
+    tensor = TradeTensor.for_frame(df, reconciled=reconciled)
+
+    if timeframe == 'month':
+        periods = list(tensor.periods.to_timestamp())
+        matrices = [tensor.snapshot(period, layer=layer) for period in tensor.periods]
+    elif timeframe == 'year':
+        years = sorted(set(tensor.periods.year))
+        periods = [pd.Timestamp(f'{year}-12-31') for year in years]
+        matrices = [tensor.year(year, layer=layer) for year in years]
+    else:
+        raise ValueError('Incorrect timeframe - Please pick \'month\' or \'year\'')
+
+    countries = list(tensor.countries)
+    if n_jobs == 1:
+        return period_chunk_metrics(matrices, periods, countries, alpha, compute_betweenness)
+
+    bounds = np.linspace(0, len(periods), min(n_jobs, len(periods)) + 1).astype(int)
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        futures = [executor.submit(period_chunk_metrics, matrices[start:end], periods[start:end],
+                                   countries, alpha, compute_betweenness)
+                   for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+        metrics_df = pd.concat([future.result() for future in futures], ignore_index=True)
+
+    return metrics_df
@@ -0,0 +1,141 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    reconciliation.py
+-- Purpose: Data quality stage of the pipeline: reconciled edges of the whole trade network
+            (mirror reports counted once), with flags for missing weights, mirror reports that
+            disagree and outliers of the value per kg, and a report of the anomalies.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from utilities.edge_table import TradeEdgeTable
+
+anomaly_flags_ls = ['Missing_Weight', 'Mirror_Discrepancy', 'Value_Per_Kg_Outlier']
+
+
+def mirror_ratio(matched_df: pd.core.frame.DataFrame, col: str = 'Trade Value (US$)') -> np.ndarray:
+    """
+    Ratio of the largest to the smallest of the two mirror reports of an edge (1 when they
+    agree), or NaN when the edge was not reported by both countries with positive values.
+    """
+    importer_values = matched_df[f'{col} Importer'].to_numpy()
+    exporter_values = matched_df[f'{col} Exporter'].to_numpy()
+    valid = (importer_values > 0) & (exporter_values > 0)
+    ratio = np.full(len(matched_df), np.nan)
+    ratio[valid] = (np.maximum(importer_values[valid], exporter_values[valid])
+                    / np.minimum(importer_values[valid], exporter_values[valid]))
+    return ratio
+
+
+def robust_zscores(values: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """
+    Modified z-scores (0.6745 * (x - median) / MAD) of the values within every group.
+    NaN values, and groups with a MAD of 0, get a NaN score.
+    """
+    series = pd.Series(values)
+    grouped = series.groupby(groups)
+    median = grouped.transform('median')
+    mad = (series - median).abs().groupby(groups).transform('median')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = 0.6745 * (series - median) / mad.where(mad > 0)
+    return scores.to_numpy()
+
+
+def flag_anomalies(edges_df: pd.core.frame.DataFrame, matched_df: pd.core.frame.DataFrame,
+                   max_mirror_ratio: float = 2.0, outlier_threshold: float = 3.5) -> pd.core.frame.DataFrame:
+    """
+    Add the value per kg and the anomaly flags to the reconciled edges.
+        'Missing_Weight'       --> the netweight is missing or 0, so there is no value per kg
+        'Mirror_Discrepancy'   --> the trade values reported by the two countries differ by
+                                   more than max_mirror_ratio times
+        'Value_Per_Kg_Outlier' --> the log of the value per kg is an outlier among the edges
+                                   of the same year (modified z-score above outlier_threshold)
+
+    Args:
+    ----
+        edges_df: Output of edge_table.reconcile_import_flows().
+        matched_df: Output of edge_table.match_mirror_flows(), aligned with edges_df.
+        max_mirror_ratio: Largest accepted ratio between the mirror reports.
+        outlier_threshold: Largest accepted absolute modified z-score of the value per kg.
+    Returns:
+    -------
+        edges_df: Copy of the edges with the columns 'Value_Per_Kg', 'Mirror_Ratio' and the flags.
+    """
+    trade_value = edges_df['Trade Value (US$)'].to_numpy(dtype=np.float64)
+    netweight = edges_df['Netweight (kg)'].to_numpy(dtype=np.float64)
+    has_weight = netweight > 0
+
+    value_per_kg = np.full(len(edges_df), np.nan)
+    value_per_kg[has_weight] = trade_value[has_weight] / netweight[has_weight]
+    log_value_per_kg = np.full(len(edges_df), np.nan)
+    positive = value_per_kg > 0
+    log_value_per_kg[positive] = np.log10(value_per_kg[positive])
+
+    ratio = mirror_ratio(matched_df)
+    scores = robust_zscores(log_value_per_kg, edges_df['Period'].dt.year.to_numpy())
+
+    return edges_df.assign(Value_Per_Kg=value_per_kg,
+                           Mirror_Ratio=ratio,
+                           Missing_Weight=~has_weight,
+                           Mirror_Discrepancy=ratio > max_mirror_ratio,
+                           Value_Per_Kg_Outlier=np.abs(scores) > outlier_threshold)
+
+
+def anomaly_report(flagged_df: pd.core.frame.DataFrame, matched_df: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+    """
+    Edges with at least one anomaly flag, with both mirror reports and a description of the
+    anomalies, sorted by trade value (largest first).
+    """
+    flags = flagged_df[anomaly_flags_ls].to_numpy()
+    any_flag = flags.any(axis=1)
+
+    report_df = pd.concat([flagged_df[any_flag],
+                           matched_df.loc[any_flag, [col for col in matched_df.columns
+                                                     if col not in ('Importer', 'Exporter', 'Period')]]], axis=1)
+    names = np.array(anomaly_flags_ls, dtype=object)
+    report_df['Anomaly'] = [', '.join(names[row]) for row in flags[any_flag]]
+    return report_df.sort_values('Trade Value (US$)', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def run_reconciliation(df: pd.core.frame.DataFrame, out_folder: str, policy: str = 'importer',
+                       max_mirror_ratio: float = 2.0, outlier_threshold: float = 3.5) -> Dict[str, object]:
+    """
+    Reconcile the mirror flows of the whole dataset, flag the anomalies, and write the clean
+    edge table (Parquet) and the anomaly report (CSV).
+
+    Args:
+    ----
+        df: Dataframe of the (normalized) trade data.
+        out_folder: Folder of the outputs.
+        policy: Policy for the mirror reports (see edge_table.reconcile_import_flows()).
+        max_mirror_ratio, outlier_threshold: Thresholds of the flags (see flag_anomalies()).
+    Returns:
+    -------
+        summary: Dictionary with the paths of the outputs ('edges_path', 'report_path'), the
+                 number of 'records', 'edges' and 'mirror_pairs', and the count of every flag.
+    """
+    edge_table = TradeEdgeTable.for_frame(df)
+    matched_df = edge_table.matched_df
+    flagged_df = flag_anomalies(edge_table.reconciled(policy), matched_df, max_mirror_ratio, outlier_threshold)
+    report_df = anomaly_report(flagged_df, matched_df)
+
+    if not os.path.exists(out_folder):
+        os.makedirs(out_folder)
+    edges_path = os.path.join(out_folder, f'reconciled_edges_{policy}.parquet')
+    report_path = os.path.join(out_folder, f'anomaly_report_{policy}.csv')
+    flagged_df.to_parquet(edges_path, engine='pyarrow', index=False)
+    report_df.to_csv(report_path, index=False)
+
+    summary = {'edges_path': edges_path, 'report_path': report_path,
+               'records': len(edge_table.flows_df), 'edges': len(flagged_df),
+               'mirror_pairs': int((matched_df['Reported By Importer'] & matched_df['Reported By Exporter']).sum())}
+    summary.update({flag: int(flagged_df[flag].sum()) for flag in anomaly_flags_ls})
+    return summary
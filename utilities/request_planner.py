@@ -0,0 +1,174 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    request_planner.py
+-- Purpose: Planning of the calls to the comtrade.un.org API: the (reporter, year) downloads are
+            batched into as few calls as possible under the record limit of a call, and the calls
+            whose response is truncated at the limit are split.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+import os
+import math
+from typing import Dict, List, Optional, Tuple
+
+from utilities import comtrade_api
+
+# The API accepts up to 5 reporters and 5 periods per call, and returns up to max records
+max_reporters_per_call = 5
+max_periods_per_call = 5
+max_records = comtrade_api.default_params['max']
+
+# Rows per (reporter, year) that are assumed when there is no previous download, and the
+# average size of a row of the CSVs that is used to estimate the rows of the previous downloads
+default_rows_estimate = 4000
+bytes_per_row = 400
+
+
+def chunks(items: list, size: int) -> List[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def estimate_rows(n_bytes: Dict[Tuple[str, int], int], reporter_id: str, year: int) -> int:
+    """
+    Expected rows of a (reporter, year) call: the size of the previous download of the same
+    call, or else the largest download of the reporter for any year.
+
+    Args:
+    ----
+        n_bytes: Dictionary of {(reporter id, year): size in bytes} of the previous downloads.
+        reporter_id, year: Call of interest.
+    """
+    if (reporter_id, year) in n_bytes:
+        return max(1, n_bytes[(reporter_id, year)] // bytes_per_row)
+    reporter_bytes = [size for (reporter, _), size in n_bytes.items() if reporter == reporter_id]
+    return max(reporter_bytes) // bytes_per_row + 1 if reporter_bytes else default_rows_estimate
+
+
+def make_request(members: List[dict], periods: List[str], out_folder: str) -> dict:
+    """
+    Call for the full years (periods) of several reporters (members, as created by
+    data_retrieval.plan_jobs()). The response of a call with a single member is written
+    straight to the file of the member, otherwise to a temporary file that is split later.
+    """
+    reporter_ids = list(dict.fromkeys(member['reporter_id'] for member in members))
+    if len(members) == 1:
+        path = members[0]['target']
+    else:
+        path = os.path.join(out_folder, 'Batches', f"Batch_{'-'.join(reporter_ids)}_{'-'.join(periods)}.csv")
+    names = sorted(set(member['reporter'] for member in members))
+    return {'params': comtrade_api.request_params(','.join(reporter_ids), ','.join(periods)),
+            'path': path, 'members': members, 'reporter_ids': reporter_ids, 'periods': periods,
+            'name': f"{', '.join(names)} ({', '.join(periods)})"}
+
+
+def plan_requests(jobs: List[dict], out_folder: str, n_bytes: Optional[Dict[Tuple[str, int], int]] = None,
+                  max_reporters: int = max_reporters_per_call, max_periods: int = max_periods_per_call,
+                  max_rec: int = max_records, fill: float = 0.8) -> List[dict]:
+    """
+    Batch the (reporter, year) jobs into calls of several reporters and years. The reporters
+    that need the same years are packed together, as long as the expected rows of the call
+    stay under a fraction (fill) of the record limit. Update jobs (a few months of a reporter,
+    see data_retrieval.plan_jobs()) are made as separate calls.
+
+    Args:
+    ----
+        jobs: Jobs as created by data_retrieval.plan_jobs().
+        out_folder: Folder of the temporary files of the calls.
+        n_bytes: Dictionary of {(reporter id, year): size in bytes} of the previous downloads,
+                 used to estimate the rows of the calls.
+        max_reporters, max_periods: Maximum reporters and periods per call.
+        max_rec: Maximum records returned by a call.
+        fill: Fraction of max_rec that the expected rows of a call can use.
+    Returns:
+    -------
+        requests: List of {'params', 'path', 'name', 'members', 'reporter_ids', 'periods'}.
+    """
+    n_bytes = n_bytes if n_bytes is not None else {}
+    requests = [make_update_request(job) for job in jobs if job['path'] != job['target']]
+
+    # Group the reporters by the years that they need
+    reporter_years: Dict[str, Dict[int, dict]] = {}
+    for job in jobs:
+        if job['path'] == job['target']:
+            reporter_years.setdefault(job['reporter_id'], {})[job['year']] = job
+    year_groups: Dict[Tuple[int, ...], List[str]] = {}
+    for reporter_id, years in reporter_years.items():
+        year_groups.setdefault(tuple(sorted(years)), []).append(reporter_id)
+
+    budget = fill * max_rec
+    for years, reporter_ids in year_groups.items():
+        for period_chunk in chunks(list(years), max_periods):
+            batch, batch_rows = [], 0
+            for reporter_id in reporter_ids:
+                rows = sum(estimate_rows(n_bytes, reporter_id, year) for year in period_chunk)
+                if batch and (len(batch) == max_reporters or batch_rows + rows > budget):
+                    requests.append(batch_request(batch, reporter_years, period_chunk, out_folder))
+                    batch, batch_rows = [], 0
+                batch.append(reporter_id)
+                batch_rows += rows
+            if batch:
+                requests.append(batch_request(batch, reporter_years, period_chunk, out_folder))
+    return requests
+
+
+def batch_request(reporter_ids: List[str], reporter_years: Dict[str, Dict[int, dict]],
+                  years: List[int], out_folder: str) -> dict:
+    members = [reporter_years[reporter_id][year] for reporter_id in reporter_ids for year in years]
+    return make_request(members, [str(year) for year in years], out_folder)
+
+
+def make_update_request(job: dict) -> dict:
+    return dict(job, members=[job], reporter_ids=[job['reporter_id']],
+                periods=str(job['params']['ps']).split(','))
+
+
+def split_request(request: dict, out_folder: str) -> List[dict]:
+    """
+    Split a call whose response was truncated in two calls: by reporters, or else by years.
+    A call for a single reporter and year cannot be split and an empty list is returned.
+    """
+    reporter_ids, periods = request['reporter_ids'], request['periods']
+    if len(request['members']) == 1:
+        return []
+
+    if len(reporter_ids) > 1:
+        halves = [reporter_ids[:len(reporter_ids) // 2], reporter_ids[len(reporter_ids) // 2:]]
+        return [make_request([member for member in request['members'] if member['reporter_id'] in half],
+                             periods, out_folder) for half in halves]
+
+    halves = [periods[:len(periods) // 2], periods[len(periods) // 2:]]
+    return [make_request([member for member in request['members'] if str(member['year']) in half],
+                         half, out_folder) for half in halves]
+
+
+def count_rows(path: str, chunk_size: int = 1 << 20) -> int:
+    """
+    Number of data rows (lines after the header) of a CSV file.
+    """
+    n_lines, last = 0, b'\n'
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            n_lines += chunk.count(b'\n')
+            last = chunk[-1:]
+    n_lines += last != b'\n'
+    return max(0, n_lines - 1)
+
+
+def estimate_wall_time(n_calls: int, per_second: float = comtrade_api.requests_per_second,
+                       per_hour: Optional[float] = comtrade_api.requests_per_hour, workers: int = 4,
+                       seconds_per_call: float = 5.0, recent_calls: int = 0) -> float:
+    """
+    Expected duration (in seconds) of a number of calls under the rate limits of the API
+    (see comtrade_api.RateLimiter). At most per_hour calls are made in any hour, including
+    the recent_calls already made in the last hour, so every further block of per_hour calls
+    waits for another hour.
+    """
+    if n_calls == 0:
+        return 0.0
+    throttled = (n_calls - 1) / per_second
+    if per_hour is not None and n_calls + recent_calls > per_hour:
+        throttled = max(throttled, (math.ceil((n_calls + recent_calls) / per_hour) - 1) * 3600)
+    return max(throttled, math.ceil(n_calls / workers) * seconds_per_call) + seconds_per_call
@@ -0,0 +1,130 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    trade_cube.py
+-- Purpose: Pre-aggregated roll-ups of the trade sums by (trade flow, year, reporter), so that
+            the top importers/exporters of any year (or of all the years) are a lookup, instead
+            of a filter and groupby over the whole data.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from utilities.country_index import shared_per_frame
+
+cube_features_ls = ['Trade Value (US$)', 'Netweight (kg)']
+
+
+def group_slices(keys_df: pd.core.frame.DataFrame) -> Dict[tuple, slice]:
+    """
+    Map every distinct key of a dataframe sorted by its key columns to the slice of its rows.
+    """
+    if keys_df.empty:
+        return {}
+    keys = list(zip(*[keys_df[col].tolist() for col in keys_df.columns]))
+    starts = [0] + [i for i in range(1, len(keys)) if keys[i] != keys[i - 1]] + [len(keys)]
+    return {keys[start]: slice(start, end) for start, end in zip(starts[:-1], starts[1:])}
+
+
+class TradeCube:
+    """
+    Sums of the trade features of a dataframe, shared through TradeCube.for_frame().
+
+        all_df     --> sums by ('Trade Flow', 'Year', 'Reporter'), where 'Year' is the column
+                       of the data, as used by aggregate(year='all')
+        windows_df --> sums by ('Trade Flow', 'Year', 'Reporter') over the periods after the
+                       1st of January of every year, as used by aggregate(year='2018')
+
+    The roll-ups are computed from the records, and not from a finer (flow, reporter, year,
+    month) cube: summing monthly sums adds the floats of 'Netweight (kg)' in another order,
+    which changes the last digits. Grouping the records in the same order as a groupby of
+    the records keeps the sums exactly the ones of tnf.getAggregateStatistics().
+    """
+
+    # Shared cubes: {(fingerprint of the data,): cube}
+    _cubes: Dict[tuple, 'TradeCube'] = {}
+
+    def __init__(self, df: pd.core.frame.DataFrame, features: Optional[List[str]] = None):
+        self.features = [feature for feature in (features or cube_features_ls) if feature in df.columns]
+        period = df['Period']
+
+        self.all_df = (df.groupby(['Trade Flow', 'Year', 'Reporter'], observed=True)[self.features]
+                       .sum().reset_index())
+        self.all_slices = {flow: slice(s.start, s.stop) for (flow,), s in
+                           group_slices(self.all_df[['Trade Flow']]).items()}
+
+        # Periods in (YYYY-01-01, YYYY-12-31] of their year, as in getAggregateStatistics()
+        year_start = period.dt.to_period('Y').dt.start_time
+        year_end = year_start + pd.offsets.YearEnd(0)
+        in_window = (period > year_start) & (period <= year_end)
+        self.windows_df = (df.loc[in_window, ['Trade Flow', 'Reporter'] + self.features]
+                           .assign(Year=period[in_window].dt.year)
+                           .groupby(['Trade Flow', 'Year', 'Reporter'], observed=True)[self.features]
+                           .sum().reset_index())
+        self.window_slices = group_slices(self.windows_df[['Trade Flow', 'Year']])
+
+        self._empty_df = df.iloc[:0][['Year', 'Reporter'] + self.features]
+
+    @classmethod
+    def for_frame(cls, df: pd.core.frame.DataFrame) -> 'TradeCube':
+        """
+        Return the cube of a dataframe, shared if the dataframe comes from the data loader
+        (see shared_per_frame()).
+        """
+        return shared_per_frame(cls._cubes, df, lambda: cls(df))
+
+    def _rollup(self, kind: str, year: str) -> Tuple[pd.core.frame.DataFrame, List[str]]:
+        if year == 'all':
+            rows = self.all_slices.get(kind)
+            return (self.all_df.iloc[rows] if rows is not None else None), ['Year', 'Reporter']
+        rows = self.window_slices.get((kind, int(year)))
+        return (self.windows_df.iloc[rows] if rows is not None else None), ['Reporter']
+
+    @staticmethod
+    def _format(rollup_df: pd.core.frame.DataFrame, keys: List[str], feature: str,
+                year: str) -> pd.core.frame.DataFrame:
+        df = pd.DataFrame({key: rollup_df[key].to_numpy() if key == 'Year' else rollup_df[key].array
+                           for key in keys})
+        df[feature] = rollup_df[feature].to_numpy()
+        df.columns = pd.MultiIndex.from_tuples([(key, '') for key in keys] + [(feature, 'sum')])
+        if year != 'all':
+            df['Year'] = int(year)
+        return df
+
+    def aggregate(self, feature: str, kind: str, year: str) -> pd.core.frame.DataFrame:
+        """
+        Total of a feature per reporter (and per year if year is 'all'), sorted from the
+        largest to the smallest, in the same format as tnf.getAggregateStatistics().
+
+        Args:
+        ----
+            feature: Numerical feature to aggregate (e.g. 'Trade Value (US$)', 'Netweight (kg)')
+            kind: 'Imports', 'Exports'
+            year: Specify year of interest or 'all' for all years.
+        Returns:
+        -------
+            df_sorted: Sorted dataframe that contains the aggregated values.
+        """
+        rollup_df, keys = self._rollup(kind, year)
+        if rollup_df is None:
+            df = self._empty_df[[feature] + keys].groupby(keys, observed=True).agg(['sum']).reset_index()
+            if year != 'all':
+                df['Year'] = int(year)
+        else:
+            df = self._format(rollup_df, keys, feature, year)
+
+        return df.sort_values(by=(feature, 'sum'), ascending=False)
+
+    def top_n(self, feature: str, kind: str, year: str, topn: int) -> pd.core.frame.DataFrame:
+        """
+        Top-N reporters (or (year, reporter) pairs if year is 'all') by the total of a feature,
+        found with nlargest on the roll-up. Same format as aggregate().
+        """
+        rollup_df, keys = self._rollup(kind, year)
+        if rollup_df is None:
+            return self.aggregate(feature, kind, year)
+        return self._format(rollup_df.nlargest(topn, feature), keys, feature, year)
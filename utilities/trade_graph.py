@@ -0,0 +1,226 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    trade_graph.py
+-- Purpose: Graph of the whole trade network of vaccines, stored as scipy.sparse CSR adjacency
+            matrices (one per edge attribute, and optionally one per period). Networkx graphs
+            and country level graphs are extracted from the matrices on demand.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+import scipy.sparse as sp
+
+from utilities.country_index import country_codes, shared_per_frame
+from utilities.edge_table import TradeEdgeTable
+
+edge_attributes_ls = ['Trade Value (US$)', 'Netweight (kg)', 'Value_Per_Kg']
+
+
+def value_per_kg(trade_value: np.ndarray, netweight: np.ndarray) -> np.ndarray:
+    """
+    Element-wise Trade Value / Netweight, where divisions by zero give 0 (as in
+    tnf.groupNodesAndAggregate).
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = trade_value / netweight
+    ratio[np.isinf(ratio)] = 0
+    return ratio
+
+
+def sum_edges(keys: np.ndarray, values: Dict[str, np.ndarray]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Sum the values of the rows that share the same (integer) edge key.
+
+    Returns:
+    -------
+        unique_keys: Sorted unique keys.
+        sums: Dictionary of {attribute: sums aligned with unique_keys}.
+    """
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    sums = {}
+    for attr, vals in values.items():
+        summed = np.bincount(inverse, weights=np.nan_to_num(vals.astype(np.float64)),
+                             minlength=len(unique_keys))
+        sums[attr] = summed.astype(vals.dtype) if np.issubdtype(vals.dtype, np.integer) else summed
+    return unique_keys, sums
+
+
+def csr_matrices(rows: np.ndarray, cols: np.ndarray, data: Dict[str, np.ndarray],
+                 n_nodes: int) -> Dict[str, sp.csr_matrix]:
+    """
+    Create CSR matrices that share the same sparsity pattern, one per attribute.
+    The (rows, cols) pairs must be unique and sorted. Explicit zeros are kept, so an edge
+    exists in every matrix even when one of its values is 0.
+    """
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_nodes), out=indptr[1:])
+    return {attr: sp.csr_matrix((vals, cols, indptr), shape=(n_nodes, n_nodes))
+            for attr, vals in data.items()}
+
+
+class TradeNetworkGraph:
+    """
+    Directed graph of the imports of all the countries. The adjacency matrices have the
+    importers as rows and the exporters as columns, so that row i contains the imports of
+    country i and column j the exports of country j. Node ids are the positions of the
+    countries in self.countries.
+
+    Matrices are available for 'Trade Value (US$)', 'Netweight (kg)' and 'Value_Per_Kg'
+    (computed from the two sums), for all the periods together and optionally per period.
+    """
+
+    # Shared graphs: {(fingerprint of the data, by_period, reconciled): graph}
+    _graphs: Dict[tuple, 'TradeNetworkGraph'] = {}
+
+    def __init__(self, df: pd.core.frame.DataFrame, by_period: bool = False, reconciled: bool = False):
+        """
+        Args:
+        ----
+            df: Dataframe of the (normalized) trade data.
+            by_period: Build also one matrix per 'Period'.
+            reconciled: Use the reconciled edges, where mirror reports are counted once, instead
+                        of all the importer oriented flows (as in generateCountryGraph).
+        """
+        edge_table = TradeEdgeTable.for_frame(df)
+        if reconciled:
+            edges_df = edge_table.edges_df
+            (importers, exporters), self.countries = country_codes(edges_df, ('Importer', 'Exporter'))
+        else:
+            edges_df = edge_table.flows_df
+            (importers, exporters), self.countries = country_codes(edges_df)
+
+        self.n_nodes = len(self.countries)
+        values = {attr: edges_df[attr].to_numpy() for attr in edge_attributes_ls[:2]}
+
+        keys = importers * self.n_nodes + exporters
+        unique_keys, sums = sum_edges(keys, values)
+        self.matrices = self._attribute_matrices(unique_keys, sums)
+
+        self.periods = pd.DatetimeIndex([])
+        self.period_matrices: Dict[pd.Timestamp, Dict[str, sp.csr_matrix]] = {}
+        if by_period:
+            period_codes, periods = pd.factorize(edges_df['Period'], sort=True)
+            self.periods = pd.DatetimeIndex(periods)
+            unique_keys, sums = sum_edges(period_codes * self.n_nodes ** 2 + keys, values)
+
+            # Sorted keys are grouped by period, so each period is a contiguous block
+            bounds = np.searchsorted(unique_keys // self.n_nodes ** 2, np.arange(len(self.periods) + 1))
+            for p, period in enumerate(self.periods):
+                block = slice(bounds[p], bounds[p + 1])
+                self.period_matrices[period] = self._attribute_matrices(
+                    unique_keys[block] % self.n_nodes ** 2, {attr: vals[block] for attr, vals in sums.items()})
+
+    def _attribute_matrices(self, keys: np.ndarray, sums: Dict[str, np.ndarray]) -> Dict[str, sp.csr_matrix]:
+        data = dict(sums)
+        data['Value_Per_Kg'] = value_per_kg(sums['Trade Value (US$)'].astype(np.float64), sums['Netweight (kg)'])
+        return csr_matrices(keys // self.n_nodes, keys % self.n_nodes, data, self.n_nodes)
+
+    @classmethod
+    def for_frame(cls, df: pd.core.frame.DataFrame, by_period: bool = False,
+                  reconciled: bool = False) -> 'TradeNetworkGraph':
+        """
+        Return the graph of a dataframe, shared if the dataframe comes from the data loader
+        (see shared_per_frame()).
+        """
+        return shared_per_frame(cls._graphs, df, lambda: cls(df, by_period, reconciled), by_period, reconciled)
+
+    def node_id(self, country: str) -> int:
+        node = self.countries.get_indexer([country])[0]
+        if node < 0:
+            raise KeyError(f'Country not found in the network: {country}')
+        return node
+
+    def matrix(self, attr: str = 'Trade Value (US$)', period: Optional[pd.Timestamp] = None) -> sp.csr_matrix:
+        """
+        Adjacency matrix (importers x exporters) of an attribute, for all the periods or
+        for a single period.
+        """
+        if period is None:
+            return self.matrices[attr]
+        period = pd.Timestamp(period)
+        if period not in self.period_matrices:
+            if not self.period_matrices:
+                raise ValueError('The graph has been built without the per period matrices (by_period=False)')
+            return sp.csr_matrix((self.n_nodes, self.n_nodes), dtype=self.matrices[attr].dtype)
+        return self.period_matrices[period][attr]
+
+    def edge_weights(self, attr: str = 'Trade Value (US$)',
+                     period: Optional[pd.Timestamp] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Edges of the network as NumPy arrays.
+
+        Returns:
+        -------
+            importers, exporters: Node ids of the two ends of every edge.
+            weights: Value of the attribute for every edge.
+        """
+        mat = self.matrix(attr, period)
+        importers = np.repeat(np.arange(self.n_nodes), np.diff(mat.indptr))
+        return importers, mat.indices, mat.data
+
+    def country_imports(self, country: str, attr: str = 'Trade Value (US$)',
+                        period: Optional[pd.Timestamp] = None) -> pd.core.series.Series:
+        """
+        Imports of a country from each of its exporters (row slice of the adjacency matrix).
+        """
+        mat = self.matrix(attr, period)
+        node = self.node_id(country)
+        row = slice(mat.indptr[node], mat.indptr[node + 1])
+        return pd.Series(mat.data[row], index=self.countries[mat.indices[row]], name=attr)
+
+    def country_exports(self, country: str, attr: str = 'Trade Value (US$)',
+                        period: Optional[pd.Timestamp] = None) -> pd.core.series.Series:
+        """
+        Exports of a country to each of its importers (column slice of the adjacency matrix).
+        """
+        col = self.matrix(attr, period)[:, self.node_id(country)].tocsc()
+        return pd.Series(col.data, index=self.countries[col.indices], name=attr)
+
+    def to_networkx(self, period: Optional[pd.Timestamp] = None,
+                    country: Optional[str] = None) -> nx.classes.digraph.DiGraph:
+        """
+        Create a networkx view of the network (or of the imports of a single country), where
+        each edge goes from the exporter to the importer.
+
+        Args:
+        ----
+            period: Optional period of interest. By default all the periods are summed.
+            country: Optional importer country. By default the whole network is returned.
+        Returns:
+        -------
+            graph: nx.classes.digraph.DiGraph object with the edge attributes of the network.
+        """
+        importers, exporters, _ = self.edge_weights(period=period)
+        weights = {attr: self.matrix(attr, period).data for attr in edge_attributes_ls}
+
+        if country is not None:
+            keep = importers == self.node_id(country)
+            importers, exporters = importers[keep], exporters[keep]
+            weights = {attr: vals[keep] for attr, vals in weights.items()}
+
+        graph = nx.DiGraph()
+        names_in, names_out = self.countries[importers], self.countries[exporters]
+        graph.add_edges_from((exporter, importer, dict(zip(edge_attributes_ls, attrs)))
+                             for exporter, importer, *attrs in zip(names_out, names_in,
+                                                                    *[weights[attr].tolist() for attr in edge_attributes_ls]))
+        return graph
+
+    def country_graph_df(self, country: str, period: Optional[pd.Timestamp] = None) -> pd.core.frame.DataFrame:
+        """
+        Aggregated imports of a country, in the format of tnf.groupNodesAndAggregate(how='overall').
+        """
+        imports = {attr: self.country_imports(country, attr, period) for attr in edge_attributes_ls}
+        partners = imports['Trade Value (US$)'].index
+        df = pd.DataFrame({'Reporter': country,
+                           'Partner': np.asarray(partners, dtype=object),
+                           'Trade Flow': 'Imports'})
+        for attr in edge_attributes_ls:
+            df[attr] = imports[attr].to_numpy()
+        return df
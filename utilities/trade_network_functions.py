@@ -19,6 +19,8 @@ from statsmodels.tsa.stattools import acf, pacf, adfuller
 from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
 from statsmodels.tsa.arima_model import ARIMA
 
+from utilities.trade_cube import TradeCube
+
 
 def getAggregateStatistics(df: pd.core.frame.DataFrame, feature: str,
                      kind: str, year: str) -> pd.core.frame.DataFrame:
@@ -37,19 +39,8 @@ def getAggregateStatistics(df: pd.core.frame.DataFrame, feature: str,
     -------
         df_sorted: Sorted dataframe that contains the aggregated values.
     """
-    if year == 'all':
-        df = df.loc[df['Trade Flow'] == kind, [feature,
-            'Year', 'Reporter']].groupby(['Year', 'Reporter']).agg(['sum']).reset_index()
-    else:
-        df = df.loc[(df['Trade Flow'] == kind) &
-                    (df['Period'] > f'{year}-01-01') & (df['Period'] <= f'{year}-12-31'), 
-                    [feature,'Reporter']].groupby(['Reporter']).agg(['sum']).reset_index()
-    
-        df['Year'] = int(year)
-
-    df_sorted = df.sort_values(by=(feature,'sum'), ascending=False)
-    
-    return df_sorted
+    # The sums are looked up in the cube of the dataframe (shared for the data of the data loader)
+    return TradeCube.for_frame(df).aggregate(feature, kind, year)
 
 
 def barplot_topn_countries(df: pd.core.frame.DataFrame, feature: str,
@@ -89,13 +80,13 @@ def barplot_topn_countries(df: pd.core.frame.DataFrame, feature: str,
 def groupNodesAndAggregate(df, how='year', compute_value_per_kg=True)  -> pd.core.frame.DataFrame:
     
     if how == 'year':
-        dff = df.groupby(['Reporter','Partner','Trade Flow','Period']).agg(
+        dff = df.groupby(['Reporter','Partner','Trade Flow','Period'], observed=True).agg(
             {'Trade Value (US$)':'sum','Netweight (kg)':'sum'}).reset_index()
     elif how == 'month':
-        dff = df.groupby(['Reporter','Partner','Trade Flow','Period']).agg(
+        dff = df.groupby(['Reporter','Partner','Trade Flow','Period'], observed=True).agg(
             {'Trade Value (US$)':'sum','Netweight (kg)':'sum'}).reset_index()
     elif how == 'overall':
-        dff = df.groupby(['Reporter','Partner','Trade Flow']).agg(
+        dff = df.groupby(['Reporter','Partner','Trade Flow'], observed=True).agg(
             {'Trade Value (US$)':'sum','Netweight (kg)':'sum'}).reset_index()
     else:
         raise ValueError('Incorrect timeframe - Please pick \'month\' or \'year\'')
@@ -103,7 +94,7 @@ def groupNodesAndAggregate(df, how='year', compute_value_per_kg=True)  -> pd.cor
      # Here we will introduce a new feature which is the Price/Kg.
     if compute_value_per_kg:
         dff['Value_Per_Kg'] = dff['Trade Value (US$)']/dff['Netweight (kg)']
-        dff['Value_Per_Kg'].replace([np.inf, -np.inf], 0, inplace=True)
+        dff['Value_Per_Kg'] = dff['Value_Per_Kg'].replace([np.inf, -np.inf], 0)
     else:
         pass       
         
@@ -168,7 +159,7 @@ def split_test_train(df, num_months_test = 1):
     return train_set, test_set
 
 # Function that calculates the rolling mean and standard deviation, as well as performing the Dickey-Fuller Test
-def check_stationarity(time_series, window, figsize=(10,6)):
+def check_stationarity(time_series, window, figsize=(10,6), plot=True) -> pd.core.series.Series:
     """
     Function that calculates the rolling mean and standard deviation, 
     as well as performing the Dickey-Fuller Test
@@ -177,27 +168,35 @@ def check_stationarity(time_series, window, figsize=(10,6)):
     
     time_series: Time Series object
     window: size of the rolling average window
+    plot: Plot the rolling statistics and print the results of the test. With False the
+        function only computes the results (see utilities/diagnostics.py for many series).
     
+    Returns:
+    results_ts: Series with the results of the Dickey-Fuller Test
     """ 
     # Calculating rolling mean and standard deviation
     rolling_mn = time_series.rolling(window).mean()
     rolling_std = time_series.rolling(window).std()
     
-    plt.figure(figsize=figsize)
-    plt.plot(time_series, color = 'blue',label = 'Original TS')
-    plt.plot(rolling_mn, color = 'red', label = 'Rolling Mean')
-    plt.plot(rolling_std, color = 'black', label = 'Rolling St.Dev.')
-    plt.legend(loc = 'best')
-    plt.grid(True, color = 'lightgrey')
-    plt.title('Rolling Mean & Standard Deviation of the Trade Value of Vaccines', fontsize = 10)
-    
     # Dickey-Fuller test:
-    print('Results of Dickey-Fuller Test:')
     fuller_test = adfuller(time_series, autolag = 'AIC')
     results_ts = pd.Series(fuller_test[0:4], index = ['Test Statistic','P-value','#Lags Used','Number of Observations Used'])
     for key,value in fuller_test[4].items():
         results_ts['Critical Value (%s)'%key] = value
-    print(results_ts)
+
+    if plot:
+        plt.figure(figsize=figsize)
+        plt.plot(time_series, color = 'blue',label = 'Original TS')
+        plt.plot(rolling_mn, color = 'red', label = 'Rolling Mean')
+        plt.plot(rolling_std, color = 'black', label = 'Rolling St.Dev.')
+        plt.legend(loc = 'best')
+        plt.grid(True, color = 'lightgrey')
+        plt.title('Rolling Mean & Standard Deviation of the Trade Value of Vaccines', fontsize = 10)
+
+        print('Results of Dickey-Fuller Test:')
+        print(results_ts)
+
+    return results_ts
     
 
 def split_into_samples(seq, n_steps_past, n_steps_future):
@@ -205,29 +204,30 @@ def split_into_samples(seq, n_steps_past, n_steps_future):
     Create a function that splits a Univariate series into
     multiple samples of the form [x1,x2,x3] --> [x4]
     
+    The samples are read-only strided views of the series (no data is copied), so they
+    must be copied (e.g. np.array(X)) before being modified.
+    
     Parameters:
-    seq (pandas.Series): Univariate series
+    seq (pandas.Series or numpy.ndarray): Univariate series, or a 2-D array of shape
+        (number of series, time) to split all the series at once (batched mode)
     n_steps_past (int): Number of steps in the past each sample will have
     n_steps_future (int): Number of future steps
     
+    Returns:
+    X, Y: Arrays of shape (samples, n_steps_past) and (samples, n_steps_future), or
+        (number of series, samples, n_steps_past) and (number of series, samples, n_steps_future)
+        in batched mode
     """
-    
-    X_Series, Y_Series = list(), list()
+    values = np.asarray(seq)
+    n_steps = n_steps_past + n_steps_future
 
-    for step in range(0,len(seq)): 
-        
-        val_past = step + n_steps_past
-        val_fwd = val_past + n_steps_future
-        
-        if val_fwd > len(seq):
-            break
-                
-        # Get past values
-        X_Series.append(seq.values[step:val_past])
-        # Get forward values
-        Y_Series.append(seq.values[val_past:val_fwd])
+    if values.shape[-1] < n_steps:
+        empty_shape = values.shape[:-1] + (0,)
+        return np.empty(empty_shape + (n_steps_past,), dtype=values.dtype), \
+            np.empty(empty_shape + (n_steps_future,), dtype=values.dtype)
 
-    return np.array(X_Series), np.array(Y_Series)
+    windows = np.lib.stride_tricks.sliding_window_view(values, n_steps, axis=-1)
+    return windows[..., :n_steps_past], windows[..., n_steps_past:]
 
 
 def compute_RMSE(true_val, predicted_val, p_output=True) -> float:
@@ -235,8 +235,10 @@ def compute_RMSE(true_val, predicted_val, p_output=True) -> float:
     Compute the Root Mean Squared Error (RMSE) for two series - one describing
     the real values and the other the predicted.
     """
-    from sklearn.metrics import mean_squared_error
-    rms = np.sqrt(mean_squared_error(np.array(true_val), predicted_val))
+    # Column vectors (as sklearn does), so that a (n,) and a (n, 1) input are not broadcasted
+    true_val = np.asarray(true_val, dtype=np.float64).reshape(len(true_val), -1)
+    predicted_val = np.asarray(predicted_val, dtype=np.float64).reshape(len(predicted_val), -1)
+    rms = np.sqrt(np.mean((true_val - predicted_val) ** 2))
     if p_output:
         print('RMSE: {0}'.format(rms))
     return rms
@@ -0,0 +1,224 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    trade_panel.py
+-- Purpose: Dense, month aligned panel of the monthly imports of every (importer, exporter)
+            pair, built with a single groupby/unstack and served as views, so that the time
+            series of many pairs do not need one filter and groupby per pair.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utilities.country_index import shared_per_frame
+from utilities.edge_table import TradeEdgeTable
+
+panel_layers_ls = ['Trade Value (US$)', 'Netweight (kg)']
+
+
+def year_end_index(years: np.ndarray) -> pd.DatetimeIndex:
+    """
+    Index of the yearly time series, with the 31st of December of every year (as in
+    VaccinesTradeNetwork.generateTimeSeries(timeframe='year')).
+    """
+    return pd.to_datetime([f'{year}-12-31' for year in years])
+
+
+class TradePanel:
+    """
+    Monthly time series of the imports of all the (importer, exporter) pairs of a dataframe,
+    built once and shared through TradePanel.for_frame().
+
+        pairs   --> MultiIndex ('Importer', 'Exporter') of the pairs with at least one record,
+                    sorted by importer and exporter
+        months  --> first day of every month between the first and the last month of the data
+        values  --> {layer: array of shape (n_pairs, n_months)}, one row per pair
+        records --> array of shape (n_pairs, n_months) with the number of records of every month
+
+    The months without records are filled explicitly with 0 (records tell them apart from a
+    reported 0). The rows of an importer are contiguous, so series(), importer_frame() and
+    wide() return views of the arrays and not copies: they are read-only.
+    """
+
+    # Shared panels: {(fingerprint of the data, reconciled): panel}
+    _panels: Dict[tuple, 'TradePanel'] = {}
+
+    def __init__(self, df: pd.core.frame.DataFrame, reconciled: bool = False):
+        """
+        Args:
+        ----
+            df: Dataframe of the (normalized) trade data.
+            reconciled: Use the reconciled edges, where mirror reports are counted once, instead
+                        of all the importer oriented flows (as generateTimeSeries() does).
+        """
+        edge_table = TradeEdgeTable.for_frame(df)
+        if reconciled:
+            edges_df = edge_table.edges_df
+        else:
+            edges_df = edge_table.flows_df.rename(columns={'Reporter': 'Importer', 'Partner': 'Exporter'})
+
+        self.months = pd.date_range(edges_df['Period'].min(), edges_df['Period'].max(), freq='MS',
+                                    unit=edges_df['Period'].dt.unit, name='Period')
+
+        cells_df = (edges_df.groupby(['Importer', 'Exporter', 'Period'], observed=True)
+                    .agg(**{layer: (layer, 'sum') for layer in panel_layers_ls},
+                         Records=('Period', 'size'))
+                    .unstack('Period', fill_value=0))
+        self.pairs = cells_df.index
+
+        self.values = {}
+        for layer in panel_layers_ls + ['Records']:
+            values = np.ascontiguousarray(cells_df[layer].reindex(columns=self.months, fill_value=0).to_numpy())
+            values.flags.writeable = False
+            self.values[layer] = values
+        self.records = self.values.pop('Records')
+
+        # Rows of every importer: {importer: slice}
+        importer_codes = self.pairs.codes[0]
+        starts = np.flatnonzero(np.diff(importer_codes, prepend=-1))
+        ends = np.append(starts[1:], len(importer_codes))
+        self.importer_rows = {self.pairs.levels[0][importer_codes[start]]: slice(start, end)
+                              for start, end in zip(starts, ends)}
+
+    @classmethod
+    def for_frame(cls, df: pd.core.frame.DataFrame, reconciled: bool = False) -> 'TradePanel':
+        """
+        Return the panel of a dataframe, shared if the dataframe comes from the data loader
+        (see shared_per_frame()).
+        """
+        return shared_per_frame(cls._panels, df, lambda: cls(df, reconciled), reconciled)
+
+    def layer(self, layer: str = 'Trade Value (US$)') -> np.ndarray:
+        """
+        Array of shape (n_pairs, n_months) of a layer. 'Value_Per_Kg' is computed from the
+        other two layers, as in tnf.groupNodesAndAggregate() (NaN for the empty months).
+        """
+        if layer != 'Value_Per_Kg':
+            return self.values[layer]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            value_per_kg = self.values['Trade Value (US$)'] / self.values['Netweight (kg)']
+        value_per_kg[np.isinf(value_per_kg)] = 0
+        return value_per_kg
+
+    def pair_position(self, importer: str, exporter: str) -> Optional[int]:
+        """
+        Row of a pair, or None if the importer never reported imports from the exporter.
+        """
+        rows = self.importer_rows.get(importer)
+        if rows is None:
+            return None
+        exporters = self.pairs.get_level_values(1)[rows]
+        position = exporters.get_indexer([exporter])[0]
+        return None if position < 0 else rows.start + position
+
+    def _to_timeframe(self, values: np.ndarray, timeframe: str):
+        if timeframe == 'month':
+            return values, self.months
+        elif timeframe == 'year':
+            years = self.months.year.to_numpy()
+            starts = np.flatnonzero(np.diff(years, prepend=years[0] - 1))
+            return np.add.reduceat(values, starts, axis=-1), year_end_index(years[starts])
+        raise ValueError('Incorrect timeframe - Please pick \'month\' or \'year\'')
+
+    def series(self, importer: str, exporter: str, layer: str = 'Trade Value (US$)',
+               timeframe: str = 'month') -> pd.core.series.Series:
+        """
+        Time series of the imports of importer from exporter, with a value for every month
+        (or year) of the panel. A pair without records gives a series of zeros.
+
+        Args:
+        ----
+            importer, exporter: Names of the countries.
+            layer: 'Trade Value (US$)', 'Netweight (kg)' or 'Value_Per_Kg'.
+            timeframe: 'month' or 'year' (sums of the months of every year).
+        Returns:
+        -------
+            ts: Series indexed by 'Period'. The monthly series of the trade value and the
+                netweight are views of the panel.
+        """
+        position = self.pair_position(importer, exporter)
+        if position is None:
+            values = np.zeros(len(self.months), dtype=self.layer(layer).dtype)
+        else:
+            values = self.layer(layer)[position]
+        values, index = self._to_timeframe(values, timeframe)
+        return pd.Series(values, index=index, name=layer, copy=False)
+
+    def importer_frame(self, importer: str, layer: str = 'Trade Value (US$)',
+                       timeframe: str = 'month') -> pd.core.frame.DataFrame:
+        """
+        Time series of the imports of a country from all its partners, as a (months x exporters)
+        dataframe. Empty if the country never reported imports.
+        """
+        rows = self.importer_rows.get(importer, slice(0, 0))
+        values, index = self._to_timeframe(self.layer(layer)[rows], timeframe)
+        return pd.DataFrame(values.T, index=index, columns=self.pairs.get_level_values(1)[rows],
+                            copy=False)
+
+    def wide(self, layer: str = 'Trade Value (US$)', timeframe: str = 'month') -> pd.core.frame.DataFrame:
+        """
+        Time series of all the pairs, as a (months x pairs) dataframe with ('Importer', 'Exporter')
+        columns.
+        """
+        values, index = self._to_timeframe(self.layer(layer), timeframe)
+        return pd.DataFrame(values.T, index=index, columns=self.pairs, copy=False)
+
+    def dense(self, layer: str = 'Trade Value (US$)') -> np.ndarray:
+        """
+        Array of shape (n_importers, n_exporters, n_months) of a layer, with the importers and
+        exporters of pairs.levels. This is a new array (zeros for the pairs without records).
+        """
+        values = self.layer(layer)
+        importers, exporters = self.pairs.levels
+        dense = np.zeros((len(importers), len(exporters), len(self.months)), dtype=values.dtype)
+        dense[self.pairs.codes[0], self.pairs.codes[1]] = values
+        return dense
+
+    def active_pairs(self, min_months: int = 1) -> pd.MultiIndex:
+        """
+        Pairs with records in at least min_months months.
+        """
+        return self.pairs[(self.records > 0).sum(axis=1) >= min_months]
+
+
+def select_series(panel: TradePanel, pairs: Optional[List[Tuple[str, str]]] = None,
+                  min_months: int = 36, num_months_test: int = 12,
+                  layer: str = 'Trade Value (US$)') -> Tuple[np.ndarray, Dict[Tuple[str, str], str]]:
+    """
+    Rows of the panel with the series that can be forecasted.
+
+    Args:
+    ----
+        panel: Panel of the time series of all the pairs.
+        pairs: (importer, exporter) pairs of interest, or None for all the pairs of the panel.
+        min_months: Smallest number of months with records of a series.
+        num_months_test: Number of months kept as test set.
+        layer: Feature of the series.
+    Returns:
+    -------
+        positions: Rows of the panel of the selected series.
+        skipped: {(importer, exporter): reason} of the series that were left out.
+    """
+    if pairs is None:
+        positions = np.arange(len(panel.pairs))
+        skipped = {}
+    else:
+        found = [(pair, panel.pair_position(*pair)) for pair in pairs]
+        positions = np.array([position for _, position in found if position is not None], dtype=np.int64)
+        skipped = {pair: 'no data' for pair, position in found if position is None}
+
+    months_with_records = (panel.records[positions] > 0).sum(axis=1)
+    train_values = panel.layer(layer)[positions, :len(panel.months) - num_months_test]
+    too_short = months_with_records < min_months
+    all_zeros = ~too_short & ~train_values.any(axis=1)
+
+    for position in positions[too_short]:
+        skipped[panel.pairs[position]] = 'too short'
+    for position in positions[all_zeros]:
+        skipped[panel.pairs[position]] = 'all zeros'
+    return positions[~too_short & ~all_zeros], skipped
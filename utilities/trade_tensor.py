@@ -0,0 +1,167 @@
+"""
+-------------------------------------------------------------------
+-- Title:
+-- File:    trade_tensor.py
+-- Purpose: Sparse period x importer x exporter tensor of the trade network, which answers
+            snapshot, range and rolling window queries without regrouping the data.
+-- Author:  Georgios Spyrou
+-- Date:    17/10/2026
+-------------------------------------------------------------------
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from utilities.country_index import country_codes, shared_per_frame
+from utilities.edge_table import TradeEdgeTable
+from utilities.trade_graph import sum_edges
+
+layers_ls = ['Trade Value (US$)', 'Netweight (kg)']
+
+
+class TradeTensor:
+    """
+    Monthly tensor of the imports of all the countries. Each layer ('Trade Value (US$)',
+    'Netweight (kg)') is stored as a CSR matrix of shape (n_periods, n_nodes * n_nodes), where
+    row t is the flattened importers x exporters adjacency matrix of month t. The periods
+    cover every month between the first and the last month of the data, so the row of a
+    month is known without a lookup and windows are always a fixed number of months.
+
+    Queries slice the rows of a period range and reduce them, so the result of every query
+    is an importers x exporters CSR matrix.
+    """
+
+    # Shared tensors: {(fingerprint of the data, reconciled): tensor}
+    _tensors: Dict[tuple, 'TradeTensor'] = {}
+
+    def __init__(self, df: pd.core.frame.DataFrame, reconciled: bool = False):
+        """
+        Args:
+        ----
+            df: Dataframe of the (normalized) trade data.
+            reconciled: Use the reconciled edges, where mirror reports are counted once, instead
+                        of all the importer oriented flows.
+        """
+        edge_table = TradeEdgeTable.for_frame(df)
+        if reconciled:
+            edges_df = edge_table.edges_df
+            (importers, exporters), self.countries = country_codes(edges_df, ('Importer', 'Exporter'))
+        else:
+            edges_df = edge_table.flows_df
+            (importers, exporters), self.countries = country_codes(edges_df)
+
+        self.n_nodes = len(self.countries)
+        # Monthly ordinals (months since 1970-01, as pd.Period('...', freq='M').ordinal)
+        ordinals = ((edges_df['Period'].dt.year.to_numpy(dtype=np.int64) - 1970) * 12 +
+                    edges_df['Period'].dt.month.to_numpy(dtype=np.int64) - 1)
+        self.periods = pd.period_range(pd.Period(ordinal=ordinals.min(), freq='M'),
+                                       pd.Period(ordinal=ordinals.max(), freq='M'), freq='M')
+        period_codes = ordinals - ordinals.min()
+
+        n_cells = self.n_nodes * self.n_nodes
+        unique_keys, sums = sum_edges(period_codes * n_cells + importers * self.n_nodes + exporters,
+                                      {layer: edges_df[layer].to_numpy() for layer in layers_ls})
+
+        rows, cols = unique_keys // n_cells, unique_keys % n_cells
+        indptr = np.zeros(len(self.periods) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(self.periods)), out=indptr[1:])
+        self.layers = {layer: sp.csr_matrix((vals, cols, indptr), shape=(len(self.periods), n_cells))
+                       for layer, vals in sums.items()}
+
+    @classmethod
+    def for_frame(cls, df: pd.core.frame.DataFrame, reconciled: bool = False) -> 'TradeTensor':
+        """
+        Return the tensor of a dataframe, shared if the dataframe comes from the data loader
+        (see shared_per_frame()).
+        """
+        return shared_per_frame(cls._tensors, df, lambda: cls(df, reconciled), reconciled)
+
+    def period_position(self, period) -> int:
+        """
+        Row of the tensor for a period (anything accepted by pd.Period, e.g. '2019-05').
+        """
+        return pd.Period(period, freq='M').ordinal - self.periods[0].ordinal
+
+    def _to_adjacency(self, flat: sp.spmatrix) -> sp.csr_matrix:
+        return sp.csr_matrix(flat.reshape((self.n_nodes, self.n_nodes)))
+
+    def snapshot(self, period, layer: str = 'Trade Value (US$)') -> sp.csr_matrix:
+        """
+        Importers x exporters matrix of a single month.
+        """
+        position = self.period_position(period)
+        if not 0 <= position < len(self.periods):
+            return sp.csr_matrix((self.n_nodes, self.n_nodes), dtype=self.layers[layer].dtype)
+        return self._to_adjacency(self.layers[layer][position])
+
+    def range_sum(self, start=None, end=None, layer: str = 'Trade Value (US$)') -> sp.csr_matrix:
+        """
+        Importers x exporters matrix with the sum of the months between start and end
+        (both included). By default the range covers all the months.
+        """
+        first = 0 if start is None else max(self.period_position(start), 0)
+        last = len(self.periods) - 1 if end is None else min(self.period_position(end), len(self.periods) - 1)
+        if last < first:
+            return sp.csr_matrix((self.n_nodes, self.n_nodes), dtype=self.layers[layer].dtype)
+        return self._to_adjacency(self.layers[layer][first:last + 1].sum(axis=0))
+
+    def year(self, year: int, layer: str = 'Trade Value (US$)') -> sp.csr_matrix:
+        """
+        Importers x exporters matrix with the sum of a calendar year.
+        """
+        return self.range_sum(f'{year}-01', f'{year}-12', layer=layer)
+
+    def rolling(self, window: int, layer: str = 'Trade Value (US$)') -> sp.csr_matrix:
+        """
+        Rolling window sums for all the months at once. Row t of the result is the flattened
+        importers x exporters matrix with the sum of the months t - window + 1, ..., t, and
+        can be turned into an adjacency matrix with self.rolling_snapshot().
+
+        Args:
+        ----
+            window: Number of months of the window.
+            layer: 'Trade Value (US$)' or 'Netweight (kg)'
+        """
+        n_periods = len(self.periods)
+        # Banded (n_periods x n_periods) matrix where row t selects the months of its window
+        offsets = list(range(-window + 1, 1))
+        band = sp.diags([np.ones(n_periods - abs(k)) for k in offsets if abs(k) < n_periods],
+                        [k for k in offsets if abs(k) < n_periods], shape=(n_periods, n_periods), format='csr')
+        return sp.csr_matrix(band @ self.layers[layer])
+
+    def rolling_snapshot(self, rolled: sp.csr_matrix, period) -> sp.csr_matrix:
+        """
+        Importers x exporters matrix of a period from the output of self.rolling().
+        """
+        return self._to_adjacency(rolled[self.period_position(period)])
+
+    def totals(self, layer: str = 'Trade Value (US$)') -> pd.core.series.Series:
+        """
+        Total trade of the whole network per month.
+        """
+        return pd.Series(np.asarray(self.layers[layer].sum(axis=1)).ravel(),
+                         index=self.periods.to_timestamp(), name=layer)
+
+    def country_series(self, country: str, partner: Optional[str] = None, flow: str = 'Imports',
+                       layer: str = 'Trade Value (US$)') -> pd.core.series.Series:
+        """
+        Monthly series of the imports (or exports) of a country, from a single partner or
+        from all the partners together, taken as columns of the tensor.
+        """
+        node = self.countries.get_indexer([country])[0]
+        if node < 0:
+            raise KeyError(f'Country not found in the network: {country}')
+        others = np.arange(self.n_nodes) if partner is None else self.countries.get_indexer([partner])
+
+        if flow == 'Imports':
+            cells = node * self.n_nodes + others
+        elif flow == 'Exports':
+            cells = others * self.n_nodes + node
+        else:
+            raise ValueError('Trade flow is not set to Imports or Exports')
+
+        values = np.asarray(self.layers[layer][:, cells[others >= 0]].sum(axis=1)).ravel()
+        return pd.Series(values, index=self.periods.to_timestamp(), name=layer)
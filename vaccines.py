@@ -21,6 +21,7 @@ os.chdir(project_dir)
 
 # Custom packages
 from utilities import trade_network_functions as tnf
+from utilities import data_store, data_loader
 from VaccinesTradeNetworkClass import VaccinesTradeNetwork
 
 # Create a dataframe that contains data from all years
@@ -43,53 +44,31 @@ summary = maindf.describe()
 
 # Note: More information regarding the feautures can be found here: https://comtrade.un.org/data/MethodologyGuideforComtradePlus.pdf
 
-useful_features_ls = ['Year', 'Period', 'Reporter Code', 'Reporter', 'Partner Code',
-                      'Partner', 'Trade Flow', 'Commodity', 'Netweight (kg)',
-                      'Trade Value (US$)']
-df = maindf[useful_features_ls]
-
+# The useful features are stored in a typed, columnar store (see data_conversion.py),
+# so from now on we read only these columns instead of re-parsing the raw CSVs.
+useful_features_ls = data_store.useful_features_ls
+
+# The cleaning steps below are applied by data_loader.load_trade_data(), which is
+# shared with the Dash application and the notebooks:
+#   - We will consider both 'Re-imports' and 'Re-exports' as 'Imports' and 'Exports'
+#     respectively and we will drop the entries where we dont have info about
+#     the trade flow (data_loader.trade_flow_dict).
+#   - We have a node called 'World' but we would like to analyze the trade
+#     relationships between specific countries. Thus we will exclude from the
+#     analysis the cases where the partner is 'World'.
+#   - 'United States of America' is renamed to 'USA'.
+#   - Period is our datetime column.
+#
+# Except the nodes of our analysis which will correspond to countries, the other
+# main features of interest are the Netweigh of the export/import in kilograms
+# as well as the Trade Value in US dollars($).
+df = data_loader.load_trade_data(project_dir)
 
 df.groupby(['Reporter']).size()
 df.groupby(['Partner']).size()
 ls_of_years = list(df.Year.unique())
-
-# We will consider both 'Re-imports' and 'Re-exports' as 'Imports' and 'Exports'
-# respectively and we will drop the entries where we dont have info about
-# the trade flow.
 df['Trade Flow'].unique()
 
-trade_flow_dict = {'Re-imports':'Imports', 
-                   'Re-exports':'Exports',
-                   'Imports':'Imports', 
-                   'Exports':'Exports'}
-
-df['Trade Flow'] = df['Trade Flow'].map(trade_flow_dict)
-
-# Now we can observe that we have a node called 'World' but we would like to 
-# analyze the trade relationships between specific countries. Thus we will
-# exclude from the analysis the cases where the reporter or partner is 'World'
-df = df[df.Partner != 'World']
-
-# Period will be our datetime column
-df['Period'] = pd.to_datetime(df['Period'], format='%Y%m')
-
-# Except the nodes of our analysis which will correspond to countries, the other
-# main features of interest are the Netweigh of the export/import in kilograms
-# as well as the Trade Value in US dollars($).
-
-
-df['Partner'].replace(
-    to_replace='United States of America',
-    value='USA',
-    inplace=True
-)
-
-df['Reporter'].replace(
-    to_replace='United States of America',
-    value='USA',
-    inplace=True
-)
-
 topn = 15
 
 '''
@@ -98,7 +77,7 @@ topn = 15
 year = '2017'
 
 # Trade Value
-top_importers_2017 = tnf.getAggStatistics(df, feature='Trade Value (US$)',
+top_importers_2017 = tnf.getAggregateStatistics(df, feature='Trade Value (US$)',
                                      kind='Imports', year=year)
 top_importers_2017[0:topn]
 
@@ -106,7 +85,7 @@ top_importers_2017[0:topn]
 year = '2018'
 
 # Trade Value
-top_importers_2018 = tnf.getAggStatistics(df, feature='Trade Value (US$)',
+top_importers_2018 = tnf.getAggregateStatistics(df, feature='Trade Value (US$)',
                                      kind='Imports', year=year)
 top_importers_2018[0:topn]
 
@@ -114,12 +93,12 @@ top_importers_2018[0:topn]
 year = '2019'
 
 # Trade Value
-top_importers_2019 = tnf.getAggStatistics(df, feature='Trade Value (US$)',
+top_importers_2019 = tnf.getAggregateStatistics(df, feature='Trade Value (US$)',
                                      kind='Imports', year=year)
 top_importers_2019[0:topn]
 '''
 
-top_importers_all_years = tnf.getAggStatistics(df, feature='Trade Value (US$)',
+top_importers_all_years = tnf.getAggregateStatistics(df, feature='Trade Value (US$)',
                                      kind='Imports', year='all')
 
 
@@ -152,15 +131,21 @@ graph = argentina.generateCountryGraph(agg=True)
 argentina.plotCountryGraph()
 argentina.filtered_df
 
+# Centrality metrics (strength, PageRank, HITS, betweenness) of every country for every
+# month of the network. Use n_jobs > 1 to split the months across processes (only from
+# code that runs under an `if __name__ == '__main__':` guard).
+from utilities.network_metrics import compute_network_metrics
+
+network_metrics_df = compute_network_metrics(df, timeframe='month', n_jobs=1)
+network_metrics_df[network_metrics_df['Country'] == 'Argentina']
+
 
 
 # Part 3: Time Series Analysis
 
 # Create an object for United Kingdom 
 united_kingdom = VaccinesTradeNetwork(df, country='United Kingdom')
-united_kingdom_imports_df = united_kingdom.createFlowDF(tradeflow='Imports',
-                                                        source='Reporter',
-                                                        target='Partner')
+united_kingdom_imports_df = united_kingdom.create_trade_flow_df(tradeflow='Imports')
 
 united_kingdom_ts = united_kingdom.generateTimeSeries(partner_country='USA',
                                                       timeframe='month')
@@ -179,8 +164,15 @@ from sklearn.model_selection import train_test_split
 
 train, test = tnf.split_test_train(united_kingdom_ts['Trade Value (US$)'], num_months_test=12)
 
-hwes_model = ExponentialSmoothing(train, seasonal='mul', seasonal_periods=12)
-hwes_model_fit = hwes_model.fit()
+# The fitted models are kept in the model registry, so they are only trained again when
+# the series (or the hyperparameters) change
+from utilities.model_registry import ModelRegistry, series_id
+registry = ModelRegistry(os.path.join(project_dir, 'Model_Registry'))
+
+hwes_model_fit, _ = registry.fit_cached('hwes', series_id('United Kingdom', 'USA'), train,
+                                        params={'seasonal': 'mul', 'seasonal_periods': 12},
+                                        fit_fn=lambda series, warm_model: ExponentialSmoothing(
+                                            series, seasonal='mul', seasonal_periods=12).fit())
 
 yhat = hwes_model_fit.predict(start=test.index[0], end=test.index[-1])
 print(yhat)
@@ -213,9 +205,7 @@ tnf.create_lag_plot(df, lag = lag_order)
 # Create an object for United Kingdom 
 united_kingdom = VaccinesTradeNetwork(df, country='United Kingdom')
 
-united_kingdom_imports_df = united_kingdom.createFlowDF(tradeflow='Imports',
-                                                        source='Reporter',
-                                                        target='Partner')
+united_kingdom_imports_df = united_kingdom.create_trade_flow_df(tradeflow='Imports')
 
 united_kingdom_ts = united_kingdom.generateTimeSeries(partner_country='USA',
                                                       timeframe='month')
@@ -254,22 +244,33 @@ n_steps_past = 12
 n_steps_future = 1
 n_features = 1
 
-X, y = tnf.split_into_samples(pd.Series(np.concatenate(train_scaled)),
-                              n_steps_past=n_steps_past,
-                              n_steps_future=n_steps_future)
-print(f'Shape of X is {X.shape}\nShape of y is {y.shape}')
-
-X = X.reshape((X.shape[0], n_steps_past, n_features))
-
-# Define the model
-model = Sequential()
-model.add(Bidirectional(LSTM(50, activation='relu'), input_shape=(n_steps_past, n_features)))
-model.add(Dropout(0.2))
-model.add(Dense(n_features))
-model.compile(optimizer='adam', loss='mean_squared_error')
-
-# Train the model
-model.fit(X, y, epochs=500, batch_size=32, verbose=1)
+# Define and train the model, or load it from the model registry if it was already trained
+# on the same series. When only new months were added, the stored model is trained further.
+# The samples are built from the series that the registry keys the model on.
+def train_lstm(series, warm_model):
+    series_scaled = MinMaxScaler(feature_range = (0,1)).fit_transform(series.values.reshape(-1, 1))
+    X, y = tnf.split_into_samples(pd.Series(np.concatenate(series_scaled)),
+                                  n_steps_past=n_steps_past,
+                                  n_steps_future=n_steps_future)
+    print(f'Shape of X is {X.shape}\nShape of y is {y.shape}')
+
+    X = X.reshape((X.shape[0], n_steps_past, n_features))
+    if warm_model is None:
+        model = Sequential()
+        model.add(Bidirectional(LSTM(50, activation='relu'), input_shape=(n_steps_past, n_features)))
+        model.add(Dropout(0.2))
+        model.add(Dense(n_features))
+        model.compile(optimizer='adam', loss='mean_squared_error')
+        model.fit(X, y, epochs=500, batch_size=32, verbose=1)
+        return model
+    warm_model.fit(X, y, epochs=50, batch_size=32, verbose=1)
+    return warm_model
+
+model, _ = registry.fit_cached('lstm', series_id('United Kingdom', 'USA'),
+                               time_series_uk_to_usa.iloc[:len(train)],
+                               params={'units': 50, 'dropout': 0.2, 'n_steps_past': n_steps_past,
+                                       'epochs': 500, 'warm_epochs': 50, 'batch_size': 32},
+                               fit_fn=train_lstm)
 
 
 # Reshape the test data
@@ -282,18 +283,19 @@ test_series = np.concatenate((train_scaled[-n_steps_past:], test_scaled))
 # For the predictions we take run through the n_steps_past values from the training
 # data for the first iteration, then predict the next value in the series and this
 # value the gets feed into the series to assist with the prediction of the next
-# (and so on)
-predictions = []
-history = train_scaled[-n_steps_past:]
+# (and so on). The same function forecasts a whole batch of series at once.
+from utilities import lstm_forecast
+
+predictions_scaled = lstm_forecast.recursive_forecast(lstm_forecast.keras_predict_fn(model),
+                                                      train_scaled.reshape(1, -1),
+                                                      horizon=n_steps_past,
+                                                      n_steps_past=n_steps_past)
+predictions = scaler.inverse_transform(predictions_scaled.reshape(-1, 1))
 for i in range(n_steps_past):
-    x_ser = history[i:i+n_steps_past].reshape((1, n_steps_past, n_features))
-    yhat = model.predict(x_ser, verbose=0)
-    history = np.vstack((history, yhat))
-    predictions.append(scaler.inverse_transform(yhat))
-    print(f'Predicted Value: {predictions[i][0]}, true value: {test_reshaped[i]}')
+    print(f'Predicted Value: {predictions[i]}, true value: {test_reshaped[i]}')
 
 
-predicted = [i[0][0] for i in predictions]
+predicted = list(predictions[:, 0])
 
 # Compare the predictions visually
 plt.figure(figsize=(8,6))